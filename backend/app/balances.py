@@ -0,0 +1,225 @@
+"""Maintained invoice balances.
+
+`Invoice.paid_amount`, `Invoice.outstanding` and `Invoice.status` are kept in
+step with the `payments` table by the payment handlers, inside the same
+transaction as the payment insert/delete. Read paths use the columns directly
+instead of re-summing payments.
+"""
+import uuid
+from datetime import date, datetime
+from decimal import Decimal
+
+from sqlalchemy import case, func, insert, select, update
+from sqlalchemy.orm import Session
+
+from app.models import Client, Invoice, Payment
+
+
+def invoice_status(outstanding: Decimal, paid_amount: Decimal) -> str:
+    if outstanding <= 0:
+        return "Paid"
+    if paid_amount > 0:
+        return "Partial"
+    return "Unpaid"
+
+
+def status_expr(outstanding, paid_amount):
+    """SQL equivalent of `invoice_status`."""
+    return case(
+        (outstanding <= 0, "Paid"),
+        (paid_amount > 0, "Partial"),
+        else_="Unpaid",
+    )
+
+
+def apply_payment(inv: Invoice, amount: Decimal) -> None:
+    """Adjust a (locked) invoice's balance by a payment of `amount`.
+
+    Pass a negative amount when a payment is removed.
+    """
+    inv.paid_amount = (inv.paid_amount or Decimal("0")) + amount
+    inv.outstanding = inv.total_amount - inv.paid_amount
+    inv.status = invoice_status(inv.outstanding, inv.paid_amount)
+
+
+def apply_payments(db: Session, items: list, groups: list = None) -> list:
+    """Record a batch of payments against their (locked) invoices.
+
+    `items` are dicts with PaymentCreate's fields. Every target invoice is
+    locked with one `SELECT ... FOR UPDATE` (in id order, so overlapping
+    batches cannot deadlock) and each amount is checked against the
+    invoice's outstanding balance as reduced by earlier items in the batch.
+    `groups`, if given, holds a key per item: items sharing a key are
+    recorded together or not at all, and all fail with the first one's
+    error. Accepted payments are written with one executemany INSERT and the
+    balances with one executemany UPDATE. Does not commit.
+
+    Returns one `(payment, error)` pair per item, in order: `payment` is a
+    dict of PaymentOut fields and `error` is None, or the other way round.
+    """
+    invoice_ids = {item["invoice_id"] for item in items}
+    locked = db.execute(
+        select(
+            Invoice.id,
+            Invoice.invoice_number,
+            Invoice.total_amount,
+            Invoice.paid_amount,
+            Client.company_name,
+        )
+        .outerjoin(Client, Invoice.client_id == Client.id)
+        .where(Invoice.id.in_(invoice_ids))
+        .order_by(Invoice.id)
+        .with_for_update(of=Invoice)
+    ).all() if invoice_ids else []
+    invoices = {row.id: row for row in locked}
+    now = datetime.utcnow()
+
+    def check(failed_groups):
+        paid = {row.id: row.paid_amount or Decimal("0") for row in locked}
+        outcomes, payments = [], []
+        for position, item in enumerate(items):
+            if groups is not None and groups[position] in failed_groups:
+                outcomes.append((None, failed_groups[groups[position]]))
+                continue
+            inv = invoices.get(item["invoice_id"])
+            if inv is None:
+                outcomes.append((None, "Invoice not found"))
+                continue
+            outstanding = inv.total_amount - paid[inv.id]
+            if item["amount"] > outstanding:
+                outcomes.append((None, f"Payment amount ₹{item['amount']} exceeds outstanding ₹{outstanding}"))
+                continue
+            paid[inv.id] += item["amount"]
+            payment = {**item, "id": uuid.uuid4(), "created_at": now}
+            payments.append(payment)
+            outcomes.append(({**payment, "invoice_number": inv.invoice_number, "client_name": inv.company_name}, None))
+        return outcomes, payments, paid
+
+    outcomes, payments, paid = check({})
+    if groups is not None:
+        failed_groups = {}
+        for group, (_, error) in zip(groups, outcomes):
+            if error:
+                failed_groups.setdefault(group, error)
+        if failed_groups:
+            # Dropping whole groups only frees balance, so one more pass
+            # accepts every item of the remaining groups again
+            outcomes, payments, paid = check(failed_groups)
+
+    if payments:
+        db.execute(insert(Payment), payments)
+        db.execute(update(Invoice), [
+            {
+                "id": invoice_id,
+                "paid_amount": paid[invoice_id],
+                "outstanding": invoices[invoice_id].total_amount - paid[invoice_id],
+                "status": invoice_status(invoices[invoice_id].total_amount - paid[invoice_id], paid[invoice_id]),
+            }
+            for invoice_id in {p["invoice_id"] for p in payments}
+        ])
+    return outcomes
+
+
+def lock_open_invoices(db: Session, client_id, invoice_ids=None) -> list:
+    """Lock a client's invoices with a balance and return them, oldest due first.
+
+    One `SELECT ... FOR UPDATE` in id order, like `apply_payments`, so the
+    two cannot deadlock; pass `invoice_ids` to consider only those invoices.
+    """
+    q = (
+        select(Invoice.id, Invoice.invoice_number, Invoice.due_date, Invoice.outstanding)
+        .where(Invoice.client_id == client_id, Invoice.outstanding > 0)
+        .order_by(Invoice.id)
+        .with_for_update()
+    )
+    if invoice_ids is not None:
+        q = q.where(Invoice.id.in_(invoice_ids))
+    return sorted(db.execute(q).all(), key=lambda row: (row.due_date, row.invoice_number))
+
+
+def allocate(amount: Decimal, invoices) -> list:
+    """Split `amount` over `invoices` in order, each up to its outstanding.
+
+    Returns `(invoice_id, amount)` pairs; any amount beyond the invoices'
+    combined balance is left unallocated.
+    """
+    allocations = []
+    for inv in invoices:
+        if amount <= 0:
+            break
+        share = min(amount, inv.outstanding)
+        allocations.append((inv.id, share))
+        amount -= share
+    return allocations
+
+
+def client_balances(today: date, client_id=None, client_ids=None):
+    """Per-client balance aggregates over the maintained invoice columns.
+
+    Returns a SELECT grouped by client_id with invoice_count, outstanding,
+    overdue and overdue_count; callers embed it as a subquery or CTE.
+    """
+    is_overdue = (Invoice.due_date < today) & (Invoice.outstanding > 0)
+    q = (
+        select(
+            Invoice.client_id,
+            func.count(Invoice.id).label("invoice_count"),
+            func.sum(case((Invoice.outstanding > 0, Invoice.outstanding), else_=0)).label("outstanding"),
+            func.sum(case((is_overdue, Invoice.outstanding), else_=0)).label("overdue"),
+            func.count(case((is_overdue, Invoice.id))).label("overdue_count"),
+        )
+        .group_by(Invoice.client_id)
+    )
+    if client_id:
+        q = q.where(Invoice.client_id == client_id)
+    if client_ids is not None:
+        q = q.where(Invoice.client_id.in_(client_ids))
+    return q
+
+
+def _paid_subquery():
+    return (
+        select(func.coalesce(func.sum(Payment.amount), 0))
+        .where(Payment.invoice_id == Invoice.id)
+        .scalar_subquery()
+    )
+
+
+def recompute_balances(db: Session, invoice_ids=None) -> int:
+    """Recompute balance columns from the payments table in one UPDATE.
+
+    Used for the one-time backfill and to repair drift found by
+    `find_balance_mismatches`. Returns the number of invoices touched.
+    """
+    paid = _paid_subquery()
+    stmt = update(Invoice).values(
+        paid_amount=paid,
+        outstanding=Invoice.total_amount - paid,
+        status=status_expr(Invoice.total_amount - paid, paid),
+    )
+    if invoice_ids is not None:
+        stmt = stmt.where(Invoice.id.in_(invoice_ids))
+    result = db.execute(stmt.execution_options(synchronize_session=False))
+    return result.rowcount
+
+
+def find_balance_mismatches(db: Session) -> list:
+    """Return invoices whose maintained columns disagree with their payments."""
+    paid = _paid_subquery().label("actual_paid")
+    q = (
+        select(
+            Invoice.id,
+            Invoice.invoice_number,
+            Invoice.paid_amount,
+            Invoice.outstanding,
+            Invoice.status,
+            paid,
+        )
+        .where(
+            (Invoice.paid_amount != paid)
+            | (Invoice.outstanding != Invoice.total_amount - paid)
+            | (Invoice.status != status_expr(Invoice.total_amount - paid, paid))
+        )
+        .order_by(Invoice.invoice_number)
+    )
+    return db.execute(q).all()
@@ -0,0 +1,222 @@
+"""In-process caches.
+
+`SnapshotCache` holds expensive read payloads. Each cached dataset has a row
+in `cache_versions`; write handlers bump it in the same transaction as their
+change (an upsert issued just before commit), and readers compare the
+version stored with their snapshot against the table (a single primary-key
+lookup), so every uvicorn worker notices another worker's writes without
+recomputing.
+
+`TTLCache` is a plain LRU for values that carry their own expiry, such as
+verified auth principals. It can also follow a `cache_versions` row: any
+session that changes or deletes a `User` bumps the "users" version, and the
+principal cache drops its entries when it sees that version move.
+"""
+import threading
+import time
+from collections import OrderedDict
+from datetime import date, datetime
+
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.metrics import CACHE_REQUESTS
+from app.models import CacheVersion, User
+
+
+_PENDING_BUMPS = "pending_cache_bumps"
+USERS_VERSION = "users"
+
+
+def _version_select(name: str):
+    return select(CacheVersion.version).where(CacheVersion.name == name)
+
+
+def current_version(db: Session, name: str) -> int:
+    return db.execute(_version_select(name)).scalar() or 0
+
+
+async def current_version_async(db: AsyncSession, name: str) -> int:
+    return (await db.execute(_version_select(name))).scalar() or 0
+
+
+def _bump_statement(dialect: str, name: str):
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    stmt = insert(CacheVersion).values(name=name, version=1, updated_at=datetime.utcnow())
+    return stmt.on_conflict_do_update(
+        index_elements=[CacheVersion.name],
+        set_={"version": CacheVersion.version + 1, "updated_at": stmt.excluded.updated_at},
+    )
+
+
+def bump_version(db: Session, name: str) -> None:
+    """Mark `name` as changed when `db` next commits.
+
+    The bump itself runs from `_bump_before_commit`, as the transaction's
+    last statement, so the `cache_versions` row lock that every writer
+    shares is held only for the commit.
+    """
+    db.info.setdefault(_PENDING_BUMPS, set()).add(name)
+
+
+@event.listens_for(Session, "before_flush")
+def _bump_users_on_change(session: Session, flush_context, instances) -> None:
+    for obj in session.deleted:
+        if isinstance(obj, User):
+            bump_version(session, USERS_VERSION)
+            return
+    for obj in session.dirty:
+        if isinstance(obj, User) and session.is_modified(obj):
+            bump_version(session, USERS_VERSION)
+            return
+
+
+@event.listens_for(Session, "before_commit")
+def _bump_before_commit(session: Session) -> None:
+    # Flushed first: the flush itself can queue a bump (_bump_users_on_change)
+    session.flush()
+    names = session.info.pop(_PENDING_BUMPS, None)
+    if not names:
+        return
+    dialect = session.get_bind().dialect.name
+    # Sorted, so writers bumping several names lock their rows in the same order
+    for name in sorted(names):
+        session.execute(_bump_statement(dialect, name))
+
+
+@event.listens_for(Session, "after_rollback")
+def _drop_pending_bumps(session: Session) -> None:
+    session.info.pop(_PENDING_BUMPS, None)
+
+
+class SnapshotCache:
+    """Whole-payload cache keyed by request parameters.
+
+    A snapshot is served only while the dataset version is unchanged and it
+    was built today, since overdue figures depend on `date.today()`.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.hits = 0
+        self.misses = 0
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, db: Session, key):
+        """Return `(value, version)`; value is None on a miss.
+
+        Build the replacement payload after calling this and store it under
+        the returned version, so a write that lands mid-build is not masked.
+        """
+        return self._lookup(key, current_version(db, self.name))
+
+    async def get_async(self, db: AsyncSession, key):
+        """`get` for the async endpoints."""
+        return self._lookup(key, await current_version_async(db, self.name))
+
+    def _lookup(self, key, version: int):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] == version and entry[1] == date.today():
+                self.hits += 1
+                CACHE_REQUESTS.labels(self.name, "hit").inc()
+                return entry[2], version
+            self.misses += 1
+        CACHE_REQUESTS.labels(self.name, "miss").inc()
+        return None, version
+
+    def put(self, key, version: int, value) -> None:
+        with self._lock:
+            self._entries[key] = (version, date.today(), value)
+
+    def invalidate(self, db: Session) -> None:
+        """Drop local snapshots and bump the shared version in `db`'s transaction."""
+        bump_version(db, self.name)
+        with self._lock:
+            self._entries.clear()
+
+    def clear(self) -> None:
+        """Drop this process's snapshots only."""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+            "entries": len(self._entries),
+        }
+
+
+class TTLCache:
+    """Small thread-safe LRU whose entries carry their own expiry time."""
+
+    def __init__(self, name: str, maxsize: int):
+        self.name = name
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._version = None
+        self._version_checked_at = float("-inf")
+
+    def sync_version(self, db: Session, name: str, interval: float) -> None:
+        """Clear the cache if `name`'s shared version moved since it was last seen.
+
+        The version is looked up at most once per `interval` seconds, so an
+        entry can outlive a change made by another process by that long.
+        """
+        now = time.monotonic()
+        if now - self._version_checked_at < interval:
+            return
+        version = current_version(db, name)
+        with self._lock:
+            self._version_checked_at = now
+            if version != self._version:
+                self._version = version
+                self._entries.clear()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= time.time():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                CACHE_REQUESTS.labels(self.name, "miss").inc()
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            CACHE_REQUESTS.labels(self.name, "hit").inc()
+            return entry[1]
+
+    def set(self, key, value, expires_at: float) -> None:
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+            "entries": len(self._entries),
+        }
+
+
+dashboard_cache = SnapshotCache("dashboard")
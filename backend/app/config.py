@@ -10,6 +10,45 @@ class Settings(BaseSettings):
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 480  # 8 hours
     CORS_ORIGINS: str = "*"  # Comma-separated origins, or * for all
     MAX_UPLOAD_MB: int = 5
+    # Streaming import (?stream=true): size cap, rows per committed chunk, and errors kept in the result
+    MAX_STREAM_UPLOAD_MB: int = 500
+    IMPORT_CHUNK_ROWS: int = 5000
+    IMPORT_MAX_ERRORS: int = 1000
+    # Background imports (?async=true): worker threads per process
+    IMPORT_WORKERS: int = 2
+    # A queued or running background import whose row has not been updated for this long is
+    # reported failed when polled (its worker process restarted or died)
+    IMPORT_JOB_STALE_SECONDS: int = 900
+    # Request-time imports running at once per process (also the parse process pool size)
+    IMPORT_CONCURRENCY: int = 2
+    # Verified-principal cache in get_current_user; entries never outlive the token's exp.
+    # Changing or deleting a user through the ORM bumps the "users" cache version, and each
+    # process drops its cached principals once it sees the bump. It checks at most every
+    # AUTH_CACHE_VERSION_CHECK_SECONDS (one primary-key lookup), so that is how long another
+    # process may keep serving the old role (set 0 to check on every request).
+    AUTH_CACHE_SIZE: int = 1024
+    AUTH_CACHE_TTL_SECONDS: int = 300
+    AUTH_CACHE_VERSION_CHECK_SECONDS: int = 5
+    # Build the principal from the token's sub/role/name claims instead of loading the user row;
+    # a role change then only takes effect once the user's existing tokens expire
+    AUTH_TRUST_TOKEN_CLAIMS: bool = False
+    # Client search results returned when the request gives no limit
+    CLIENT_SEARCH_LIMIT: int = 50
+    # Read replica for the dashboard, listings and reports (empty: read from DATABASE_URL).
+    # After a write the same browser reads from the primary for READ_YOUR_WRITES_SECONDS.
+    READ_DATABASE_URL: str = ""
+    READ_YOUR_WRITES_SECONDS: int = 10
+    # Serve the read endpoints (dashboard, client/invoice lists, reports) from async
+    # handlers on an asyncio psycopg engine; Postgres only. The pool is its own,
+    # on top of the sync engine's 5 + 10 connections.
+    ASYNC_DATABASE: bool = False
+    ASYNC_POOL_SIZE: int = 10
+    ASYNC_MAX_OVERFLOW: int = 10
+    # Queries at least this slow are logged with the route that ran them
+    SLOW_QUERY_MS: int = 200
+    # Reminders (app.reminders): sign-off line, and tries before send_reminders.py gives up on one
+    REMINDER_SIGNATURE: str = "DTDC Franchise"
+    REMINDER_MAX_ATTEMPTS: int = 3
 
     class Config:
         env_file = ".env"
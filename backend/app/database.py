@@ -1,17 +1,153 @@
-from sqlalchemy import create_engine
+import logging
+import time
+from contextvars import ContextVar
+from typing import Optional
+
+from fastapi import Request
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
 from app.config import settings
+from app.metrics import POOL_CHECKED_OUT, POOL_OVERFLOW, POOL_WAITERS
+
+logger = logging.getLogger(__name__)
+
+
+class QueryStats:
+    """SQL work done on behalf of one request (see app/timing.py)."""
+
+    def __init__(self, scope: Optional[dict] = None):
+        self.scope = scope or {}
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.pool_wait_seconds = 0.0
+
+    @property
+    def route(self) -> str:
+        # The matched route template once routing has run, else the raw path
+        route = self.scope.get("route")
+        path = getattr(route, "path", None) or self.scope.get("path", "-")
+        return f"{self.scope.get('method', '')} {path}".strip()
+
+
+# Set per request by the timing middleware; None outside requests (e.g. import jobs)
+request_stats: ContextVar[Optional[QueryStats]] = ContextVar("request_stats", default=None)
+
+
+class _TimedPool:
+    """Pool mixin that charges time spent waiting for a connection to the current request
+    and keeps the pool gauges in app/metrics.py current."""
+
+    label = "sync"
+
+    def _do_get(self):
+        start = time.perf_counter()
+        POOL_WAITERS.labels(self.label).inc()
+        try:
+            return super()._do_get()
+        finally:
+            POOL_WAITERS.labels(self.label).dec()
+            self._update_gauges()
+            stats = request_stats.get()
+            if stats is not None:
+                stats.pool_wait_seconds += time.perf_counter() - start
+
+    def _do_return_conn(self, record):
+        super()._do_return_conn(record)
+        self._update_gauges()
+
+    def _update_gauges(self):
+        POOL_CHECKED_OUT.labels(self.label).set(self.checkedout())
+        POOL_OVERFLOW.labels(self.label).set(max(self.overflow(), 0))
+
+
+class TimedQueuePool(_TimedPool, QueuePool):
+    pass
+
+
+class TimedReadQueuePool(_TimedPool, QueuePool):
+    label = "read"
+
+
+class TimedAsyncQueuePool(_TimedPool, AsyncAdaptedQueuePool):
+    label = "async"
+
+
+class TimedAsyncReadQueuePool(_TimedPool, AsyncAdaptedQueuePool):
+    label = "async-read"
+
+
+def _connect_args(url: str) -> dict:
+    # prepare_threshold=0 keeps psycopg off server-side prepared statements (Neon's pooler)
+    return {"prepare_threshold": 0} if url.startswith("postgresql+psycopg") else {}
+
 
 engine = create_engine(
     settings.DATABASE_URL,
+    poolclass=TimedQueuePool,
     pool_pre_ping=True,
     pool_size=5,
     max_overflow=10,
-    connect_args={"prepare_threshold": 0},
+    connect_args=_connect_args(settings.DATABASE_URL),
 )
+
+if engine.dialect.name == "sqlite":
+    # Local/test databases: enforce the ON DELETE CASCADE foreign keys like Postgres does
+    @event.listens_for(engine, "connect")
+    def _sqlite_foreign_keys(dbapi_connection, _record):
+        dbapi_connection.execute("PRAGMA foreign_keys=ON")
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    # On the statement's own execution context, so a statement that raises leaves nothing behind
+    if context is not None:
+        context.query_start = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    start = getattr(context, "query_start", None)
+    if start is None:
+        return
+    elapsed = time.perf_counter() - start
+    stats = request_stats.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.db_seconds += elapsed
+    if elapsed * 1000 >= settings.SLOW_QUERY_MS:
+        logger.warning(
+            "Slow query (%.1f ms) on %s: %s",
+            elapsed * 1000, stats.route if stats else "background", " ".join(statement.split()),
+        )
+
+
+def _time_queries(sync_engine) -> None:
+    event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+
+
+_time_queries(engine)
+
+# Optional read replica (READ_DATABASE_URL) for the read-only endpoints; the primary otherwise
+read_engine = engine
+if settings.READ_DATABASE_URL:
+    read_engine = create_engine(
+        settings.READ_DATABASE_URL,
+        poolclass=TimedReadQueuePool,
+        pool_pre_ping=True,
+        pool_size=5,
+        max_overflow=10,
+        connect_args=_connect_args(settings.READ_DATABASE_URL),
+    )
+    _time_queries(read_engine)
+
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
 Base = declarative_base()
 
+# Set by app.replica.ReadYourWritesMiddleware on write responses
+READ_PRIMARY_COOKIE = "read_primary"
+
 
 def get_db():
     db = SessionLocal()
@@ -19,3 +155,62 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+def read_sessionmaker(request: Request) -> sessionmaker:
+    """Sessions for a read-only request: the replica, or the primary right after this client wrote."""
+    return SessionLocal if request.cookies.get(READ_PRIMARY_COOKIE) else ReadSessionLocal
+
+
+def get_read_db(request: Request):
+    """Like `get_db`, for endpoints that only read."""
+    db = read_sessionmaker(request)()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+# Opt-in asyncio stack (ASYNC_DATABASE, Postgres + psycopg only) for the async read endpoints
+async_engine = None
+AsyncSessionLocal = None
+AsyncReadSessionLocal = None
+if settings.ASYNC_DATABASE:
+    async_engine = create_async_engine(
+        settings.DATABASE_URL,
+        poolclass=TimedAsyncQueuePool,
+        pool_pre_ping=True,
+        pool_size=settings.ASYNC_POOL_SIZE,
+        max_overflow=settings.ASYNC_MAX_OVERFLOW,
+        connect_args=_connect_args(settings.DATABASE_URL),
+    )
+    _time_queries(async_engine.sync_engine)
+    AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+    AsyncReadSessionLocal = AsyncSessionLocal
+    if settings.READ_DATABASE_URL:
+        async_read_engine = create_async_engine(
+            settings.READ_DATABASE_URL,
+            poolclass=TimedAsyncReadQueuePool,
+            pool_pre_ping=True,
+            pool_size=settings.ASYNC_POOL_SIZE,
+            max_overflow=settings.ASYNC_MAX_OVERFLOW,
+            connect_args=_connect_args(settings.READ_DATABASE_URL),
+        )
+        _time_queries(async_read_engine.sync_engine)
+        AsyncReadSessionLocal = async_sessionmaker(async_read_engine, autoflush=False, expire_on_commit=False)
+
+
+async def get_async_db():
+    if AsyncSessionLocal is None:
+        raise RuntimeError("Set ASYNC_DATABASE=true to use the async database session")
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+async def get_async_read_db(request: Request):
+    """`get_read_db` for the async endpoints."""
+    if AsyncReadSessionLocal is None:
+        raise RuntimeError("Set ASYNC_DATABASE=true to use the async database session")
+    factory = AsyncSessionLocal if request.cookies.get(READ_PRIMARY_COOKIE) else AsyncReadSessionLocal
+    async with factory() as db:
+        yield db
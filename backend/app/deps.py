@@ -1,28 +1,61 @@
+import hashlib
+import time
+
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.orm import Session
 
 from app.database import get_db
 from app.auth import decode_token
+from app.cache import USERS_VERSION, TTLCache
+from app.config import settings
 from app.models import User
 
 security = HTTPBearer()
 
+# Verified principals keyed by token hash, so repeat requests skip JWT decoding and the user lookup
+principal_cache = TTLCache("auth_principal", maxsize=settings.AUTH_CACHE_SIZE)
+
+
+def _token_key(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+def _principal(user_id, username: str, role: str, full_name: str) -> User:
+    # Transient copy: safe to share across requests and sessions
+    return User(id=user_id, username=username, role=role, full_name=full_name)
+
 
 def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
     db: Session = Depends(get_db),
 ) -> User:
     token = credentials.credentials
+    key = _token_key(token)
+    principal_cache.sync_version(db, USERS_VERSION, settings.AUTH_CACHE_VERSION_CHECK_SECONDS)
+    cached = principal_cache.get(key)
+    if cached is not None:
+        return cached
+
     payload = decode_token(token)
     if payload is None:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid or expired token")
     username: str = payload.get("sub")
     if username is None:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token payload")
-    user = db.query(User).filter(User.username == username).first()
-    if user is None:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found")
+
+    if settings.AUTH_TRUST_TOKEN_CLAIMS and payload.get("role"):
+        user = _principal(None, username, payload["role"], payload.get("name", username))
+    else:
+        row = db.query(User).filter(User.username == username).first()
+        if row is None:
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found")
+        user = _principal(row.id, row.username, row.role, row.full_name)
+
+    expires_at = time.time() + settings.AUTH_CACHE_TTL_SECONDS
+    if payload.get("exp"):
+        expires_at = min(expires_at, float(payload["exp"]))
+    principal_cache.set(key, user, expires_at)
     return user
 
 
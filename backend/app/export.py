@@ -0,0 +1,88 @@
+"""Streaming report export.
+
+Rows are read through a server-side cursor (`yield_per`) on a session owned
+by the response body, since the request's session is closed before a
+StreamingResponse starts sending. CSV and NDJSON bytes go out as each batch
+of rows arrives. XLSX is written with openpyxl's write-only mode, which
+spools rows to disk rather than building the workbook in memory; the file is
+then streamed, because an xlsx archive cannot be sent before it is finished.
+"""
+import csv
+import io
+import json
+import tempfile
+
+from app.database import SessionLocal
+
+EXPORT_FORMATS = {
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+}
+
+# Rows fetched per round trip from the server-side cursor, and per chunk sent
+STREAM_BATCH = 1000
+
+
+def _iter_rows(stmt, to_row, session_factory):
+    db = session_factory()
+    try:
+        for row in db.execute(stmt.execution_options(yield_per=STREAM_BATCH)):
+            yield to_row(row)
+    finally:
+        db.close()
+
+
+def _csv_chunks(records, columns):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=columns)
+    writer.writeheader()
+    for i, record in enumerate(records, 1):
+        writer.writerow(record)
+        if i % STREAM_BATCH == 0:
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode()
+
+
+def _ndjson_chunks(records):
+    lines = []
+    for record in records:
+        lines.append(json.dumps(record, default=str))
+        if len(lines) >= STREAM_BATCH:
+            yield ("\n".join(lines) + "\n").encode()
+            lines = []
+    if lines:
+        yield ("\n".join(lines) + "\n").encode()
+
+
+def _xlsx_chunks(records, columns):
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet("Report")
+    sheet.append(columns)
+    for record in records:
+        sheet.append([record[c] for c in columns])
+    with tempfile.TemporaryFile() as output:
+        workbook.save(output)
+        output.seek(0)
+        while chunk := output.read(64 * 1024):
+            yield chunk
+
+
+def stream_export(stmt, columns: list, to_row, fmt: str, session_factory=SessionLocal):
+    """Return `(byte iterator, media type)` for a report statement.
+
+    `to_row` turns a result row into a dict keyed by `columns`; rows are read
+    through a session from `session_factory`.
+    """
+    records = _iter_rows(stmt, to_row, session_factory)
+    if fmt == "csv":
+        body = _csv_chunks(records, columns)
+    elif fmt == "ndjson":
+        body = _ndjson_chunks(records)
+    else:
+        body = _xlsx_chunks(records, columns)
+    return body, EXPORT_FORMATS[fmt]
@@ -0,0 +1,208 @@
+"""Where invoice imports run, off the event loop.
+
+Request-time imports parse in a process pool (`parse_in_process`) and do DB
+work in the threadpool, at most IMPORT_CONCURRENCY at a time per process
+(`import_slot`).
+
+Background imports (`submit_import_job`) save the upload to a temporary file
+and run the streaming importer on a worker thread. Progress is written to
+`import_jobs` in the same transaction as each committed chunk, so any worker
+process can report it. The jobs live in the memory of the process that
+accepted them: if it dies, `fail_if_stale` marks them failed once their row
+has gone IMPORT_JOB_STALE_SECONDS without an update.
+"""
+import asyncio
+import json
+import logging
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from sqlalchemy import or_, update
+from sqlalchemy.orm import Session
+
+from app.cache import dashboard_cache
+from app.config import settings
+from app.database import SessionLocal
+from app.importer import ImportFormatError, iter_frames, import_stream, parse_upload
+from app.metrics import observe_import
+from app.models import ImportJob
+from app.schemas import ImportJobOut, ImportResult
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_parse_pool = None
+_import_slots = asyncio.Semaphore(settings.IMPORT_CONCURRENCY)
+
+
+def import_slot() -> asyncio.Semaphore:
+    """Bounds simultaneous request-time imports in this process; use with `async with`."""
+    return _import_slots
+
+
+async def parse_in_process(content: bytes, filename: str):
+    """Run `parse_upload` in the parse process pool."""
+    global _parse_pool
+    if _parse_pool is None:
+        # spawn, not fork: the parent has DB connections and threads
+        _parse_pool = ProcessPoolExecutor(
+            max_workers=settings.IMPORT_CONCURRENCY,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_parse_pool, parse_upload, content, filename)
+
+
+def _job_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=settings.IMPORT_WORKERS, thread_name_prefix="import")
+    return _executor
+
+
+def shutdown_import_pools() -> None:
+    global _executor, _parse_pool
+    # Both pools are recreated on next use if the app starts up again in this process (tests)
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+    if _parse_pool is not None:
+        _parse_pool.shutdown(wait=False, cancel_futures=True)
+        _parse_pool = None
+
+
+def _record_progress(job: ImportJob, result: ImportResult) -> None:
+    job.rows_processed = result.total_rows
+    job.imported = result.imported
+    job.duplicates = result.duplicates
+    job.error_count = result.error_count
+    job.new_clients_created = result.new_clients_created
+    job.errors = json.dumps(result.errors)
+
+
+def _run_job(job_id, path: str, filename: str, auto_create_clients: bool) -> None:
+    db = SessionLocal()
+    try:
+        job = db.get(ImportJob, job_id)
+        if job is None or job.status != "queued":
+            # Given up on as stale while it waited for a worker
+            return
+        job.status = "running"
+        job.started_at = datetime.utcnow()
+        db.commit()
+
+        started = time.perf_counter()
+        # The job id doubles as the batch id, so a finished job can be undone
+        result = ImportResult(batch_id=job.id)
+
+        def on_chunk(chunk_db: Session) -> None:
+            dashboard_cache.invalidate(chunk_db)
+            _record_progress(job, result)
+
+        with open(path, "rb") as fileobj:
+            frames = iter_frames(fileobj, filename, settings.IMPORT_CHUNK_ROWS)
+            try:
+                import_stream(db, frames, auto_create_clients, result, on_chunk)
+            finally:
+                frames.close()
+
+        _record_progress(job, result)
+        job.status = "done"
+        job.finished_at = datetime.utcnow()
+        db.commit()
+        observe_import("background", result.total_rows, started)
+    except Exception as e:
+        if isinstance(e, ImportFormatError):
+            logger.warning("Import job %s rejected: %s", job_id, e)
+        else:
+            logger.exception("Import job %s failed", job_id)
+        db.rollback()
+        job = db.get(ImportJob, job_id)
+        if job is not None:
+            job.status = "failed"
+            job.detail = str(e)
+            job.finished_at = datetime.utcnow()
+            db.commit()
+    finally:
+        db.close()
+        os.unlink(path)
+
+
+def submit_import_job(db: Session, fileobj, filename: str, auto_create_clients: bool, username: str) -> ImportJob:
+    """Copy the upload to a temp file, record a queued job and hand it to the worker pool."""
+    suffix = os.path.splitext(filename)[1]
+    with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp:
+        shutil.copyfileobj(fileobj, tmp)
+    job = ImportJob(filename=filename, created_by=username)
+    db.add(job)
+    db.commit()
+    db.refresh(job)
+    _job_executor().submit(_run_job, job.id, tmp.name, filename, auto_create_clients)
+    return job
+
+
+def fail_if_stale(db: Session, job: ImportJob) -> None:
+    """Mark an unfinished `job` failed if its row has not been updated for IMPORT_JOB_STALE_SECONDS.
+
+    Background jobs run in the memory of the process that accepted them, so
+    a restart or crash leaves them queued or running forever otherwise.
+    """
+    if job.status not in ("queued", "running"):
+        return
+    now = datetime.utcnow()
+    cutoff = now - timedelta(seconds=settings.IMPORT_JOB_STALE_SECONDS)
+    if job.updated_at is not None and job.updated_at >= cutoff:
+        return
+    # Conditional, so a worker that reports progress meanwhile keeps its job
+    db.execute(
+        update(ImportJob)
+        .where(
+            ImportJob.id == job.id,
+            ImportJob.status.in_(("queued", "running")),
+            or_(ImportJob.updated_at.is_(None), ImportJob.updated_at < cutoff),
+        )
+        .values(
+            status="failed",
+            detail="Import stopped: the server processing it restarted. Please upload the file again.",
+            finished_at=now,
+            updated_at=now,
+        )
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+    db.refresh(job)
+
+
+def job_out(job: ImportJob) -> ImportJobOut:
+    errors = json.loads(job.errors) if job.errors else []
+    elapsed = 0.0
+    if job.started_at:
+        elapsed = ((job.finished_at or datetime.utcnow()) - job.started_at).total_seconds()
+    out = ImportJobOut(
+        id=job.id,
+        filename=job.filename,
+        status=job.status,
+        rows_processed=job.rows_processed,
+        imported=job.imported,
+        duplicates=job.duplicates,
+        error_count=job.error_count,
+        errors=errors,
+        elapsed_seconds=round(elapsed, 3),
+        detail=job.detail,
+    )
+    if job.status == "done":
+        out.result = ImportResult(
+            total_rows=job.rows_processed,
+            imported=job.imported,
+            duplicates=job.duplicates,
+            errors=errors,
+            error_count=job.error_count,
+            new_clients_created=job.new_clients_created,
+            batch_id=job.id if job.imported else None,
+        )
+    return out
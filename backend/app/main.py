@@ -6,34 +6,32 @@ from slowapi import Limiter, _rate_limit_exceeded_handler
 from slowapi.util import get_remote_address
 from slowapi.errors import RateLimitExceeded
 
-from app.database import engine, Base, SessionLocal
 from app.models import User
 from app.auth import hash_password
 from app.config import settings
-from app.routers import auth_router, clients, invoices, payments, dashboard, reports
+from app.import_jobs import shutdown_import_pools
+from app.schema import check_schema_version
+from app.replica import ReadYourWritesMiddleware
+from app.timing import SQLTimingMiddleware
+from app import metrics
+from app.routers import auth_router, clients, invoices, payments, dashboard, reports, reminders
 
 limiter = Limiter(key_func=get_remote_address)
 
 
 import logging
+import threading
 
 logger = logging.getLogger(__name__)
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    # Create tables gracefully
-    try:
-        Base.metadata.create_all(bind=engine)
-    except Exception as e:
-        logger.error(f"Failed to connect to database or create tables on startup: {e}")
-        
-    db = SessionLocal()
-    try:
-        # Tables are created above
-        pass
-    finally:
-        db.close()
+    # The schema is managed by Alembic. Check its version on a side thread so a
+    # slow or unreachable database cannot hold up the first request.
+    threading.Thread(target=check_schema_version, name="schema-check", daemon=True).start()
     yield
+    shutdown_import_pools()
+    metrics.mark_process_dead()
 
 
 app = FastAPI(
@@ -58,30 +56,46 @@ app.add_middleware(
     allow_credentials=True if origins != ["*"] else False,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Total-Count", "X-Next-Cursor", "Server-Timing"],
 )
+app.add_middleware(ReadYourWritesMiddleware)
+app.add_middleware(SQLTimingMiddleware)
+app.add_middleware(metrics.MetricsMiddleware)
 
 from fastapi import APIRouter
 
 api_router = APIRouter(prefix="/api")
 
+if settings.ASYNC_DATABASE:
+    # First match wins, so these take over the GET routes they share with the sync routers
+    for module in (dashboard, clients, invoices, reports):
+        api_router.include_router(module.async_router)
+
 api_router.include_router(auth_router.router)
 api_router.include_router(clients.router)
 api_router.include_router(invoices.router)
 api_router.include_router(payments.router)
 api_router.include_router(dashboard.router)
 api_router.include_router(reports.router)
+api_router.include_router(reminders.router)
 
 app.include_router(api_router)
 
 
 import os
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, Response
 
 @app.get("/health")
 def health():
     return {"status": "ok"}
 
+
+@app.get("/metrics", include_in_schema=False)
+def prometheus_metrics():
+    body, content_type = metrics.render()
+    return Response(body, media_type=content_type)
+
 # Serve the static files from the build directory
 static_dir = os.path.join(os.path.dirname(__file__), "..", "static")
 if os.path.isdir(static_dir):
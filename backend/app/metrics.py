@@ -0,0 +1,105 @@
+"""Prometheus metrics, served at /metrics.
+
+With several uvicorn workers, set PROMETHEUS_MULTIPROC_DIR to an empty
+directory before starting (the Dockerfile does): each process then writes its
+samples there and /metrics aggregates all of them, whichever worker answers.
+Without it, /metrics reports the answering process only.
+
+Cache hit ratios are exported as hit/miss counters (`cache_requests_total`),
+since ratios cannot be summed across processes; chart them as
+`rate(cache_requests_total{result="hit"}[5m]) / rate(cache_requests_total[5m])`.
+"""
+import os
+import time
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+)
+from prometheus_client import multiprocess
+
+MULTIPROCESS = bool(os.environ.get("PROMETHEUS_MULTIPROC_DIR"))
+
+REQUESTS = Counter("http_requests_total", "HTTP requests by route and status", ["method", "route", "status"])
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route",
+    ["method", "route"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+
+# pool="sync" is the engine behind get_db, pool="async" the ASYNC_DATABASE engine
+POOL_CHECKED_OUT = Gauge(
+    "db_pool_checked_out", "Connections currently checked out", ["pool"], multiprocess_mode="livesum"
+)
+POOL_OVERFLOW = Gauge("db_pool_overflow", "Connections open beyond pool_size", ["pool"], multiprocess_mode="livesum")
+POOL_WAITERS = Gauge(
+    "db_pool_waiters", "Threads or tasks waiting to check out a connection", ["pool"], multiprocess_mode="livesum"
+)
+
+IMPORT_ROWS = Counter("invoice_import_rows_total", "Invoice upload rows processed", ["mode"])
+IMPORT_ROWS_PER_SECOND = Histogram(
+    "invoice_import_rows_per_second",
+    "Throughput of each completed invoice import",
+    ["mode"],
+    buckets=(100, 500, 1000, 2500, 5000, 10000, 25000, 50000, 100000),
+)
+
+CACHE_REQUESTS = Counter("cache_requests_total", "Cache lookups by result", ["cache", "result"])
+
+
+def observe_import(mode: str, rows: int, started: float) -> None:
+    """Record a finished import of `rows` rows that began at `time.perf_counter()` value `started`."""
+    elapsed = time.perf_counter() - started
+    IMPORT_ROWS.labels(mode).inc(rows)
+    if rows and elapsed > 0:
+        IMPORT_ROWS_PER_SECOND.labels(mode).observe(rows / elapsed)
+
+
+def render() -> tuple[bytes, str]:
+    if MULTIPROCESS:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+
+def mark_process_dead() -> None:
+    """Drop this process's live gauges from the shared directory (call on shutdown)."""
+    if MULTIPROCESS:
+        multiprocess.mark_process_dead(os.getpid())
+
+
+class MetricsMiddleware:
+    """Counts requests and times them, labelled by the matched route template."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            # Unmatched paths share one label so scanners cannot blow up cardinality
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            REQUESTS.labels(scope["method"], route, str(status)).inc()
+            REQUEST_LATENCY.labels(scope["method"], route).observe(time.perf_counter() - start)
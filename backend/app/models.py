@@ -2,9 +2,8 @@ import uuid
 from datetime import datetime
 
 from sqlalchemy import (
-    Column, String, Numeric, Date, DateTime, ForeignKey, Text
+    Column, String, Numeric, Date, DateTime, ForeignKey, Text, Index, BigInteger, Integer, Uuid, func, text
 )
-from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 
 from app.database import Base
@@ -13,7 +12,7 @@ from app.database import Base
 class User(Base):
     __tablename__ = "users"
 
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    id = Column(Uuid, primary_key=True, default=uuid.uuid4)
     username = Column(String(50), unique=True, nullable=False, index=True)
     hashed_password = Column(String(255), nullable=False)
     full_name = Column(String(100), nullable=False)
@@ -24,7 +23,7 @@ class User(Base):
 class Client(Base):
     __tablename__ = "clients"
 
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    id = Column(Uuid, primary_key=True, default=uuid.uuid4)
     company_name = Column(String(200), nullable=False, index=True)
     contact_person = Column(String(100), nullable=True)
     phone = Column(String(20), nullable=True)
@@ -32,33 +31,128 @@ class Client(Base):
     credit_limit = Column(Numeric(12, 2), nullable=False, default=0)
     created_at = Column(DateTime, default=datetime.utcnow)
 
-    invoices = relationship("Invoice", back_populates="client", cascade="all, delete-orphan")
+    # passive_deletes: the ON DELETE CASCADE foreign keys remove children, not the ORM
+    invoices = relationship("Invoice", back_populates="client", cascade="all, delete-orphan", passive_deletes=True)
+
+
+# Case-insensitive name lookups (importer client matching)
+Index("ix_clients_lower_company_name", func.lower(Client.company_name))
+# Client search (app.search), Postgres only: prefix LIKE and pg_trgm word similarity
+Index(
+    "ix_clients_lower_company_name_prefix",
+    func.lower(Client.company_name).label("lower_company_name"),
+    postgresql_ops={"lower_company_name": "text_pattern_ops"},
+).ddl_if(dialect="postgresql")
+Index(
+    "ix_clients_company_name_trgm",
+    func.lower(Client.company_name).label("lower_company_name"),
+    postgresql_using="gin",
+    postgresql_ops={"lower_company_name": "gin_trgm_ops"},
+).ddl_if(dialect="postgresql")
+
+
+def _default_outstanding(context):
+    """A new invoice starts with nothing paid, so outstanding is the full amount."""
+    return context.get_current_parameters()["total_amount"]
 
 
 class Invoice(Base):
     __tablename__ = "invoices"
-
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    client_id = Column(UUID(as_uuid=True), ForeignKey("clients.id", ondelete="CASCADE"), nullable=False)
+    __table_args__ = (
+        # Keyset pagination order for the invoice list
+        Index("ix_invoices_invoice_date_id", "invoice_date", "id"),
+        # A client's invoices, and their overdue ones; also serves plain client_id lookups
+        Index("ix_invoices_client_id_due_date", "client_id", "due_date"),
+    )
+
+    id = Column(Uuid, primary_key=True, default=uuid.uuid4)
+    client_id = Column(Uuid, ForeignKey("clients.id", ondelete="CASCADE"), nullable=False)
     invoice_number = Column(String(50), unique=True, nullable=False, index=True)
     invoice_date = Column(Date, nullable=False)
-    due_date = Column(Date, nullable=False)
+    due_date = Column(Date, nullable=False, index=True)
     total_amount = Column(Numeric(12, 2), nullable=False)
+    # Maintained balance, kept in step with payments by app.balances
+    paid_amount = Column(Numeric(12, 2), nullable=False, default=0, server_default="0")
+    outstanding = Column(Numeric(12, 2), nullable=False, default=_default_outstanding)
+    status = Column(String(10), nullable=False, default="Unpaid", server_default="Unpaid", index=True)  # Paid | Partial | Unpaid
+    # ImportResult.batch_id of the upload that created the invoice; NULL if entered by hand
+    import_batch_id = Column(Uuid, nullable=True, index=True)
     created_at = Column(DateTime, default=datetime.utcnow)
 
     client = relationship("Client", back_populates="invoices")
-    payments = relationship("Payment", back_populates="invoice", cascade="all, delete-orphan")
+    payments = relationship("Payment", back_populates="invoice", cascade="all, delete-orphan", passive_deletes=True)
 
 
 class Payment(Base):
     __tablename__ = "payments"
 
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    invoice_id = Column(UUID(as_uuid=True), ForeignKey("invoices.id", ondelete="CASCADE"), nullable=False)
+    id = Column(Uuid, primary_key=True, default=uuid.uuid4)
+    invoice_id = Column(Uuid, ForeignKey("invoices.id", ondelete="CASCADE"), nullable=False, index=True)
     amount = Column(Numeric(12, 2), nullable=False)
-    payment_date = Column(Date, nullable=False)
+    payment_date = Column(Date, nullable=False, index=True)
     payment_mode = Column(String(50), nullable=True)  # Cash, UPI, Bank Transfer, Cheque
     remarks = Column(Text, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
 
     invoice = relationship("Invoice", back_populates="payments")
+
+
+class ImportJob(Base):
+    """Progress of a background invoice import, readable from any worker process."""
+    __tablename__ = "import_jobs"
+
+    id = Column(Uuid, primary_key=True, default=uuid.uuid4)
+    filename = Column(String(255), nullable=False)
+    status = Column(String(20), nullable=False, default="queued")  # queued | running | done | failed
+    rows_processed = Column(Integer, nullable=False, default=0)
+    imported = Column(Integer, nullable=False, default=0)
+    duplicates = Column(Integer, nullable=False, default=0)
+    error_count = Column(Integer, nullable=False, default=0)
+    new_clients_created = Column(Integer, nullable=False, default=0)
+    errors = Column(Text, nullable=True)  # JSON list, capped at IMPORT_MAX_ERRORS
+    detail = Column(Text, nullable=True)  # failure reason
+    created_by = Column(String(50), nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+    # Touched by every progress write; a stale value means the worker is gone
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class ReminderOutbox(Base):
+    """Rendered payment reminders waiting for send_reminders.py to deliver them."""
+    __tablename__ = "reminder_outbox"
+    __table_args__ = (
+        # The sender's queue: pending rows, oldest first
+        Index("ix_reminder_outbox_status_created_at", "status", "created_at"),
+        # At most one pending reminder per client and channel
+        Index(
+            "uq_reminder_outbox_pending", "client_id", "channel", unique=True,
+            postgresql_where=text("status = 'pending'"), sqlite_where=text("status = 'pending'"),
+        ),
+    )
+
+    id = Column(Uuid, primary_key=True, default=uuid.uuid4)
+    client_id = Column(Uuid, ForeignKey("clients.id", ondelete="CASCADE"), nullable=False, index=True)
+    channel = Column(String(10), nullable=False)  # whatsapp | email
+    recipient = Column(String(100), nullable=False)  # phone digits or email address
+    subject = Column(String(200), nullable=True)
+    body = Column(Text, nullable=False)
+    link = Column(Text, nullable=False)  # wa.me / mailto: link carrying the same message
+    invoice_count = Column(Integer, nullable=False)
+    outstanding = Column(Numeric(12, 2), nullable=False)
+    status = Column(String(10), nullable=False, default="pending")  # pending | sent | failed
+    attempts = Column(Integer, nullable=False, default=0)
+    error = Column(Text, nullable=True)
+    created_by = Column(String(50), nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    sent_at = Column(DateTime, nullable=True)
+
+
+class CacheVersion(Base):
+    """Write counter per cached dataset; lets every worker process spot stale snapshots."""
+    __tablename__ = "cache_versions"
+
+    name = Column(String(50), primary_key=True)
+    version = Column(BigInteger, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -0,0 +1,320 @@
+"""Bank statement reconciliation.
+
+`reconcile_statement` turns the credit lines of a bank statement (CSV/XLSX)
+into payments:
+
+1. The statement is parsed with pandas column operations; debit lines are
+   skipped.
+2. All open invoices are loaded in one query into `OpenInvoiceIndex`, which
+   hashes them by normalized invoice number, by client name, and by
+   (client, outstanding amount).
+3. Each line's narration is split into words and every run of words is looked
+   up in those hashes, so matching costs a few dict lookups per word however
+   many invoices are open.
+4. Exact matches are applied with `apply_payments` (one locked batch). Lines
+   that match nothing, or more than one thing, come back for review with
+   their candidate invoices.
+
+A line is an exact match when it names one invoice and pays no more than its
+balance, names several invoices and pays exactly their combined balance, or
+names one client and pays exactly one open invoice's balance or the client's
+whole balance. A statement can be imported again safely: lines already
+recorded (payments with the same date and narration covering the amount) are
+counted as duplicates, not paid twice.
+
+pandas is imported on first use, as in app.importer.
+"""
+from __future__ import annotations
+
+import io
+import re
+from decimal import Decimal, InvalidOperation
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from app.balances import apply_payments
+from app.importer import LOOKUP_BATCH, ImportFormatError, match_columns, normalize_columns
+from app.models import Client, Invoice, Payment
+from app.schemas import PaymentOut, StatementCandidate, StatementImportResult, StatementReviewLine
+
+STATEMENT_COLUMN_ALIASES = {
+    "date": ["date", "txn date", "transaction date", "value date", "tran date", "posting date"],
+    "narration": ["narration", "description", "particulars", "details", "transaction details", "remarks"],
+    "credit": ["credit", "credit amount", "deposit", "deposits", "deposit amt", "deposit amount", "cr amount", "amount"],
+}
+DIRECTION_COLUMNS = ["cr/dr", "dr/cr", "type", "txn type"]
+REFERENCE_COLUMNS = ["reference", "ref no", "ref no.", "chq/ref no", "chq./ref.no.", "cheque no", "chq no", "utr"]
+
+# Statements often open with account details; the header is looked for in the first rows
+HEADER_SEARCH_ROWS = 30
+# Shorter invoice numbers would match stray numbers in narrations
+MIN_INVOICE_KEY_LENGTH = 4
+MAX_CANDIDATES = 5
+PAYMENT_MODE = "Bank Transfer"
+
+_WORD = re.compile(r"[0-9A-Za-z]+")
+CENT = Decimal("0.01")
+
+
+def invoice_key(number: str) -> str:
+    """Invoice number with case and separators dropped: 'inv/24-001' -> 'INV24001'."""
+    return "".join(_WORD.findall(number)).upper()
+
+
+def name_key(name: str) -> str:
+    return " ".join(_WORD.findall(name)).lower()
+
+
+def _amount(value) -> Decimal | None:
+    try:
+        amount = Decimal(str(value).replace(",", "").strip()).quantize(CENT)
+    except InvalidOperation:
+        return None
+    return amount if amount.is_finite() else None
+
+
+def parse_statement(content: bytes, filename: str) -> tuple:
+    """Read the credit lines of a statement.
+
+    Returns `(total_rows, lines, errors)`: `lines` are
+    `(row_num, date, text, amount)` tuples, where `text` is the narration
+    plus any reference column, and `errors` are messages for credit lines
+    without a usable date or amount.
+    """
+    if not filename.endswith((".csv", ".xlsx", ".xls")):
+        raise ImportFormatError("Unsupported file format. Use CSV or XLSX.")
+    import pandas as pd
+
+    try:
+        if filename.endswith(".csv"):
+            raw = pd.read_csv(io.BytesIO(content), header=None, dtype=str, skip_blank_lines=False)
+        else:
+            raw = pd.read_excel(io.BytesIO(content), header=None, dtype=str)
+    except Exception as e:
+        raise ImportFormatError(f"Failed to read file: {str(e)}")
+
+    df, header_at, matched = None, 0, None
+    for header_at in range(min(HEADER_SEARCH_ROWS, len(raw))):
+        df = raw.iloc[header_at + 1:]
+        df.columns = raw.iloc[header_at].fillna("").astype(str)
+        normalize_columns(df)
+        try:
+            matched = match_columns(df.columns, STATEMENT_COLUMN_ALIASES)
+            break
+        except ImportFormatError:
+            continue
+    if matched is None:
+        raise ImportFormatError(
+            f"Could not find the statement header. Looked for columns: {', '.join(STATEMENT_COLUMN_ALIASES)}"
+        )
+    # File row numbers, counting the header as in the invoice importer
+    row_num = pd.Series(range(header_at + 2, header_at + 2 + len(df)), index=df.index)
+
+    credit = pd.to_numeric(df[matched["credit"]].fillna("").str.replace(",", "").str.strip(), errors="coerce")
+    is_credit = credit.notna() & (credit > 0)
+    direction = next((c for c in DIRECTION_COLUMNS if c in df.columns), None)
+    if direction:
+        # Single amount column with a Cr/Dr marker
+        is_credit &= df[direction].fillna("").str.strip().str.lower().str.startswith("c")
+    dates = pd.to_datetime(df[matched["date"]], errors="coerce", format="mixed", dayfirst=True)
+    text = df[matched["narration"]].fillna("").str.strip()
+    reference = next((c for c in REFERENCE_COLUMNS if c in df.columns), None)
+    if reference:
+        text = (text + " " + df[reference].fillna("").str.strip()).str.strip()
+
+    bad_date = is_credit & dates.isna()
+    errors = {n: f"Row {n}: Invalid Date" for n in row_num[bad_date].tolist()}
+    keep = is_credit & ~bad_date
+    lines = []
+    for line in zip(
+        row_num[keep].tolist(),
+        dates[keep].dt.date.tolist(),
+        text[keep].tolist(),
+        [_amount(v) for v in df.loc[keep, matched["credit"]].tolist()],
+    ):
+        if line[3] is None:
+            # pandas reads "inf" and the like as numbers; Decimal amounts cannot hold them
+            errors[line[0]] = f"Row {line[0]}: Invalid Amount"
+        else:
+            lines.append(line)
+    return len(df), lines, [errors[n] for n in sorted(errors)]
+
+
+class OpenInvoiceIndex:
+    """Hash indexes over every invoice with a balance."""
+
+    def __init__(self, rows):
+        self.invoices = {}
+        self.by_number = {}
+        self.by_client = {}
+        self.by_client_amount = {}
+        self.clients_by_name = {}
+        self.client_names = {}
+        self.number_parts = 1
+        self.name_words = 1
+        # Oldest due first, so client candidates and whole-balance payments follow the ageing order
+        for row in sorted(rows, key=lambda r: (r.due_date, r.invoice_number)):
+            self.invoices[row.id] = row
+            key = invoice_key(row.invoice_number)
+            if len(key) >= MIN_INVOICE_KEY_LENGTH:
+                self.by_number.setdefault(key, []).append(row.id)
+                self.number_parts = max(self.number_parts, len(_WORD.findall(row.invoice_number)))
+            self.by_client.setdefault(row.client_id, []).append(row.id)
+            self.by_client_amount.setdefault((row.client_id, row.outstanding), []).append(row.id)
+            if row.client_id not in self.client_names:
+                self.client_names[row.client_id] = row.company_name
+                name = name_key(row.company_name or "")
+                if name:
+                    self.clients_by_name.setdefault(name, set()).add(row.client_id)
+                    self.name_words = max(self.name_words, len(name.split()))
+        self.remaining = {invoice_id: row.outstanding for invoice_id, row in self.invoices.items()}
+
+    def find(self, text: str) -> tuple:
+        """Invoice ids and client ids named in `text`, invoices in order of appearance."""
+        words = _WORD.findall(text)
+        upper = [w.upper() for w in words]
+        lower = [w.lower() for w in words]
+        invoice_ids, client_ids = {}, set()
+        for i in range(len(words)):
+            for n in range(1, min(self.number_parts, len(words) - i) + 1):
+                for invoice_id in self.by_number.get("".join(upper[i:i + n]), ()):
+                    invoice_ids.setdefault(invoice_id, None)
+            for n in range(1, min(self.name_words, len(words) - i) + 1):
+                client_ids.update(self.clients_by_name.get(" ".join(lower[i:i + n]), ()))
+        return list(invoice_ids), client_ids
+
+    def open_invoices(self, client_id) -> list:
+        return [i for i in self.by_client.get(client_id, ()) if self.remaining[i] > 0]
+
+    def candidate(self, invoice_id) -> StatementCandidate:
+        row = self.invoices[invoice_id]
+        return StatementCandidate(
+            invoice_id=invoice_id,
+            invoice_number=row.invoice_number,
+            client_name=row.company_name,
+            outstanding=self.remaining[invoice_id],
+        )
+
+    def match(self, text: str, amount: Decimal) -> tuple:
+        """Return `(allocations, reason, candidate ids)`.
+
+        `allocations` is a list of `(invoice_id, amount)` for an exact match,
+        else empty with `reason` saying why the line needs review.
+        """
+        invoice_ids, client_ids = self.find(text)
+        if invoice_ids:
+            if client_ids and not any(self.invoices[i].client_id in client_ids for i in invoice_ids):
+                return [], "Invoice number and client name refer to different clients", invoice_ids
+            open_ids = [i for i in invoice_ids if self.remaining[i] > 0]
+            if not open_ids:
+                return [], "Referenced invoice is already paid", invoice_ids
+            if len(open_ids) == 1:
+                if amount > self.remaining[open_ids[0]]:
+                    return [], "Amount exceeds the invoice's outstanding balance", open_ids
+                return [(open_ids[0], amount)], None, open_ids
+            if amount == sum(self.remaining[i] for i in open_ids):
+                return [(i, self.remaining[i]) for i in open_ids], None, open_ids
+            return [], "Several invoices referenced and the amount does not settle them exactly", open_ids
+
+        if not client_ids:
+            return [], "No invoice number or client name found", []
+        if len(client_ids) > 1:
+            ids = [i for c in client_ids for i in self.open_invoices(c)]
+            return [], "Narration names more than one client", ids
+        client_id = next(iter(client_ids))
+        open_ids = self.open_invoices(client_id)
+        exact = [i for i in self.by_client_amount.get((client_id, amount), ()) if self.remaining[i] == amount]
+        if len(exact) == 1:
+            return [(exact[0], amount)], None, exact
+        if open_ids and amount == sum(self.remaining[i] for i in open_ids):
+            return [(i, self.remaining[i]) for i in open_ids], None, open_ids
+        if exact:
+            return [], "Several open invoices of this client match the amount", exact
+        return [], "No open invoice of this client matches the amount", open_ids
+
+
+def _open_invoice_rows(db: Session) -> list:
+    return db.execute(
+        select(
+            Invoice.id,
+            Invoice.invoice_number,
+            Invoice.client_id,
+            Invoice.due_date,
+            Invoice.outstanding,
+            Client.company_name,
+        )
+        .outerjoin(Client, Invoice.client_id == Client.id)
+        .where(Invoice.outstanding > 0)
+    ).all()
+
+
+def _recorded_payments(db: Session, lines: list) -> dict:
+    """Amounts already recorded per (date, remarks) for these lines, from earlier imports."""
+    if not lines:
+        return {}
+    remarks = list({_remarks(text) for _, _, text, _ in lines})
+    first, last = min(line[1] for line in lines), max(line[1] for line in lines)
+    recorded = {}
+    for i in range(0, len(remarks), LOOKUP_BATCH):
+        for row in db.execute(
+            select(Payment.payment_date, Payment.remarks, func.sum(Payment.amount))
+            .where(Payment.remarks.in_(remarks[i:i + LOOKUP_BATCH]), Payment.payment_date.between(first, last))
+            .group_by(Payment.payment_date, Payment.remarks)
+        ):
+            recorded[(row[0], row[1])] = Decimal(row[2]).quantize(CENT)
+    return recorded
+
+
+def _remarks(text: str) -> str:
+    return text[:500]
+
+
+def reconcile_statement(db: Session, lines: list, result: StatementImportResult) -> None:
+    """Match parsed statement lines and apply the exact matches, filling `result`. Does not commit."""
+    index = OpenInvoiceIndex(_open_invoice_rows(db))
+    recorded = _recorded_payments(db, lines)
+
+    items, owners = [], []
+    for row_num, payment_date, text, amount in lines:
+        remarks = _remarks(text)
+        # Checked before matching: an imported line's invoices are no longer open
+        key = (payment_date, remarks)
+        if recorded.get(key, 0) >= amount:
+            recorded[key] -= amount
+            result.duplicates += 1
+            continue
+        allocations, reason, candidates = index.match(text, amount)
+        if not allocations:
+            result.review.append(StatementReviewLine(
+                row=row_num, payment_date=payment_date, narration=text, amount=amount, reason=reason,
+                candidates=[index.candidate(i) for i in candidates[:MAX_CANDIDATES]],
+            ))
+            continue
+        for invoice_id, allocated in allocations:
+            index.remaining[invoice_id] -= allocated
+            items.append({
+                "invoice_id": invoice_id,
+                "amount": allocated,
+                "payment_date": payment_date,
+                "payment_mode": PAYMENT_MODE,
+                "remarks": remarks,
+            })
+            owners.append((row_num, payment_date, text, amount))
+
+    rejected = set()
+    # A line's allocations are recorded together or not at all
+    outcomes = apply_payments(db, items, groups=[owner[0] for owner in owners])
+    for (payment, error), owner in zip(outcomes, owners):
+        if error:
+            # The invoice changed since it was indexed (a concurrent payment)
+            if owner[0] not in rejected:
+                rejected.add(owner[0])
+                result.review.append(StatementReviewLine(
+                    row=owner[0], payment_date=owner[1], narration=owner[2], amount=owner[3], reason=error,
+                ))
+            continue
+        result.applied += 1
+        result.applied_amount += payment["amount"]
+        result.payments.append(PaymentOut(**payment))
+    result.review.sort(key=lambda line: line.row)
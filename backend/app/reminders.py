@@ -0,0 +1,286 @@
+"""Payment reminders for overdue clients.
+
+`overdue_query` reads every overdue open invoice together with its client's
+contact details and per-client totals (window aggregates) in one query,
+ordered so `overdue_clients` can group it in a single pass. `render` builds
+the WhatsApp and email messages with the same wording as the reminder
+buttons on the client page (ClientDetailPage.jsx), and `queue_reminders`
+writes a batch of them to `reminder_outbox` with one executemany INSERT.
+
+Clients that already have a pending reminder on a channel are skipped, so
+running a batch twice before the sender drains the outbox does not message
+anyone twice; a partial unique index makes that hold for concurrent
+batches too. `drain_outbox` hands pending outbox rows to a sender callable;
+send_reminders.py runs it with a stub sender that only logs.
+"""
+import uuid
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from itertools import groupby
+from urllib.parse import quote
+
+from sqlalchemy import func, select, tuple_
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models import Client, Invoice, ReminderOutbox
+
+# India, as the invoices page assumes for wa.me links
+PHONE_COUNTRY_CODE = "91"
+
+WHATSAPP_TEMPLATE = (
+    "Hi {name},\n\n"
+    "Reminder for {count} pending invoice{plural}:\n\n"
+    "{lines}\n\n"
+    "──────────\nTotal Outstanding: ₹{total}\n\n"
+    "Please arrange payment at the earliest.\n\n"
+    "Thank you,\n{signature}"
+)
+EMAIL_SUBJECT_TEMPLATE = "Payment Reminder – {count} Pending Invoice{plural} – {name}"
+EMAIL_TEMPLATE = (
+    "Dear {name},\n\n"
+    "This is a gentle reminder regarding the following {count} pending invoice{plural}:\n\n"
+    "{lines}\n\n"
+    "──────────\nTotal Outstanding: ₹{total}\n\n"
+    "Kindly arrange payment at the earliest.\n\n"
+    "Thank you,\n{signature}"
+)
+INVOICE_LINE_TEMPLATE = (
+    "{position}. Invoice #{invoice_number}\n"
+    "   Amount: ₹{amount}\n"
+    "   Outstanding: ₹{outstanding}\n"
+    "   Due Date: {due_date}"
+)
+
+
+def format_inr(amount) -> str:
+    """`amount` as JavaScript's toLocaleString('en-IN') shows it: 12,34,567.5."""
+    whole, _, fraction = f"{abs(Decimal(amount)):.2f}".partition(".")
+    groups = [whole[-3:]]
+    whole = whole[:-3]
+    while whole:
+        groups.insert(0, whole[-2:])
+        whole = whole[:-2]
+    fraction = fraction.rstrip("0")
+    return ("-" if amount < 0 else "") + ",".join(groups) + (f".{fraction}" if fraction else "")
+
+
+def _uri_component(text: str) -> str:
+    """JavaScript's encodeURIComponent."""
+    return quote(text, safe="-_.!~*'()")
+
+
+def whatsapp_number(phone) -> str | None:
+    """`phone` as a wa.me number, normalized as on the invoices page (InvoicesPage.jsx).
+
+    A number written with a leading + already has its country code; one of
+    up to 10 digits not starting with 91 gets PHONE_COUNTRY_CODE prefixed.
+    """
+    phone = (phone or "").strip()
+    digits = "".join(c for c in phone if c.isdigit())
+    if not digits:
+        return None
+    if not phone.startswith("+") and not digits.startswith(PHONE_COUNTRY_CODE) and len(digits) <= 10:
+        return PHONE_COUNTRY_CODE + digits
+    return digits
+
+
+def overdue_query(today: date, min_days_overdue: int = 1, client_ids=None):
+    """Open invoices at least `min_days_overdue` days past due, grouped by client.
+
+    Each row carries its client's name and contacts, plus the client's
+    overdue invoice count and outstanding total over all its rows.
+    """
+    per_client = {"partition_by": Invoice.client_id}
+    q = (
+        select(
+            Invoice.client_id,
+            Client.company_name,
+            Client.phone,
+            Client.email,
+            Invoice.id,
+            Invoice.invoice_number,
+            Invoice.total_amount,
+            Invoice.outstanding,
+            Invoice.due_date,
+            func.count().over(**per_client).label("invoice_count"),
+            func.sum(Invoice.outstanding).over(**per_client).label("client_outstanding"),
+        )
+        .join(Client, Invoice.client_id == Client.id)
+        .where(Invoice.outstanding > 0, Invoice.due_date <= today - timedelta(days=min_days_overdue))
+        .order_by(Client.company_name, Invoice.client_id, Invoice.due_date, Invoice.invoice_number)
+    )
+    if client_ids is not None:
+        q = q.where(Invoice.client_id.in_(client_ids))
+    return q
+
+
+def overdue_clients(rows) -> list:
+    """Group `overdue_query` rows into one dict per client (OverdueClient's fields)."""
+    clients = []
+    for client_id, group in groupby(rows, key=lambda row: row.client_id):
+        invoices = list(group)
+        first = invoices[0]
+        clients.append({
+            "client_id": client_id,
+            "company_name": first.company_name,
+            "phone": first.phone,
+            "email": first.email,
+            "invoice_count": first.invoice_count,
+            "outstanding": first.client_outstanding,
+            "oldest_due_date": first.due_date,
+            "invoices": [
+                {
+                    "id": row.id,
+                    "invoice_number": row.invoice_number,
+                    "total_amount": row.total_amount,
+                    "outstanding": row.outstanding,
+                    "due_date": row.due_date,
+                }
+                for row in invoices
+            ],
+        })
+    return clients
+
+
+def render(client: dict, channel: str) -> dict:
+    """Message for one client on `channel`: recipient, subject (email only), body and link.
+
+    `recipient` is None when the client has no phone number or email for
+    the channel.
+    """
+    invoices = client["invoices"]
+    values = {
+        "name": client["company_name"] or "Client",
+        "count": len(invoices),
+        "plural": "s" if len(invoices) > 1 else "",
+        "total": format_inr(sum((inv["outstanding"] for inv in invoices), Decimal("0"))),
+        "signature": settings.REMINDER_SIGNATURE,
+        "lines": "\n\n".join(
+            INVOICE_LINE_TEMPLATE.format(
+                position=position,
+                invoice_number=inv["invoice_number"],
+                amount=format_inr(inv["total_amount"]),
+                outstanding=format_inr(inv["outstanding"]),
+                due_date=inv["due_date"].isoformat(),
+            )
+            for position, inv in enumerate(invoices, 1)
+        ),
+    }
+    if channel == "whatsapp":
+        recipient = whatsapp_number(client["phone"])
+        body = WHATSAPP_TEMPLATE.format(**values)
+        return {
+            "recipient": recipient,
+            "subject": None,
+            "body": body,
+            "link": f"https://wa.me/{recipient or ''}?text={_uri_component(body)}",
+        }
+    subject = EMAIL_SUBJECT_TEMPLATE.format(**{**values, "name": client["company_name"] or ""})
+    body = EMAIL_TEMPLATE.format(**values)
+    return {
+        "recipient": client["email"] or None,
+        "subject": subject,
+        "body": body,
+        "link": f"mailto:{client['email'] or ''}?subject={_uri_component(subject)}&body={_uri_component(body)}",
+    }
+
+
+def _insert_pending(db: Session):
+    if db.get_bind().dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    return dialect_insert(ReminderOutbox).on_conflict_do_nothing(
+        index_elements=[ReminderOutbox.client_id, ReminderOutbox.channel],
+        index_where=ReminderOutbox.status == "pending",
+    )
+
+
+def queue_reminders(db: Session, clients: list, channels: list, username: str) -> tuple:
+    """Render and queue reminders for `clients` on each of `channels`. Does not commit.
+
+    Returns `(queued, skipped)`: the outbox rows as dicts, and
+    `(client, channel, reason)` for clients that cannot be reached on a
+    channel or already have a reminder pending on it.
+    """
+    queued, skipped, owners = [], [], []
+    now = datetime.utcnow()
+    # Channel by channel: rows of one channel share their set of non-NULL
+    # columns, which lets the ORM insert them as one executemany
+    for channel in channels:
+        for client in clients:
+            message = render(client, channel)
+            if message["recipient"] is None:
+                reason = "No phone number" if channel == "whatsapp" else "No email address"
+                skipped.append((client, channel, reason))
+                continue
+            queued.append({
+                "id": uuid.uuid4(),
+                "client_id": client["client_id"],
+                "channel": channel,
+                **message,
+                "invoice_count": client["invoice_count"],
+                "outstanding": client["outstanding"],
+                "status": "pending",
+                "attempts": 0,
+                "created_by": username,
+                "created_at": now,
+            })
+            owners.append(client)
+    if not queued:
+        return queued, skipped
+
+    # uq_reminder_outbox_pending allows one pending reminder per client and
+    # channel; rows that would be a second one are not inserted
+    inserted = set(db.execute(_insert_pending(db).returning(ReminderOutbox.id), queued).scalars())
+    kept = []
+    for row, client in zip(queued, owners):
+        if row["id"] in inserted:
+            kept.append(row)
+        else:
+            skipped.append((client, row["channel"], "Reminder already pending"))
+    return kept, skipped
+
+
+def drain_outbox(db: Session, send, batch_size: int = 100, max_attempts: int = None) -> tuple:
+    """Pass each pending reminder to `send(row)` once, oldest first, and record the outcome.
+
+    A reminder whose send raises stays pending for the next run until it has
+    failed `max_attempts` times (REMINDER_MAX_ATTEMPTS), then is marked failed.
+    Rows are claimed `batch_size` at a time with FOR UPDATE SKIP LOCKED, so
+    several senders can drain the same outbox; each batch is committed.
+    Returns `(sent, failed)` counts for this run.
+    """
+    max_attempts = max_attempts or settings.REMINDER_MAX_ATTEMPTS
+    sent = failed = 0
+    after = None
+    while True:
+        q = (
+            select(ReminderOutbox)
+            .where(ReminderOutbox.status == "pending")
+            .order_by(ReminderOutbox.created_at, ReminderOutbox.id)
+            .limit(batch_size)
+            .with_for_update(skip_locked=True)
+        )
+        if after is not None:
+            q = q.where(tuple_(ReminderOutbox.created_at, ReminderOutbox.id) > after)
+        rows = db.execute(q).scalars().all()
+        if not rows:
+            return sent, failed
+        for row in rows:
+            row.attempts += 1
+            try:
+                send(row)
+            except Exception as e:
+                row.error = str(e)
+                if row.attempts >= max_attempts:
+                    row.status = "failed"
+                failed += 1
+            else:
+                row.status = "sent"
+                row.error = None
+                row.sent_at = datetime.utcnow()
+                sent += 1
+        after = (rows[-1].created_at, rows[-1].id)
+        db.commit()
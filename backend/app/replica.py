@@ -0,0 +1,35 @@
+"""Read-your-writes for the read replica.
+
+Read-only endpoints take `get_read_db` (app/database.py), which uses the
+READ_DATABASE_URL replica. A replica trails the primary slightly, so a user
+who has just saved a payment could reload the list and not see it. To avoid
+that, `ReadYourWritesMiddleware` sets a short-lived cookie on every successful
+write response, and while the browser sends it back `get_read_db` reads from
+the primary instead.
+"""
+from app.config import settings
+from app.database import READ_PRIMARY_COOKIE
+
+WRITE_METHODS = {"POST", "PUT", "PATCH", "DELETE"}
+
+
+class ReadYourWritesMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] not in WRITE_METHODS or not settings.READ_DATABASE_URL:
+            await self.app(scope, receive, send)
+            return
+
+        cookie = (
+            f"{READ_PRIMARY_COOKIE}=1; Max-Age={settings.READ_YOUR_WRITES_SECONDS}; "
+            "Path=/; HttpOnly; SameSite=Lax"
+        ).encode()
+
+        async def send_with_cookie(message):
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                message = {**message, "headers": [*message.get("headers", []), (b"set-cookie", cookie)]}
+            await send(message)
+
+        await self.app(scope, receive, send_with_cookie)
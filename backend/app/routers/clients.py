@@ -3,117 +3,192 @@ from decimal import Decimal
 from typing import List, Optional
 from uuid import UUID
 
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy import func, case
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlalchemy import delete, func, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from app.database import get_db
-from app.models import Client, Invoice, Payment, User
-from app.schemas import ClientCreate, ClientUpdate, ClientOut, ClientSummary
+from app.database import get_async_read_db, get_db, get_read_db
+from app.models import Client, User
+from app.schemas import (
+    ClientCreate, ClientUpdate, ClientOut, ClientSummary, PaymentAllocationCreate, PaymentAllocationResult, PaymentOut
+)
 from app.deps import get_current_user, require_admin
+from app.cache import dashboard_cache
+from app.config import settings
+from app.pagination import encode_cursor, decode_cursor
+from app.balances import allocate, apply_payments, client_balances, lock_open_invoices
+from app.search import client_index, search_client_ids
 
 router = APIRouter(prefix="/clients", tags=["Clients"])
+# Async twins of the read endpoints, mounted ahead of `router` when ASYNC_DATABASE is on
+async_router = APIRouter(prefix="/clients", tags=["Clients"])
 
 
-def _compute_all_client_summaries(db: Session, clients: list) -> list[ClientSummary]:
-    """Compute outstanding / overdue for all clients in a SINGLE query."""
-    if not clients:
-        return []
-
-    today = date.today()
-    client_ids = [c.id for c in clients]
-
-    # Single query to get per-client aggregated data
-    invoice_stats = (
-        db.query(
-            Invoice.client_id,
-            func.count(Invoice.id).label("invoice_count"),
-            func.coalesce(func.sum(Invoice.total_amount), 0).label("total_amount"),
-        )
-        .filter(Invoice.client_id.in_(client_ids))
-        .group_by(Invoice.client_id)
-        .all()
-    )
-    invoice_map = {str(row.client_id): row for row in invoice_stats}
-
-    # Single query to get per-invoice payment totals, grouped by client
-    paid_by_invoice = (
-        db.query(
-            Invoice.client_id,
-            Invoice.id.label("invoice_id"),
-            Invoice.total_amount,
-            Invoice.due_date,
-            func.coalesce(func.sum(Payment.amount), 0).label("paid_amount"),
+def _client_summary_query(today: date, client_id: Optional[UUID] = None, client_ids=None):
+    """Clients joined to their aggregates; one statement however many clients are returned."""
+    balances = client_balances(today, client_id, client_ids).subquery("balances")
+    outstanding = func.coalesce(balances.c.outstanding, 0)
+    overdue = func.coalesce(balances.c.overdue, 0)
+    q = (
+        select(
+            Client,
+            outstanding.label("total_outstanding"),
+            overdue.label("total_overdue"),
+            func.coalesce(balances.c.overdue_count, 0).label("overdue_count"),
+            func.coalesce(balances.c.invoice_count, 0).label("invoice_count"),
         )
-        .outerjoin(Payment, Payment.invoice_id == Invoice.id)
-        .filter(Invoice.client_id.in_(client_ids))
-        .group_by(Invoice.client_id, Invoice.id, Invoice.total_amount, Invoice.due_date)
-        .all()
+        .outerjoin(balances, balances.c.client_id == Client.id)
     )
+    return q, {"outstanding": outstanding, "overdue": overdue}
+
+
+def _client_page_query(today: date, sort: str, cursor: Optional[str], limit: Optional[int]):
+    q, sort_exprs = _client_summary_query(today)
+    if sort == "name":
+        key = Client.company_name
+        q = q.order_by(Client.company_name, Client.id)
+    else:
+        key = sort_exprs[sort]
+        q = q.order_by(key.desc(), Client.id.desc())
+
+    if cursor:
+        last_key, last_id = decode_cursor(cursor, 2)
+        try:
+            last_id = UUID(last_id)
+            if sort != "name":
+                last_key = Decimal(last_key)
+        except (ValueError, ArithmeticError):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        if sort == "name":
+            q = q.where(tuple_(key, Client.id) > tuple_(last_key, last_id))
+        else:
+            q = q.where(tuple_(key, Client.id) < tuple_(last_key, last_id))
+
+    # One extra row tells whether there is a next page
+    return q if limit is None else q.limit(limit + 1)
+
+
+def _client_page(rows, sort: str, limit: Optional[int], response: Response) -> List[ClientSummary]:
+    if limit is not None and len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        last_key = last.Client.company_name if sort == "name" else getattr(last, f"total_{sort}")
+        response.headers["X-Next-Cursor"] = encode_cursor(last_key, last.Client.id)
+    return [_to_summary(row) for row in rows]
+
+
+def _search_results_query(today: date, ids: list):
+    q, _ = _client_summary_query(today, client_ids=ids)
+    return q.where(Client.id.in_(ids))
+
 
-    # Aggregate per client
-    client_agg = {}
-    for row in paid_by_invoice:
-        cid = str(row.client_id)
-        if cid not in client_agg:
-            client_agg[cid] = {"outstanding": Decimal("0"), "overdue": Decimal("0"), "overdue_count": 0, "invoice_count": 0}
-        agg = client_agg[cid]
-        agg["invoice_count"] += 1
-        outstanding = Decimal(str(row.total_amount)) - Decimal(str(row.paid_amount))
-        if outstanding > 0:
-            agg["outstanding"] += outstanding
-            if row.due_date < today:
-                agg["overdue"] += outstanding
-                agg["overdue_count"] += 1
-
-    results = []
-    for client in clients:
-        cid = str(client.id)
-        agg = client_agg.get(cid, {"outstanding": Decimal("0"), "overdue": Decimal("0"), "overdue_count": 0, "invoice_count": 0})
-        results.append(ClientSummary(
-            id=client.id,
-            company_name=client.company_name,
-            contact_person=client.contact_person,
-            phone=client.phone,
-            email=client.email,
-            credit_limit=client.credit_limit,
-            created_at=client.created_at,
-            total_outstanding=agg["outstanding"],
-            total_overdue=agg["overdue"],
-            overdue_count=agg["overdue_count"],
-            invoice_count=agg["invoice_count"],
-        ))
-    return results
+def _ranked(rows, ids: list) -> List[ClientSummary]:
+    rank = {client_id: i for i, client_id in enumerate(ids)}
+    return [_to_summary(row) for row in sorted(rows, key=lambda row: rank[row.Client.id])]
+
+
+def _client_query(today: date, client_id: UUID):
+    q, _ = _client_summary_query(today, client_id)
+    return q.where(Client.id == client_id)
+
+
+def _to_summary(row) -> ClientSummary:
+    client = row.Client
+    return ClientSummary(
+        id=client.id,
+        company_name=client.company_name,
+        contact_person=client.contact_person,
+        phone=client.phone,
+        email=client.email,
+        credit_limit=client.credit_limit,
+        created_at=client.created_at,
+        total_outstanding=row.total_outstanding,
+        total_overdue=row.total_overdue,
+        overdue_count=row.overdue_count,
+        invoice_count=row.invoice_count,
+    )
 
 
 @router.get("", response_model=List[ClientSummary])
 def list_clients(
+    response: Response,
     search: Optional[str] = Query(None),
-    db: Session = Depends(get_db),
+    sort: str = Query("name", pattern="^(name|outstanding|overdue)$"),
+    limit: Optional[int] = Query(None, ge=1, le=500),
+    cursor: Optional[str] = Query(None),
+    include_total: bool = Query(True),
+    db: Session = Depends(get_read_db),
     _user: User = Depends(get_current_user),
 ):
-    q = db.query(Client)
-    if search:
-        # Escape SQL wildcard characters to prevent injection
-        safe_search = search.replace("%", "\\%").replace("_", "\\_")
-        q = q.filter(Client.company_name.ilike(f"%{safe_search}%"))
-    clients = q.order_by(Client.company_name).all()
-    return _compute_all_client_summaries(db, clients)
+    """List clients with their balances.
+
+    `sort=name` orders A-Z; `outstanding` and `overdue` order largest first.
+    With `limit`, pass the `X-Next-Cursor` response header back as `cursor`
+    for the next page. `X-Total-Count` is omitted when `include_total=false`.
+
+    `search` returns the best `limit` matches (default CLIENT_SEARCH_LIMIT) by
+    relevance - names starting with the term first, then fuzzy matches - and
+    ignores `sort`, `cursor` and `include_total`.
+    """
+    today = date.today()
+    if search and search.strip():
+        ids = search_client_ids(db, search, limit or settings.CLIENT_SEARCH_LIMIT)
+        return _ranked(db.execute(_search_results_query(today, ids)).all(), ids) if ids else []
+
+    if include_total:
+        response.headers["X-Total-Count"] = str(db.execute(select(func.count(Client.id))).scalar())
+    rows = db.execute(_client_page_query(today, sort, cursor, limit)).all()
+    return _client_page(rows, sort, limit, response)
+
+
+@async_router.get("", response_model=List[ClientSummary])
+async def list_clients_async(
+    response: Response,
+    search: Optional[str] = Query(None),
+    sort: str = Query("name", pattern="^(name|outstanding|overdue)$"),
+    limit: Optional[int] = Query(None, ge=1, le=500),
+    cursor: Optional[str] = Query(None),
+    include_total: bool = Query(True),
+    db: AsyncSession = Depends(get_async_read_db),
+    _user: User = Depends(get_current_user),
+):
+    """`list_clients` on the async engine."""
+    today = date.today()
+    if search and search.strip():
+        ids = await db.run_sync(search_client_ids, search, limit or settings.CLIENT_SEARCH_LIMIT)
+        return _ranked((await db.execute(_search_results_query(today, ids))).all(), ids) if ids else []
+
+    if include_total:
+        response.headers["X-Total-Count"] = str((await db.execute(select(func.count(Client.id)))).scalar())
+    rows = (await db.execute(_client_page_query(today, sort, cursor, limit))).all()
+    return _client_page(rows, sort, limit, response)
 
 
 @router.get("/{client_id}", response_model=ClientSummary)
-def get_client(client_id: UUID, db: Session = Depends(get_db), _user: User = Depends(get_current_user)):
-    client = db.query(Client).filter(Client.id == client_id).first()
-    if not client:
+def get_client(client_id: UUID, db: Session = Depends(get_read_db), _user: User = Depends(get_current_user)):
+    row = db.execute(_client_query(date.today(), client_id)).first()
+    if not row:
         raise HTTPException(status_code=404, detail="Client not found")
-    summaries = _compute_all_client_summaries(db, [client])
-    return summaries[0]
+    return _to_summary(row)
+
+
+@async_router.get("/{client_id}", response_model=ClientSummary)
+async def get_client_async(
+    client_id: UUID, db: AsyncSession = Depends(get_async_read_db), _user: User = Depends(get_current_user)
+):
+    row = (await db.execute(_client_query(date.today(), client_id))).first()
+    if not row:
+        raise HTTPException(status_code=404, detail="Client not found")
+    return _to_summary(row)
 
 
 @router.post("", response_model=ClientOut, status_code=201)
 def create_client(body: ClientCreate, db: Session = Depends(get_db), _user: User = Depends(get_current_user)):
     client = Client(**body.model_dump())
     db.add(client)
+    dashboard_cache.invalidate(db)
+    client_index.invalidate(db)
     db.commit()
     db.refresh(client)
     return client
@@ -126,6 +201,8 @@ def update_client(client_id: UUID, body: ClientUpdate, db: Session = Depends(get
         raise HTTPException(status_code=404, detail="Client not found")
     for key, val in body.model_dump(exclude_unset=True).items():
         setattr(client, key, val)
+    dashboard_cache.invalidate(db)
+    client_index.invalidate(db)
     db.commit()
     db.refresh(client)
     return client
@@ -133,8 +210,58 @@ def update_client(client_id: UUID, body: ClientUpdate, db: Session = Depends(get
 
 @router.delete("/{client_id}", status_code=204)
 def delete_client(client_id: UUID, db: Session = Depends(get_db), _user: User = Depends(require_admin)):
-    client = db.query(Client).filter(Client.id == client_id).first()
-    if not client:
+    # One statement; the foreign keys cascade to the client's invoices and their payments
+    if not db.execute(delete(Client).where(Client.id == client_id)).rowcount:
         raise HTTPException(status_code=404, detail="Client not found")
-    db.delete(client)
+    dashboard_cache.invalidate(db)
+    client_index.invalidate(db)
     db.commit()
+
+
+@router.post("/{client_id}/allocate-payment", response_model=PaymentAllocationResult)
+def allocate_payment(
+    client_id: UUID,
+    body: PaymentAllocationCreate,
+    db: Session = Depends(get_db),
+    _user: User = Depends(get_current_user),
+):
+    """Split one payment from a client across their open invoices.
+
+    The amount goes to the invoices in `invoice_ids` in the order given, or to
+    all open invoices oldest due first, each paid off before the next. The
+    invoices are locked and read in one query and the payments recorded in
+    the same transaction. The amount may not exceed the invoices' combined
+    outstanding balance.
+    """
+    if db.get(Client, client_id) is None:
+        raise HTTPException(status_code=404, detail="Client not found")
+
+    invoice_ids = list(dict.fromkeys(body.invoice_ids)) if body.invoice_ids else None
+    invoices = lock_open_invoices(db, client_id, invoice_ids)
+    if invoice_ids:
+        found = {inv.id: inv for inv in invoices}
+        missing = [str(i) for i in invoice_ids if i not in found]
+        if missing:
+            raise HTTPException(
+                status_code=400, detail=f"Not open invoices of this client: {', '.join(missing)}"
+            )
+        invoices = [found[i] for i in invoice_ids]
+
+    outstanding = sum((inv.outstanding for inv in invoices), Decimal("0"))
+    if body.amount > outstanding:
+        raise HTTPException(
+            status_code=400, detail=f"Payment amount ₹{body.amount} exceeds outstanding ₹{outstanding}"
+        )
+
+    details = body.model_dump(include={"payment_date", "payment_mode", "remarks"})
+    outcomes = apply_payments(db, [
+        {"invoice_id": invoice_id, "amount": amount, **details}
+        for invoice_id, amount in allocate(body.amount, invoices)
+    ])
+    # The invoices are locked, so apply_payments cannot reject anything here
+    payments = [PaymentOut(**payment) for payment, _ in outcomes]
+    dashboard_cache.invalidate(db)
+    db.commit()
+    return PaymentAllocationResult(
+        client_id=client_id, amount=body.amount, payments=payments, outstanding=outstanding - body.amount
+    )
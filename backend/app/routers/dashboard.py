@@ -1,102 +1,127 @@
 from datetime import date
 from decimal import Decimal
 
-from fastapi import APIRouter, Depends
-from sqlalchemy import func
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy import func, select, true
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from app.database import get_db
-from app.models import Client, Invoice, Payment, User
+from app.database import get_async_read_db, get_read_db
+from app.models import Client, Payment, User
 from app.schemas import DashboardData, ClientSummary
-from app.deps import get_current_user
+from app.deps import get_current_user, require_admin
+from app.balances import client_balances
+from app.cache import dashboard_cache
 
 router = APIRouter(prefix="/dashboard", tags=["Dashboard"])
+# Async twins of the read endpoints, mounted ahead of `router` when ASYNC_DATABASE is on
+async_router = APIRouter(prefix="/dashboard", tags=["Dashboard"])
 
 
-@router.get("", response_model=DashboardData)
-def get_dashboard(db: Session = Depends(get_db), _user: User = Depends(get_current_user)):
-    today = date.today()
-
-    # Count totals in single queries
-    total_clients = db.query(func.count(Client.id)).scalar()
-    total_invoices = db.query(func.count(Invoice.id)).scalar()
-
-    # Get all invoice data with payment sums in ONE query
-    invoice_data = (
-        db.query(
-            Invoice.client_id,
-            Invoice.id.label("invoice_id"),
-            Invoice.total_amount,
-            Invoice.due_date,
-            func.coalesce(func.sum(Payment.amount), 0).label("paid_amount"),
+def _dashboard_query(today: date, top: int):
+    """One statement: totals plus the top-N clients by outstanding.
+
+    Every row carries the totals; the top clients ride along on the LEFT JOIN,
+    so an empty database still yields a single row of totals.
+    """
+    balances = client_balances(today).cte("balances")
+    totals = select(
+        func.coalesce(func.sum(balances.c.outstanding), 0).label("total_outstanding"),
+        func.coalesce(func.sum(balances.c.overdue), 0).label("total_overdue"),
+        func.coalesce(func.sum(balances.c.invoice_count), 0).label("total_invoices"),
+        select(func.count(Client.id)).scalar_subquery().label("total_clients"),
+        select(func.coalesce(func.sum(Payment.amount), 0))
+        .where(Payment.payment_date == today)
+        .scalar_subquery()
+        .label("payments_today"),
+    ).cte("totals")
+    top_clients = (
+        select(
+            Client.id,
+            Client.company_name,
+            Client.contact_person,
+            Client.phone,
+            Client.email,
+            Client.credit_limit,
+            Client.created_at,
+            balances.c.outstanding,
+            balances.c.overdue,
+            balances.c.overdue_count,
+            balances.c.invoice_count,
         )
-        .outerjoin(Payment, Payment.invoice_id == Invoice.id)
-        .group_by(Invoice.client_id, Invoice.id, Invoice.total_amount, Invoice.due_date)
-        .all()
+        .join(balances, balances.c.client_id == Client.id)
+        .order_by(balances.c.outstanding.desc(), Client.id)
+        .limit(top)
+        .cte("top_clients")
     )
+    return (
+        select(totals, top_clients)
+        .select_from(totals.outerjoin(top_clients, true()))
+        .order_by(top_clients.c.outstanding.desc(), top_clients.c.id)
+    )
+
 
-    # Aggregate per client in Python (fast, no more DB calls)
-    total_outstanding = Decimal("0")
-    total_overdue = Decimal("0")
-    client_agg = {}
-
-    for row in invoice_data:
-        cid = str(row.client_id)
-        if cid not in client_agg:
-            client_agg[cid] = {"outstanding": Decimal("0"), "overdue": Decimal("0"), "overdue_count": 0, "invoice_count": 0}
-        
-        agg = client_agg[cid]
-        agg["invoice_count"] += 1
-
-        outstanding = Decimal(str(row.total_amount)) - Decimal(str(row.paid_amount))
-        
-        if outstanding > 0:
-            total_outstanding += outstanding
-            agg["outstanding"] += outstanding
-            if row.due_date < today:
-                total_overdue += outstanding
-                agg["overdue"] += outstanding
-                agg["overdue_count"] += 1
-
-    # Get client details only for clients with data
-    client_ids_with_data = list(client_agg.keys())
-    clients_map = {}
-    if client_ids_with_data:
-        clients = db.query(Client).filter(Client.id.in_(client_ids_with_data)).all()
-        clients_map = {str(c.id): c for c in clients}
-
-    # Build top 5 outstanding clients
-    top_client_ids = sorted(client_agg.keys(), key=lambda cid: client_agg[cid]["outstanding"], reverse=True)[:5]
-    top_5 = []
-    for cid in top_client_ids:
-        client = clients_map.get(cid)
-        if not client:
-            continue
-        agg = client_agg[cid]
-        top_5.append(ClientSummary(
-            id=client.id,
-            company_name=client.company_name,
-            contact_person=client.contact_person,
-            phone=client.phone,
-            email=client.email,
-            credit_limit=client.credit_limit,
-            created_at=client.created_at,
-            total_outstanding=agg["outstanding"],
-            total_overdue=agg["overdue"],
-            overdue_count=agg["overdue_count"],
-            invoice_count=agg["invoice_count"],
-        ))
-
-    # Payments received today - single query
-    payments_today = db.query(func.coalesce(func.sum(Payment.amount), 0)).filter(
-        Payment.payment_date == today
-    ).scalar()
+def _dashboard_data(rows) -> DashboardData:
+    totals = rows[0]
+
+    top_clients = [
+        ClientSummary(
+            id=row.id,
+            company_name=row.company_name,
+            contact_person=row.contact_person,
+            phone=row.phone,
+            email=row.email,
+            credit_limit=row.credit_limit,
+            created_at=row.created_at,
+            total_outstanding=row.outstanding,
+            total_overdue=row.overdue,
+            overdue_count=row.overdue_count,
+            invoice_count=row.invoice_count,
+        )
+        for row in rows
+        if row.id is not None
+    ]
 
     return DashboardData(
-        total_outstanding=total_outstanding,
-        total_overdue=total_overdue,
-        payments_today=Decimal(str(payments_today)),
-        total_clients=total_clients,
-        total_invoices=total_invoices,
-        top_outstanding_clients=top_5,
+        total_outstanding=Decimal(str(totals.total_outstanding)),
+        total_overdue=Decimal(str(totals.total_overdue)),
+        payments_today=Decimal(str(totals.payments_today)),
+        total_clients=totals.total_clients,
+        total_invoices=totals.total_invoices,
+        top_outstanding_clients=top_clients,
     )
+
+
+@router.get("", response_model=DashboardData)
+def get_dashboard(
+    top: int = Query(5, ge=1, le=50),
+    db: Session = Depends(get_read_db),
+    _user: User = Depends(get_current_user),
+):
+    cached, version = dashboard_cache.get(db, top)
+    if cached is not None:
+        return cached
+
+    data = _dashboard_data(db.execute(_dashboard_query(date.today(), top)).all())
+    dashboard_cache.put(top, version, data)
+    return data
+
+
+@async_router.get("", response_model=DashboardData)
+async def get_dashboard_async(
+    top: int = Query(5, ge=1, le=50),
+    db: AsyncSession = Depends(get_async_read_db),
+    _user: User = Depends(get_current_user),
+):
+    cached, version = await dashboard_cache.get_async(db, top)
+    if cached is not None:
+        return cached
+
+    data = _dashboard_data((await db.execute(_dashboard_query(date.today(), top))).all())
+    dashboard_cache.put(top, version, data)
+    return data
+
+
+@router.get("/cache-stats")
+def dashboard_cache_stats(_admin: User = Depends(require_admin)):
+    return dashboard_cache.stats()
@@ -1,101 +1,161 @@
-import io
+import time
 from datetime import date
-from decimal import Decimal, InvalidOperation
-from typing import List, Optional
+from typing import List, Optional, Union
 from uuid import UUID
 
-
-import pandas as pd
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Query
-from sqlalchemy import func
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Query, Response
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import delete, func, false, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from app.database import get_db
-from app.models import Invoice, Payment, Client, User
-from app.schemas import InvoiceCreate, InvoiceOut, ImportResult
+from app.database import get_async_read_db, get_db, get_read_db
+from app.models import Invoice, Client, Payment, User, ImportJob
+from app.schemas import BulkDeleteResult, InvoiceCreate, InvoiceOut, ImportResult, ImportJobOut
 from app.deps import get_current_user, require_admin
+from app.cache import dashboard_cache
 from app.config import settings
+from app.pagination import encode_cursor, decode_cursor
+from app.importer import ImportFormatError, ImportReadError, import_frame, iter_frames, import_stream
+from app.metrics import observe_import
+from app.import_jobs import submit_import_job, job_out, fail_if_stale, import_slot, parse_in_process
 
 router = APIRouter(prefix="/invoices", tags=["Invoices"])
+# Async twins of the read endpoints, mounted ahead of `router` when ASYNC_DATABASE is on
+async_router = APIRouter(prefix="/invoices", tags=["Invoices"])
+
+
+def _invoice_select():
+    """Invoice columns plus the client name in one joined projection (no ORM entities)."""
+    return select(
+        Invoice.id,
+        Invoice.client_id,
+        Invoice.invoice_number,
+        Invoice.invoice_date,
+        Invoice.due_date,
+        Invoice.total_amount,
+        Invoice.created_at,
+        Invoice.paid_amount,
+        Invoice.outstanding,
+        Invoice.status,
+        Client.company_name.label("client_name"),
+    ).outerjoin(Client, Invoice.client_id == Client.id)
+
+
+def _invoice_out(row, today: date) -> InvoiceOut:
+    return InvoiceOut(
+        **row._mapping,
+        is_overdue=row.due_date < today and row.outstanding > 0,
+    )
 
 
-def _enrich_invoices_batch(db: Session, invoices: list) -> list[InvoiceOut]:
-    """Enrich multiple invoices with payment data in a SINGLE query."""
-    if not invoices:
-        return []
+def _fetch_invoice(db: Session, invoice_id: UUID) -> Optional[InvoiceOut]:
+    row = db.execute(_invoice_select().where(Invoice.id == invoice_id)).first()
+    return _invoice_out(row, date.today()) if row else None
 
-    invoice_ids = [inv.id for inv in invoices]
 
-    # Single query to get paid amounts for all invoices
-    payment_sums = (
-        db.query(
-            Payment.invoice_id,
-            func.coalesce(func.sum(Payment.amount), 0).label("paid_amount"),
-        )
-        .filter(Payment.invoice_id.in_(invoice_ids))
-        .group_by(Payment.invoice_id)
-        .all()
-    )
-    paid_map = {str(row.invoice_id): Decimal(str(row.paid_amount)) for row in payment_sums}
+def _status_condition(status_filter: str, today: date):
+    """SQL predicate for the invoice list status filter."""
+    value = status_filter.lower()
+    if value == "overdue":
+        return (Invoice.outstanding > 0) & (Invoice.due_date < today)
+    if value in ("paid", "partial", "unpaid"):
+        return Invoice.status == value.capitalize()
+    return false()
+
+
+def _invoice_list_queries(
+    client_id: Optional[UUID], status_filter: Optional[str], cursor: Optional[str], limit: Optional[int], today: date
+):
+    """(count query, page query) for the invoice list."""
+    conditions = []
+    if client_id:
+        conditions.append(Invoice.client_id == client_id)
+    if status_filter:
+        conditions.append(_status_condition(status_filter, today))
+    count_q = select(func.count(Invoice.id)).where(*conditions)
+
+    if cursor:
+        last_date, last_id = decode_cursor(cursor, 2)
+        try:
+            key = (date.fromisoformat(last_date), UUID(last_id))
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        conditions.append(tuple_(Invoice.invoice_date, Invoice.id) < tuple_(*key))
+
+    q = _invoice_select().where(*conditions).order_by(Invoice.invoice_date.desc(), Invoice.id.desc())
+    # One extra row tells whether there is a next page
+    return count_q, (q if limit is None else q.limit(limit + 1))
 
-    today = date.today()
-    results = []
-    for inv in invoices:
-        paid_amount = paid_map.get(str(inv.id), Decimal("0"))
-        outstanding = inv.total_amount - paid_amount
-        if outstanding <= 0:
-            status = "Paid"
-        elif paid_amount > 0:
-            status = "Partial"
-        else:
-            status = "Unpaid"
-        is_overdue = inv.due_date < today and outstanding > 0
-        client_name = inv.client.company_name if inv.client else None
-        results.append(InvoiceOut(
-            id=inv.id,
-            client_id=inv.client_id,
-            invoice_number=inv.invoice_number,
-            invoice_date=inv.invoice_date,
-            due_date=inv.due_date,
-            total_amount=inv.total_amount,
-            created_at=inv.created_at,
-            paid_amount=paid_amount,
-            outstanding=outstanding,
-            status=status,
-            is_overdue=is_overdue,
-            client_name=client_name,
-        ))
-    return results
-
-
-def _enrich_invoice(db: Session, inv: Invoice) -> InvoiceOut:
-    """Enrich a single invoice (uses batch internally)."""
-    return _enrich_invoices_batch(db, [inv])[0]
+
+def _invoice_page(rows, limit: Optional[int], today: date, response: Response) -> List[InvoiceOut]:
+    if limit is not None and len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        response.headers["X-Next-Cursor"] = encode_cursor(last.invoice_date, last.id)
+    return [_invoice_out(row, today) for row in rows]
 
 
 @router.get("", response_model=List[InvoiceOut])
 def list_invoices(
+    response: Response,
     client_id: Optional[UUID] = Query(None),
     status_filter: Optional[str] = Query(None),
-    db: Session = Depends(get_db),
+    limit: Optional[int] = Query(None, ge=1, le=500),
+    cursor: Optional[str] = Query(None),
+    include_total: bool = Query(True),
+    db: Session = Depends(get_read_db),
     _user: User = Depends(get_current_user),
 ):
-    q = db.query(Invoice)
-    if client_id:
-        q = q.filter(Invoice.client_id == client_id)
-    invoices = q.order_by(Invoice.invoice_date.desc()).all()
-    results = _enrich_invoices_batch(db, invoices)
-    if status_filter:
-        results = [r for r in results if r.status.lower() == status_filter.lower()]
-    return results
+    """List invoices newest first.
+
+    With `limit`, results are paged by keyset on (invoice_date, id): pass the
+    `X-Next-Cursor` response header back as `cursor` to get the next page.
+    `X-Total-Count` carries the number of matching invoices unless
+    `include_total=false`.
+    """
+    today = date.today()
+    count_q, q = _invoice_list_queries(client_id, status_filter, cursor, limit, today)
+    if include_total:
+        response.headers["X-Total-Count"] = str(db.execute(count_q).scalar())
+    return _invoice_page(db.execute(q).all(), limit, today, response)
+
+
+@async_router.get("", response_model=List[InvoiceOut])
+async def list_invoices_async(
+    response: Response,
+    client_id: Optional[UUID] = Query(None),
+    status_filter: Optional[str] = Query(None),
+    limit: Optional[int] = Query(None, ge=1, le=500),
+    cursor: Optional[str] = Query(None),
+    include_total: bool = Query(True),
+    db: AsyncSession = Depends(get_async_read_db),
+    _user: User = Depends(get_current_user),
+):
+    """`list_invoices` on the async engine."""
+    today = date.today()
+    count_q, q = _invoice_list_queries(client_id, status_filter, cursor, limit, today)
+    if include_total:
+        response.headers["X-Total-Count"] = str((await db.execute(count_q)).scalar())
+    return _invoice_page((await db.execute(q)).all(), limit, today, response)
 
 
 @router.get("/{invoice_id}", response_model=InvoiceOut)
-def get_invoice(invoice_id: UUID, db: Session = Depends(get_db), _user: User = Depends(get_current_user)):
-    inv = db.query(Invoice).filter(Invoice.id == invoice_id).first()
+def get_invoice(invoice_id: UUID, db: Session = Depends(get_read_db), _user: User = Depends(get_current_user)):
+    inv = _fetch_invoice(db, invoice_id)
     if not inv:
         raise HTTPException(status_code=404, detail="Invoice not found")
-    return _enrich_invoice(db, inv)
+    return inv
+
+
+@async_router.get("/{invoice_id}", response_model=InvoiceOut)
+async def get_invoice_async(
+    invoice_id: UUID, db: AsyncSession = Depends(get_async_read_db), _user: User = Depends(get_current_user)
+):
+    row = (await db.execute(_invoice_select().where(Invoice.id == invoice_id))).first()
+    if not row:
+        raise HTTPException(status_code=404, detail="Invoice not found")
+    return _invoice_out(row, date.today())
 
 
 @router.post("", response_model=InvoiceOut, status_code=201)
@@ -110,148 +170,143 @@ def create_invoice(body: InvoiceCreate, db: Session = Depends(get_db), _user: Us
         raise HTTPException(status_code=404, detail="Client not found")
     inv = Invoice(**body.model_dump())
     db.add(inv)
+    dashboard_cache.invalidate(db)
     db.commit()
-    db.refresh(inv)
-    return _enrich_invoice(db, inv)
+    return _fetch_invoice(db, inv.id)
+
+
+def _import_stream(db: Session, file: UploadFile, auto_create_clients: bool, result: ImportResult) -> ImportResult:
+    frames = iter_frames(file.file, file.filename, settings.IMPORT_CHUNK_ROWS)
+    try:
+        return import_stream(db, frames, auto_create_clients, result, on_chunk=dashboard_cache.invalidate)
+    finally:
+        frames.close()
 
 
-@router.post("/import", response_model=ImportResult)
+def _import_parsed(db: Session, rows, errors: list, auto_create_clients: bool, result: ImportResult) -> None:
+    import_frame(db, rows, errors, auto_create_clients, result)
+    dashboard_cache.invalidate(db)
+    db.commit()
+
+
+@router.post("/import", response_model=Union[ImportResult, ImportJobOut])
 async def import_invoices(
+    response: Response,
     file: UploadFile = File(...),
     auto_create_clients: bool = Query(False),
+    stream: bool = Query(False),
+    run_async: bool = Query(False, alias="async"),
     db: Session = Depends(get_db),
     _user: User = Depends(get_current_user),
 ):
-    """Import invoices from Excel/CSV file."""
-    result = ImportResult()
-    content = await file.read()
+    """Import invoices from Excel/CSV file.
 
-    # Check file size limit
-    max_bytes = settings.MAX_UPLOAD_MB * 1024 * 1024
-    if len(content) > max_bytes:
-        raise HTTPException(status_code=400, detail=f"File too large. Maximum size is {settings.MAX_UPLOAD_MB} MB.")
+    With `stream=true` the upload is parsed and committed in chunks of
+    IMPORT_CHUNK_ROWS rows instead of being loaded whole, so files up to
+    MAX_STREAM_UPLOAD_MB can be imported in constant memory.
 
-    # Parse file
-    try:
-        if file.filename.endswith(".csv"):
-            df = pd.read_csv(io.BytesIO(content))
-        elif file.filename.endswith((".xlsx", ".xls")):
-            df = pd.read_excel(io.BytesIO(content))
-        else:
-            raise HTTPException(status_code=400, detail="Unsupported file format. Use CSV or XLSX.")
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=f"Failed to read file: {str(e)}")
-
-    # Normalize column names for robust parsing
-    df.columns = df.columns.str.strip().str.lower()
-
-    # Create mapping of expected normalized column names
-    col_map = {
-        "client name": ["client name", "client", "company name", "clientname"],
-        "invoice number": ["invoice number", "invoice no", "invoiceno", "invoice #", "invoice"],
-        "invoice date": ["invoice date", "date", "invoicedate"],
-        "due date": ["due date", "duedate"],
-        "invoice amount": ["invoice amount", "amount", "total", "total amount", "invoiceamount"]
-    }
-
-    # Find matching columns
-    matched_cols = {}
-    for canonical, variations in col_map.items():
-        for col in df.columns:
-            if col in variations:
-                matched_cols[canonical] = col
-                break
-    
-    missing = set(col_map.keys()) - set(matched_cols.keys())
-    if missing:
-        raise HTTPException(status_code=400, detail=f"Missing required columns. Looked for: {', '.join(missing)}")
-
-    result.total_rows = len(df)
-
-    for idx, row in df.iterrows():
-        row_num = idx + 2  # 1-indexed + header row
-        errors_in_row = []
-
-        # Validate fields
-        client_col = matched_cols["client name"]
-        inv_num_col = matched_cols["invoice number"]
-        inv_date_col = matched_cols["invoice date"]
-        due_date_col = matched_cols["due date"]
-        amount_col = matched_cols["invoice amount"]
-
-        client_name = str(row.get(client_col, "")).strip()
-        invoice_number = str(row.get(inv_num_col, "")).strip()
-        if not client_name or client_name == "nan":
-            errors_in_row.append(f"Row {row_num}: Missing Client Name")
-            client_name = ""
-        if not invoice_number or invoice_number == "nan":
-            errors_in_row.append(f"Row {row_num}: Missing Invoice Number")
-            invoice_number = ""
-
-        # Parse dates
-        try:
-            invoice_date = pd.to_datetime(row[inv_date_col]).date()
-        except Exception:
-            errors_in_row.append(f"Row {row_num}: Invalid Invoice Date")
-            invoice_date = None
+    With `async=true` the streaming import runs on a background worker and
+    the response is a 202 with the job; poll `GET /invoices/import/{job_id}`.
+    """
+    result = ImportResult()
+    if stream or run_async:
+        max_bytes = settings.MAX_STREAM_UPLOAD_MB * 1024 * 1024
+        if file.size is not None and file.size > max_bytes:
+            raise HTTPException(status_code=400, detail=f"File too large. Maximum size is {settings.MAX_STREAM_UPLOAD_MB} MB.")
+    if run_async:
+        if not file.filename.endswith((".csv", ".xlsx")):
+            raise HTTPException(status_code=400, detail="Unsupported file format for background import. Use CSV or XLSX.")
+        job = await run_in_threadpool(submit_import_job, db, file.file, file.filename, auto_create_clients, _user.username)
+        response.status_code = 202
+        return job_out(job)
+
+    # Parsing and DB work stay off the event loop so other requests keep flowing
+    async with import_slot():
+        started = time.perf_counter()
+        if stream:
+            try:
+                await run_in_threadpool(_import_stream, db, file, auto_create_clients, result)
+            except ImportReadError as e:
+                if not result.total_rows:
+                    raise HTTPException(status_code=400, detail=f"Failed to read file: {str(e)}")
+                # Chunks before the malformed one are already committed
+                raise HTTPException(status_code=400, detail=f"Failed to read file after {result.total_rows} rows: {str(e)}")
+            except ImportFormatError as e:
+                raise HTTPException(status_code=400, detail=str(e))
+            observe_import("stream", result.total_rows, started)
+            return result
+
+        content = await file.read()
+
+        # Check file size limit
+        max_bytes = settings.MAX_UPLOAD_MB * 1024 * 1024
+        if len(content) > max_bytes:
+            raise HTTPException(status_code=400, detail=f"File too large. Maximum size is {settings.MAX_UPLOAD_MB} MB.")
 
         try:
-            due_date = pd.to_datetime(row[due_date_col]).date()
-        except Exception:
-            errors_in_row.append(f"Row {row_num}: Invalid Due Date")
-            due_date = None
+            result.total_rows, rows, errors = await parse_in_process(content, file.filename)
+        except ImportFormatError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        await run_in_threadpool(_import_parsed, db, rows, errors, auto_create_clients, result)
+        observe_import("upload", result.total_rows, started)
+    return result
 
-        # Parse amount
-        try:
-            amount_val = str(row[amount_col]).replace(",", "").strip() # Remove commas if present
-            amount = Decimal(amount_val)
-            if amount <= 0:
-                errors_in_row.append(f"Row {row_num}: Invoice Amount must be positive")
-                amount = None
-        except (InvalidOperation, ValueError, TypeError):
-            errors_in_row.append(f"Row {row_num}: Invalid Invoice Amount")
-            amount = None
-
-        if errors_in_row:
-            result.errors.extend(errors_in_row)
-            continue
-
-        # Check duplicate
-        exists = db.query(Invoice).filter(Invoice.invoice_number == invoice_number).first()
-        if exists:
-            result.duplicates += 1
-            continue
-
-        # Find or create client
-        client = db.query(Client).filter(Client.company_name.ilike(client_name)).first()
-        if not client:
-            if auto_create_clients:
-                client = Client(company_name=client_name)
-                db.add(client)
-                db.flush()
-                result.new_clients_created += 1
-            else:
-                result.errors.append(f"Row {row_num}: Client '{client_name}' not found")
-                continue
-
-        inv = Invoice(
-            client_id=client.id,
-            invoice_number=invoice_number,
-            invoice_date=invoice_date,
-            due_date=due_date,
-            total_amount=amount,
+
+@router.get("/import/{job_id}", response_model=ImportJobOut)
+def get_import_job(job_id: UUID, db: Session = Depends(get_db), _user: User = Depends(get_current_user)):
+    job = db.query(ImportJob).filter(ImportJob.id == job_id).first()
+    if not job:
+        raise HTTPException(status_code=404, detail="Import job not found")
+    fail_if_stale(db, job)
+    return job_out(job)
+
+
+@router.delete("", response_model=BulkDeleteResult)
+def delete_invoices(
+    client_id: Optional[UUID] = Query(None),
+    start_date: Optional[date] = Query(None),
+    end_date: Optional[date] = Query(None),
+    import_batch_id: Optional[UUID] = Query(None),
+    db: Session = Depends(get_db),
+    _user: User = Depends(require_admin),
+):
+    """Delete every invoice matching the filters, with its payments.
+
+    Filters combine with AND and at least one is required; the date range is
+    on invoice date, inclusive. `import_batch_id` is the `batch_id` returned
+    by an import, so a bad upload can be removed in one call. The invoices go
+    in a single DELETE, their payments through the ON DELETE CASCADE foreign
+    key; the response counts both.
+    """
+    conditions = []
+    if client_id:
+        conditions.append(Invoice.client_id == client_id)
+    if start_date:
+        conditions.append(Invoice.invoice_date >= start_date)
+    if end_date:
+        conditions.append(Invoice.invoice_date <= end_date)
+    if import_batch_id:
+        conditions.append(Invoice.import_batch_id == import_batch_id)
+    if not conditions:
+        raise HTTPException(
+            status_code=400, detail="Give at least one of client_id, start_date, end_date, import_batch_id"
         )
-        db.add(inv)
-        result.imported += 1
 
+    # Counted before the DELETE: rows removed by the cascade are not in its rowcount
+    payments = db.execute(
+        select(func.count(Payment.id)).join(Invoice, Payment.invoice_id == Invoice.id).where(*conditions)
+    ).scalar_one()
+    invoices = db.execute(delete(Invoice).where(*conditions)).rowcount
+    if invoices:
+        dashboard_cache.invalidate(db)
     db.commit()
-    return result
+    return BulkDeleteResult(invoices=invoices, payments=payments)
 
 
 @router.delete("/{invoice_id}", status_code=204)
 def delete_invoice(invoice_id: UUID, db: Session = Depends(get_db), _user: User = Depends(require_admin)):
-    inv = db.query(Invoice).filter(Invoice.id == invoice_id).first()
-    if not inv:
+    # One statement; the foreign key cascades to the invoice's payments
+    if not db.execute(delete(Invoice).where(Invoice.id == invoice_id)).rowcount:
         raise HTTPException(status_code=404, detail="Invoice not found")
-    db.delete(inv)
+    dashboard_cache.invalidate(db)
     db.commit()
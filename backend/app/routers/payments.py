@@ -1,61 +1,72 @@
-from decimal import Decimal
 from typing import List, Optional
 from uuid import UUID
 
 
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy import func
+from fastapi import APIRouter, Depends, File, HTTPException, Query, UploadFile
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 
-from app.database import get_db
+from app.database import get_db, get_read_db
 from app.models import Payment, Invoice, Client, User
-from app.schemas import PaymentCreate, PaymentOut
+from app.schemas import (
+    BulkPaymentCreate, BulkPaymentItem, BulkPaymentResult, PaymentCreate, PaymentOut, StatementImportResult
+)
 from app.deps import get_current_user, require_admin
+from app.cache import dashboard_cache
+from app.balances import apply_payment, apply_payments
+from app.config import settings
+from app.importer import ImportFormatError
+from app.import_jobs import import_slot
+from app.reconcile import parse_statement, reconcile_statement
 
 router = APIRouter(prefix="/payments", tags=["Payments"])
 
 
+def _payment_select():
+    """Payment columns plus invoice number and client name in one joined projection."""
+    return (
+        select(
+            Payment.id,
+            Payment.invoice_id,
+            Payment.amount,
+            Payment.payment_date,
+            Payment.payment_mode,
+            Payment.remarks,
+            Payment.created_at,
+            Invoice.invoice_number,
+            Client.company_name.label("client_name"),
+        )
+        .join(Invoice, Payment.invoice_id == Invoice.id)
+        .outerjoin(Client, Invoice.client_id == Client.id)
+    )
+
+
 @router.get("", response_model=List[PaymentOut])
 def list_payments(
     invoice_id: Optional[UUID] = Query(None),
     client_id: Optional[UUID] = Query(None),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     _user: User = Depends(get_current_user),
 ):
-    q = db.query(Payment).join(Invoice)
+    q = _payment_select()
     if invoice_id:
-        q = q.filter(Payment.invoice_id == invoice_id)
+        q = q.where(Payment.invoice_id == invoice_id)
     if client_id:
-        q = q.filter(Invoice.client_id == client_id)
-    payments = q.order_by(Payment.payment_date.desc()).all()
-    result = []
-    for p in payments:
-        inv = p.invoice
-        result.append(PaymentOut(
-            id=p.id,
-            invoice_id=p.invoice_id,
-            amount=p.amount,
-            payment_date=p.payment_date,
-            payment_mode=p.payment_mode,
-            remarks=p.remarks,
-            created_at=p.created_at,
-            invoice_number=inv.invoice_number if inv else None,
-            client_name=inv.client.company_name if inv and inv.client else None,
-        ))
-    return result
+        q = q.where(Invoice.client_id == client_id)
+    q = q.order_by(Payment.payment_date.desc(), Payment.id)
+    return [PaymentOut(**row._mapping) for row in db.execute(q)]
 
 
 @router.post("", response_model=PaymentOut, status_code=201)
 def create_payment(body: PaymentCreate, db: Session = Depends(get_db), _user: User = Depends(get_current_user)):
-    inv = db.query(Invoice).filter(Invoice.id == body.invoice_id).first()
+    # Lock the invoice row so concurrent payments see each other's balance
+    inv = db.query(Invoice).filter(Invoice.id == body.invoice_id).with_for_update().first()
     if not inv:
         raise HTTPException(status_code=404, detail="Invoice not found")
 
     # Check if payment exceeds outstanding
-    paid = db.query(func.coalesce(func.sum(Payment.amount), 0)).filter(
-        Payment.invoice_id == inv.id
-    ).scalar()
-    outstanding = inv.total_amount - Decimal(str(paid))
+    outstanding = inv.outstanding
     if body.amount > outstanding:
         raise HTTPException(
             status_code=400,
@@ -64,6 +75,8 @@ def create_payment(body: PaymentCreate, db: Session = Depends(get_db), _user: Us
 
     payment = Payment(**body.model_dump())
     db.add(payment)
+    apply_payment(inv, body.amount)
+    dashboard_cache.invalidate(db)
     db.commit()
     db.refresh(payment)
     return PaymentOut(
@@ -79,10 +92,79 @@ def create_payment(body: PaymentCreate, db: Session = Depends(get_db), _user: Us
     )
 
 
+@router.post("/bulk", response_model=BulkPaymentResult)
+def create_payments_bulk(
+    body: BulkPaymentCreate, db: Session = Depends(get_db), _user: User = Depends(get_current_user)
+):
+    """Record up to 1000 payments in one transaction.
+
+    Each payment is accepted or rejected on its own (unknown invoice, or more
+    than the invoice's outstanding balance after the batch's earlier
+    payments); `results` reports every item by its position in `payments`.
+    """
+    outcomes = apply_payments(db, [item.model_dump() for item in body.payments])
+    result = BulkPaymentResult()
+    for index, (payment, error) in enumerate(outcomes):
+        if error:
+            result.failed += 1
+            result.results.append(BulkPaymentItem(index=index, error=error))
+        else:
+            result.created += 1
+            result.results.append(BulkPaymentItem(index=index, payment=PaymentOut(**payment)))
+    if result.created:
+        dashboard_cache.invalidate(db)
+        db.commit()
+    return result
+
+
+def _import_statement(db: Session, content: bytes, filename: str) -> StatementImportResult:
+    result = StatementImportResult()
+    result.total_rows, lines, result.errors = parse_statement(content, filename)
+    result.credit_lines = len(lines)
+    reconcile_statement(db, lines, result)
+    if result.applied:
+        dashboard_cache.invalidate(db)
+        db.commit()
+    return result
+
+
+@router.post("/import", response_model=StatementImportResult)
+async def import_statement(
+    file: UploadFile = File(...),
+    db: Session = Depends(get_db),
+    _user: User = Depends(get_current_user),
+):
+    """Reconcile a bank statement (CSV/XLSX) against open invoices.
+
+    Credit lines whose narration identifies an invoice (by number) or a
+    client (by name) exactly are recorded as payments; the rest come back
+    in `review` with the reason and candidate invoices. See app/reconcile.py
+    for the matching rules.
+    """
+    async with import_slot():
+        content = await file.read()
+        max_bytes = settings.MAX_UPLOAD_MB * 1024 * 1024
+        if len(content) > max_bytes:
+            raise HTTPException(status_code=400, detail=f"File too large. Maximum size is {settings.MAX_UPLOAD_MB} MB.")
+        try:
+            return await run_in_threadpool(_import_statement, db, content, file.filename)
+        except ImportFormatError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+
 @router.delete("/{payment_id}", status_code=204)
 def delete_payment(payment_id: UUID, db: Session = Depends(get_db), _user: User = Depends(require_admin)):
-    payment = db.query(Payment).filter(Payment.id == payment_id).first()
+    invoice_id = db.execute(select(Payment.invoice_id).where(Payment.id == payment_id)).scalar()
+    if invoice_id is None:
+        raise HTTPException(status_code=404, detail="Payment not found")
+    # Invoice first, as on the create paths, then the payment again under the
+    # lock: a concurrent delete of the same payment must not subtract it twice
+    inv = db.query(Invoice).filter(Invoice.id == invoice_id).with_for_update().first()
+    payment = db.query(Payment).filter(Payment.id == payment_id).with_for_update().first()
     if not payment:
         raise HTTPException(status_code=404, detail="Payment not found")
+    if inv:
+        apply_payment(inv, -payment.amount)
     db.delete(payment)
+    dashboard_cache.invalidate(db)
     db.commit()
@@ -0,0 +1,52 @@
+from datetime import date
+from typing import List, Optional
+from uuid import UUID
+
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session
+
+from app.database import get_db, get_read_db
+from app.models import User
+from app.schemas import OverdueClient, ReminderBatchCreate, ReminderBatchResult, ReminderOut, ReminderSkip
+from app.deps import get_current_user
+from app.reminders import overdue_clients, overdue_query, queue_reminders
+
+router = APIRouter(prefix="/reminders", tags=["Reminders"])
+
+
+@router.get("/overdue", response_model=List[OverdueClient])
+def list_overdue(
+    min_days_overdue: int = Query(1, ge=1),
+    client_id: Optional[UUID] = Query(None),
+    db: Session = Depends(get_read_db),
+    _user: User = Depends(get_current_user),
+):
+    """Clients with open invoices at least `min_days_overdue` days past due, with those invoices."""
+    q = overdue_query(date.today(), min_days_overdue, [client_id] if client_id else None)
+    return overdue_clients(db.execute(q))
+
+
+@router.post("/batch", response_model=ReminderBatchResult)
+def create_reminder_batch(
+    body: ReminderBatchCreate, db: Session = Depends(get_db), user: User = Depends(get_current_user)
+):
+    """Queue reminders for overdue clients in the outbox.
+
+    One message per client and channel lists the client's overdue invoices,
+    worded as the client page's WhatsApp/email reminders, with a wa.me or
+    mailto: link carrying the same text. Clients without a phone number or
+    email for a channel, or with a reminder still pending on it, are
+    reported in `skipped`. send_reminders.py delivers the queued messages.
+    """
+    clients = overdue_clients(db.execute(overdue_query(date.today(), body.min_days_overdue, body.client_ids)))
+    queued, skipped = queue_reminders(db, clients, list(dict.fromkeys(body.channels)), user.username)
+    db.commit()
+    return ReminderBatchResult(
+        clients=len(clients),
+        queued=len(queued),
+        reminders=[ReminderOut(**row) for row in queued],
+        skipped=[
+            ReminderSkip(client_id=client["client_id"], company_name=client["company_name"], channel=channel, reason=reason)
+            for client, channel, reason in skipped
+        ],
+    )
@@ -1,75 +1,121 @@
-import io
 from datetime import date
-from decimal import Decimal
+from functools import partial
 from typing import Optional
 from uuid import UUID
 
 
-import pandas as pd
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from fastapi.responses import StreamingResponse
-from sqlalchemy import func
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from app.database import get_db
+from app.database import get_async_read_db, get_read_db, read_sessionmaker
 from app.models import Client, Invoice, Payment, User
-from app.schemas import InvoiceOut
 from app.deps import get_current_user
+from app.export import EXPORT_FORMATS, stream_export
 
 router = APIRouter(prefix="/reports", tags=["Reports"])
+# Async twins of the read endpoints, mounted ahead of `router` when ASYNC_DATABASE is on.
+# /export stays sync: it streams from a server-side cursor on the sync engine.
+async_router = APIRouter(prefix="/reports", tags=["Reports"])
 
+INVOICE_COLUMNS = ["Client", "Invoice #", "Invoice Date", "Due Date", "Amount", "Paid", "Outstanding", "Status", "Overdue"]
+PAYMENT_COLUMNS = ["Client", "Invoice #", "Payment Date", "Amount", "Mode", "Remarks"]
 
-def _get_invoice_data(db: Session, client_id: Optional[UUID], start_date: Optional[date], end_date: Optional[date]):
-    """Shared query logic for reports - uses a SINGLE query with JOIN."""
+
+def _invoice_report_query(
+    client_id: Optional[UUID],
+    start_date: Optional[date],
+    end_date: Optional[date],
+    balance: Optional[str] = None,
+    today: Optional[date] = None,
+):
+    """Shared query builder for invoice reports - reads the maintained balance columns.
+
+    `balance="outstanding"` keeps invoices with money owed and
+    `balance="overdue"` keeps those also past due, both filtered in SQL.
+    """
     q = (
-        db.query(
+        select(
             Client.company_name,
             Invoice.invoice_number,
             Invoice.invoice_date,
             Invoice.due_date,
             Invoice.total_amount,
-            func.coalesce(func.sum(Payment.amount), 0).label("paid_amount"),
+            Invoice.paid_amount,
+            Invoice.outstanding,
+            Invoice.status,
+        )
+        .join(Client, Invoice.client_id == Client.id)
+    )
+    if client_id:
+        q = q.where(Invoice.client_id == client_id)
+    if start_date:
+        q = q.where(Invoice.invoice_date >= start_date)
+    if end_date:
+        q = q.where(Invoice.invoice_date <= end_date)
+    if balance in ("outstanding", "overdue"):
+        q = q.where(Invoice.outstanding > 0)
+    if balance == "overdue":
+        q = q.where(Invoice.due_date < (today or date.today()))
+    return q.order_by(Client.company_name, Invoice.invoice_date.desc(), Invoice.id)
+
+
+def _paged(q, limit: Optional[int], offset: int):
+    if offset:
+        q = q.offset(offset)
+    if limit is not None:
+        q = q.limit(limit)
+    return q
+
+
+def _invoice_row(row, today: date) -> dict:
+    is_overdue = row.due_date < today and row.outstanding > 0
+    return {
+        "Client": row.company_name,
+        "Invoice #": row.invoice_number,
+        "Invoice Date": row.invoice_date,
+        "Due Date": row.due_date,
+        "Amount": float(row.total_amount),
+        "Paid": float(row.paid_amount),
+        "Outstanding": float(row.outstanding),
+        "Status": row.status,
+        "Overdue": "Yes" if is_overdue else "No",
+    }
+
+
+def _payment_report_query(client_id: Optional[UUID], start_date: Optional[date], end_date: Optional[date]):
+    q = (
+        select(
+            Client.company_name,
+            Invoice.invoice_number,
+            Payment.payment_date,
+            Payment.amount,
+            Payment.payment_mode,
+            Payment.remarks,
         )
+        .join(Invoice, Payment.invoice_id == Invoice.id)
         .join(Client, Invoice.client_id == Client.id)
-        .outerjoin(Payment, Payment.invoice_id == Invoice.id)
     )
     if client_id:
-        q = q.filter(Invoice.client_id == client_id)
+        q = q.where(Invoice.client_id == client_id)
     if start_date:
-        q = q.filter(Invoice.invoice_date >= start_date)
+        q = q.where(Payment.payment_date >= start_date)
     if end_date:
-        q = q.filter(Invoice.invoice_date <= end_date)
+        q = q.where(Payment.payment_date <= end_date)
+    return q.order_by(Payment.payment_date.desc(), Payment.id)
 
-    q = q.group_by(
-        Client.company_name, Invoice.invoice_number, Invoice.invoice_date,
-        Invoice.due_date, Invoice.total_amount,
-    ).order_by(Client.company_name, Invoice.invoice_date.desc())
 
-    rows = []
-    today = date.today()
-    for row in q.all():
-        paid_amount = Decimal(str(row.paid_amount))
-        outstanding = Decimal(str(row.total_amount)) - paid_amount
-        if outstanding <= 0:
-            status = "Paid"
-        elif paid_amount > 0:
-            status = "Partial"
-        else:
-            status = "Unpaid"
-        is_overdue = row.due_date < today and outstanding > 0
-
-        rows.append({
-            "Client": row.company_name,
-            "Invoice #": row.invoice_number,
-            "Invoice Date": row.invoice_date,
-            "Due Date": row.due_date,
-            "Amount": float(row.total_amount),
-            "Paid": float(paid_amount),
-            "Outstanding": float(outstanding),
-            "Status": status,
-            "Overdue": "Yes" if is_overdue else "No",
-        })
-    return rows
+def _payment_row(row) -> dict:
+    return {
+        "Client": row.company_name,
+        "Invoice #": row.invoice_number,
+        "Payment Date": row.payment_date.isoformat(),
+        "Amount": float(row.amount),
+        "Mode": row.payment_mode or "",
+        "Remarks": row.remarks or "",
+    }
 
 
 @router.get("/outstanding")
@@ -77,12 +123,30 @@ def outstanding_report(
     client_id: Optional[UUID] = Query(None),
     start_date: Optional[date] = Query(None),
     end_date: Optional[date] = Query(None),
-    db: Session = Depends(get_db),
+    limit: Optional[int] = Query(None, ge=1),
+    offset: int = Query(0, ge=0),
+    db: Session = Depends(get_read_db),
     _user: User = Depends(get_current_user),
 ):
-    rows = _get_invoice_data(db, client_id, start_date, end_date)
     # Only invoices with outstanding > 0
-    return [r for r in rows if r["Outstanding"] > 0]
+    today = date.today()
+    q = _paged(_invoice_report_query(client_id, start_date, end_date, "outstanding", today), limit, offset)
+    return [_invoice_row(row, today) for row in db.execute(q)]
+
+
+@async_router.get("/outstanding")
+async def outstanding_report_async(
+    client_id: Optional[UUID] = Query(None),
+    start_date: Optional[date] = Query(None),
+    end_date: Optional[date] = Query(None),
+    limit: Optional[int] = Query(None, ge=1),
+    offset: int = Query(0, ge=0),
+    db: AsyncSession = Depends(get_async_read_db),
+    _user: User = Depends(get_current_user),
+):
+    today = date.today()
+    q = _paged(_invoice_report_query(client_id, start_date, end_date, "outstanding", today), limit, offset)
+    return [_invoice_row(row, today) for row in await db.execute(q)]
 
 
 @router.get("/overdue")
@@ -90,11 +154,29 @@ def overdue_report(
     client_id: Optional[UUID] = Query(None),
     start_date: Optional[date] = Query(None),
     end_date: Optional[date] = Query(None),
-    db: Session = Depends(get_db),
+    limit: Optional[int] = Query(None, ge=1),
+    offset: int = Query(0, ge=0),
+    db: Session = Depends(get_read_db),
     _user: User = Depends(get_current_user),
 ):
-    rows = _get_invoice_data(db, client_id, start_date, end_date)
-    return [r for r in rows if r["Overdue"] == "Yes"]
+    today = date.today()
+    q = _paged(_invoice_report_query(client_id, start_date, end_date, "overdue", today), limit, offset)
+    return [_invoice_row(row, today) for row in db.execute(q)]
+
+
+@async_router.get("/overdue")
+async def overdue_report_async(
+    client_id: Optional[UUID] = Query(None),
+    start_date: Optional[date] = Query(None),
+    end_date: Optional[date] = Query(None),
+    limit: Optional[int] = Query(None, ge=1),
+    offset: int = Query(0, ge=0),
+    db: AsyncSession = Depends(get_async_read_db),
+    _user: User = Depends(get_current_user),
+):
+    today = date.today()
+    q = _paged(_invoice_report_query(client_id, start_date, end_date, "overdue", today), limit, offset)
+    return [_invoice_row(row, today) for row in await db.execute(q)]
 
 
 @router.get("/payments")
@@ -102,53 +184,58 @@ def payment_report(
     client_id: Optional[UUID] = Query(None),
     start_date: Optional[date] = Query(None),
     end_date: Optional[date] = Query(None),
-    db: Session = Depends(get_db),
+    limit: Optional[int] = Query(None, ge=1),
+    offset: int = Query(0, ge=0),
+    db: Session = Depends(get_read_db),
     _user: User = Depends(get_current_user),
 ):
-    q = db.query(Payment).join(Invoice).join(Client)
-    if client_id:
-        q = q.filter(Invoice.client_id == client_id)
-    if start_date:
-        q = q.filter(Payment.payment_date >= start_date)
-    if end_date:
-        q = q.filter(Payment.payment_date <= end_date)
-    payments = q.order_by(Payment.payment_date.desc()).all()
+    q = _paged(_payment_report_query(client_id, start_date, end_date), limit, offset)
+    return [_payment_row(row) for row in db.execute(q)]
+
 
-    return [{
-        "Client": p.invoice.client.company_name,
-        "Invoice #": p.invoice.invoice_number,
-        "Payment Date": p.payment_date.isoformat(),
-        "Amount": float(p.amount),
-        "Mode": p.payment_mode or "",
-        "Remarks": p.remarks or "",
-    } for p in payments]
+@async_router.get("/payments")
+async def payment_report_async(
+    client_id: Optional[UUID] = Query(None),
+    start_date: Optional[date] = Query(None),
+    end_date: Optional[date] = Query(None),
+    limit: Optional[int] = Query(None, ge=1),
+    offset: int = Query(0, ge=0),
+    db: AsyncSession = Depends(get_async_read_db),
+    _user: User = Depends(get_current_user),
+):
+    q = _paged(_payment_report_query(client_id, start_date, end_date), limit, offset)
+    return [_payment_row(row) for row in await db.execute(q)]
 
 
 @router.get("/export")
 def export_report(
+    request: Request,
     report_type: str = Query("outstanding"),
     client_id: Optional[UUID] = Query(None),
     start_date: Optional[date] = Query(None),
     end_date: Optional[date] = Query(None),
-    db: Session = Depends(get_db),
+    format: str = Query("xlsx"),
     _user: User = Depends(get_current_user),
 ):
-    if report_type == "outstanding":
-        data = outstanding_report(client_id, start_date, end_date, db, _user)
-    elif report_type == "overdue":
-        data = overdue_report(client_id, start_date, end_date, db, _user)
-    elif report_type == "payments":
-        data = payment_report(client_id, start_date, end_date, db, _user)
-    else:
-        data = _get_invoice_data(db, client_id, start_date, end_date)
+    """Stream a report as xlsx, csv or ndjson.
 
-    df = pd.DataFrame(data)
-    output = io.BytesIO()
-    df.to_excel(output, index=False, sheet_name="Report")
-    output.seek(0)
+    Rows are read through a server-side cursor and written out as they
+    arrive, so memory use does not grow with the size of the report.
+    """
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unsupported format. Use one of: {', '.join(EXPORT_FORMATS)}")
+
+    if report_type == "payments":
+        stmt, columns, to_row = _payment_report_query(client_id, start_date, end_date), PAYMENT_COLUMNS, _payment_row
+    else:
+        today = date.today()
+        balance = report_type if report_type in ("outstanding", "overdue") else None
+        stmt = _invoice_report_query(client_id, start_date, end_date, balance, today)
+        columns, to_row = INVOICE_COLUMNS, partial(_invoice_row, today=today)
 
+    body, media_type = stream_export(stmt, columns, to_row, format, read_sessionmaker(request))
     return StreamingResponse(
-        output,
-        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        headers={"Content-Disposition": f"attachment; filename={report_type}_report.xlsx"},
+        body,
+        media_type=media_type,
+        headers={"Content-Disposition": f"attachment; filename={report_type}_report.{format}"},
     )
@@ -0,0 +1,41 @@
+"""Startup schema check.
+
+The schema is owned by Alembic (`alembic upgrade head`, see alembic.ini);
+the app no longer runs create_all on boot. At startup it only compares the
+database's alembic_version with the newest migration and logs when they
+differ.
+"""
+import logging
+import os
+
+from app.database import engine
+
+logger = logging.getLogger(__name__)
+
+ALEMBIC_INI = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "alembic.ini")
+
+
+def schema_revisions() -> tuple:
+    """Return `(current, head)`: the database's revision (None if unversioned) and the newest migration."""
+    from alembic.config import Config
+    from alembic.runtime.migration import MigrationContext
+    from alembic.script import ScriptDirectory
+
+    head = ScriptDirectory.from_config(Config(ALEMBIC_INI)).get_current_head()
+    with engine.connect() as conn:
+        current = MigrationContext.configure(conn).get_current_revision()
+    return current, head
+
+
+def check_schema_version() -> None:
+    try:
+        current, head = schema_revisions()
+    except Exception as e:
+        logger.error(f"Could not check the database schema version on startup: {e}")
+        return
+    if current is None:
+        logger.warning(f"Database has no schema version; run `alembic upgrade head` (expected {head})")
+    elif current != head:
+        logger.warning(f"Database schema is at {current} but the app expects {head}; run `alembic upgrade head`")
+    else:
+        logger.info(f"Database schema is current ({head})")
@@ -106,8 +106,29 @@ class ImportResult(BaseModel):
     total_rows: int = 0
     imported: int = 0
     duplicates: int = 0
-    errors: List[str] = []
+    errors: List[str] = []  # first IMPORT_MAX_ERRORS messages
+    error_count: int = 0
     new_clients_created: int = 0
+    batch_id: Optional[UUID] = None  # on every imported invoice; DELETE /invoices?import_batch_id= undoes the import
+
+
+class ImportJobOut(BaseModel):
+    id: UUID
+    filename: str
+    status: str  # queued | running | done | failed
+    rows_processed: int = 0
+    imported: int = 0
+    duplicates: int = 0
+    error_count: int = 0
+    errors: List[str] = []
+    elapsed_seconds: float = 0
+    detail: Optional[str] = None
+    result: Optional[ImportResult] = None  # set once the job is done
+
+
+class BulkDeleteResult(BaseModel):
+    invoices: int = 0
+    payments: int = 0
 
 
 # ── Payments ──────────────────────────────────────────────────────────
@@ -134,6 +155,65 @@ class PaymentOut(BaseModel):
         from_attributes = True
 
 
+class BulkPaymentCreate(BaseModel):
+    payments: List[PaymentCreate] = Field(..., min_length=1, max_length=1000)
+
+
+class BulkPaymentItem(BaseModel):
+    index: int  # position in the request's `payments`
+    payment: Optional[PaymentOut] = None
+    error: Optional[str] = None
+
+
+class BulkPaymentResult(BaseModel):
+    created: int = 0
+    failed: int = 0
+    results: List[BulkPaymentItem] = []
+
+
+class PaymentAllocationCreate(BaseModel):
+    amount: Decimal = Field(..., gt=0)
+    payment_date: date
+    payment_mode: Optional[str] = Field(None, max_length=50)
+    remarks: Optional[str] = Field(None, max_length=500)
+    # Invoices to pay, in order; all of the client's open invoices (oldest due first) when omitted
+    invoice_ids: Optional[List[UUID]] = Field(None, min_length=1, max_length=1000)
+
+
+class PaymentAllocationResult(BaseModel):
+    client_id: UUID
+    amount: Decimal
+    payments: List[PaymentOut]
+    outstanding: Decimal  # left unpaid on the invoices the amount was spread over
+
+
+class StatementCandidate(BaseModel):
+    invoice_id: UUID
+    invoice_number: str
+    client_name: Optional[str] = None
+    outstanding: Decimal
+
+
+class StatementReviewLine(BaseModel):
+    row: int  # row number in the statement file
+    payment_date: date
+    narration: str
+    amount: Decimal
+    reason: str
+    candidates: List[StatementCandidate] = []
+
+
+class StatementImportResult(BaseModel):
+    total_rows: int = 0
+    credit_lines: int = 0
+    applied: int = 0  # payments created; a line settling several invoices creates several
+    applied_amount: Decimal = Decimal("0")
+    duplicates: int = 0  # lines already recorded by an earlier import
+    payments: List[PaymentOut] = []
+    review: List[StatementReviewLine] = []
+    errors: List[str] = []
+
+
 # ── Dashboard ─────────────────────────────────────────────────────────
 class DashboardData(BaseModel):
     total_outstanding: Decimal = Decimal("0")
@@ -150,3 +230,60 @@ class ReportFilters(BaseModel):
     start_date: Optional[date] = None
     end_date: Optional[date] = None
 
+
+# ── Reminders ─────────────────────────────────────────────────────────
+class ReminderInvoice(BaseModel):
+    id: UUID
+    invoice_number: str
+    total_amount: Decimal
+    outstanding: Decimal
+    due_date: date
+
+
+class OverdueClient(BaseModel):
+    client_id: UUID
+    company_name: str
+    phone: Optional[str] = None
+    email: Optional[str] = None
+    invoice_count: int
+    outstanding: Decimal
+    oldest_due_date: date
+    invoices: List[ReminderInvoice]
+
+
+class ReminderBatchCreate(BaseModel):
+    channels: List[Literal["whatsapp", "email"]] = Field(["whatsapp"], min_length=1)
+    # Overdue clients to remind; every overdue client when omitted
+    client_ids: Optional[List[UUID]] = Field(None, min_length=1, max_length=1000)
+    min_days_overdue: int = Field(1, ge=1)
+
+
+class ReminderOut(BaseModel):
+    id: UUID
+    client_id: UUID
+    channel: str
+    recipient: str
+    subject: Optional[str] = None
+    body: str
+    link: str
+    invoice_count: int
+    outstanding: Decimal
+    status: str
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
+
+
+class ReminderSkip(BaseModel):
+    client_id: UUID
+    company_name: str
+    channel: str
+    reason: str
+
+
+class ReminderBatchResult(BaseModel):
+    clients: int = 0  # overdue clients considered
+    queued: int = 0
+    reminders: List[ReminderOut] = []
+    skipped: List[ReminderSkip] = []
@@ -0,0 +1,185 @@
+"""Ranked client-name search for the client typeahead.
+
+Matches are ranked in two tiers:
+
+1. Names starting with the term, A-Z (the prefix fast path; when it fills
+   the limit nothing else runs).
+2. Names containing a word similar to the term, most similar first. This
+   uses pg_trgm word similarity, so typos and words in the middle of a name
+   still match.
+
+On Postgres both tiers are index scans (migration 0003): a text_pattern_ops
+index on lower(company_name) for prefixes, and a GIN trigram index for the
+`<%` word-similarity operator. Other engines (SQLite in development and tests)
+use `NgramIndex`, an in-process trigram index over every client name. It is
+rebuilt when the `clients` cache version changes, and client writers bump that
+version through `client_index.invalidate(db)`.
+"""
+import heapq
+import re
+import threading
+from bisect import bisect_left
+from collections import Counter
+from itertools import islice
+
+from sqlalchemy import func, literal, select
+from sqlalchemy.orm import Session
+
+from app.cache import bump_version, current_version
+from app.models import Client
+
+# Terms shorter than this only get prefix matches; trigrams of one or two
+# letters match most of the table.
+MIN_FUZZY_LENGTH = 3
+# pg_trgm.word_similarity_threshold default, used by the in-process index too
+WORD_SIMILARITY_THRESHOLD = 0.6
+
+_WORD = re.compile(r"[^\W_]+")
+
+
+def normalize(term: str) -> str:
+    return " ".join(term.lower().split())
+
+
+def trigrams(text: str) -> set:
+    """pg_trgm-style trigrams: each word padded with two spaces before and one after."""
+    grams = set()
+    for word in _WORD.findall(text.lower()):
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+def _like_prefix(term: str) -> str:
+    escaped = term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return escaped + "%"
+
+
+def prefix_query(term: str, limit: int):
+    lowered = func.lower(Client.company_name)
+    return (
+        select(Client.id)
+        .where(lowered.like(_like_prefix(term), escape="\\"))
+        .order_by(lowered, Client.id)
+        .limit(limit)
+    )
+
+
+def similar_query(term: str, limit: int):
+    """Names with a word similar to `term` that do not start with it (Postgres/pg_trgm only)."""
+    lowered = func.lower(Client.company_name)
+    return (
+        select(Client.id)
+        .where(literal(term).op("<%")(lowered), ~lowered.like(_like_prefix(term), escape="\\"))
+        .order_by(
+            func.word_similarity(term, lowered).desc(),
+            func.similarity(lowered, term).desc(),
+            lowered,
+        )
+        .limit(limit)
+    )
+
+
+class NgramIndex:
+    """In-memory trigram index of client names."""
+
+    def __init__(self, rows):
+        self.ids = []
+        self.names = []
+        self.postings = {}
+        sizes = []
+        for client_id, name in rows:
+            key = normalize(name)
+            grams = trigrams(key)
+            idx = len(self.ids)
+            self.ids.append(client_id)
+            self.names.append(key)
+            sizes.append(len(grams))
+            for gram in grams:
+                self.postings.setdefault(gram, []).append(idx)
+        self.sorted_names = sorted((name, idx) for idx, name in enumerate(self.names))
+        self._sorted_keys = [name for name, _ in self.sorted_names]
+        # For a given shared-trigram count, similarity falls as a name's trigram
+        # count grows, so (size, A-Z position) orders ties as the SQL ranking
+        # does. Packed into one int per name so ranking compares plain ints.
+        self._span = len(self.names) or 1
+        self._tiebreak = [0] * len(self.names)
+        for position, (_, idx) in enumerate(self.sorted_names):
+            self._tiebreak[idx] = sizes[idx] * self._span + position
+        self._tiebreak_span = (max(sizes, default=0) + 1) * self._span
+
+    def search(self, term: str, limit: int) -> list:
+        term = normalize(term)
+        if not term:
+            return []
+
+        found = []
+        start = bisect_left(self._sorted_keys, term)
+        for name, idx in islice(self.sorted_names, start, None):
+            if not name.startswith(term) or len(found) >= limit:
+                break
+            found.append(idx)
+        if len(found) >= limit or len(term) < MIN_FUZZY_LENGTH:
+            return [self.ids[idx] for idx in found]
+
+        wanted = trigrams(term)
+        if not wanted:
+            return [self.ids[idx] for idx in found]
+        shared = Counter()
+        for gram in wanted:
+            shared.update(self.postings.get(gram, ()))
+        minimum = WORD_SIMILARITY_THRESHOLD * len(wanted)
+        # Most shared trigrams first, then higher similarity, then A-Z
+        keys = [
+            (len(wanted) - count) * self._tiebreak_span + self._tiebreak[idx]
+            for idx, count in shared.items() if count >= minimum
+        ]
+        prefixed = set(found)
+        for key in heapq.nsmallest(limit, keys):
+            idx = self.sorted_names[key % self._span][1]
+            if idx not in prefixed:
+                found.append(idx)
+                if len(found) >= limit:
+                    break
+        return [self.ids[idx] for idx in found]
+
+
+class ClientSearchIndex:
+    """Process-wide `NgramIndex`, rebuilt when the `clients` version moves."""
+
+    name = "clients"
+
+    def __init__(self):
+        self._index = None
+        self._version = None
+        self._lock = threading.Lock()
+
+    def get(self, db: Session) -> NgramIndex:
+        version = current_version(db, self.name)
+        with self._lock:
+            if self._index is None or self._version != version:
+                rows = db.execute(select(Client.id, Client.company_name)).all()
+                self._index, self._version = NgramIndex(rows), version
+            return self._index
+
+    def invalidate(self, db: Session) -> None:
+        """Call in the same transaction as any change to client names (not needed on Postgres)."""
+        if db.get_bind().dialect.name != "postgresql":
+            bump_version(db, self.name)
+
+
+client_index = ClientSearchIndex()
+
+
+def search_client_ids(db: Session, term: str, limit: int) -> list:
+    """Ids of the best `limit` clients for `term`, best first."""
+    term = normalize(term)
+    if not term:
+        return []
+    if db.get_bind().dialect.name != "postgresql":
+        return client_index.get(db).search(term, limit)
+
+    ids = list(db.execute(prefix_query(term, limit)).scalars())
+    if len(ids) < limit and len(term) >= MIN_FUZZY_LENGTH:
+        ids.extend(db.execute(similar_query(term, limit - len(ids))).scalars())
+    return ids
@@ -0,0 +1,45 @@
+"""Per-request SQL timing.
+
+`SQLTimingMiddleware` gives each HTTP request a `QueryStats` (via the
+`request_stats` context variable, which the engine hooks in app/database.py
+update) and reports it in a `Server-Timing` header:
+
+    Server-Timing: db;desc="4 queries";dur=12.31, db-pool;dur=0.04
+
+Queries made after the headers are sent (streamed exports) are not included.
+"""
+from app.database import QueryStats, request_stats
+
+
+def server_timing(stats: QueryStats) -> str:
+    return (
+        f'db;desc="{stats.queries} queries";dur={stats.db_seconds * 1000:.2f}, '
+        f"db-pool;dur={stats.pool_wait_seconds * 1000:.2f}"
+    )
+
+
+class SQLTimingMiddleware:
+    """Plain ASGI middleware, so the context variable reaches the endpoint and its threadpool."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = QueryStats(scope)
+        token = request_stats.set(stats)
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", server_timing(stats).encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            request_stats.reset(token)
@@ -0,0 +1,80 @@
+"""
+Backfill and verify the maintained invoice balance columns.
+
+    python backfill_balances.py            # add missing columns, then backfill from payments
+    python backfill_balances.py --check    # report invoices whose balances disagree with payments
+
+--check exits with status 1 when mismatches are found, so it can run from cron/CI.
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import inspect, text
+
+from app.database import SessionLocal, engine
+from app.balances import recompute_balances, find_balance_mismatches
+
+BALANCE_COLUMNS = {
+    "paid_amount": "NUMERIC(12, 2) NOT NULL DEFAULT 0",
+    "outstanding": "NUMERIC(12, 2)",
+    "status": "VARCHAR(10) NOT NULL DEFAULT 'Unpaid'",
+}
+
+
+def add_missing_columns():
+    existing = {c["name"] for c in inspect(engine).get_columns("invoices")}
+    with engine.begin() as conn:
+        for name, ddl in BALANCE_COLUMNS.items():
+            if name not in existing:
+                print(f"Adding invoices.{name}...")
+                conn.execute(text(f"ALTER TABLE invoices ADD COLUMN {name} {ddl}"))
+        if "status" not in existing:
+            conn.execute(text("CREATE INDEX IF NOT EXISTS ix_invoices_status ON invoices (status)"))
+
+
+def backfill():
+    add_missing_columns()
+    db = SessionLocal()
+    try:
+        count = recompute_balances(db)
+        db.commit()
+        print(f"✅ Backfilled balances for {count} invoices")
+    finally:
+        db.close()
+    if engine.dialect.name == "postgresql":
+        with engine.begin() as conn:
+            conn.execute(text("ALTER TABLE invoices ALTER COLUMN outstanding SET NOT NULL"))
+
+
+def check():
+    db = SessionLocal()
+    try:
+        mismatches = find_balance_mismatches(db)
+    finally:
+        db.close()
+    for row in mismatches:
+        print(
+            f"Invoice {row.invoice_number}: stored paid={row.paid_amount} outstanding={row.outstanding} "
+            f"status={row.status}, payments total={row.actual_paid}"
+        )
+    if mismatches:
+        print(f"❌ {len(mismatches)} invoice(s) out of sync. Run without --check to repair.")
+        return 1
+    print("✅ All invoice balances match payments")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--check", action="store_true", help="only verify, do not modify")
+    args = parser.parse_args()
+    if args.check:
+        sys.exit(check())
+    backfill()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Measure cold-start cost of the API.
+
+    python benchmark_startup.py              # 3 runs of each measurement
+    python benchmark_startup.py --runs 5 --top 15
+
+Each run uses a fresh interpreter:
+- import: time to `import app.main` (from -X importtime), plus the slowest
+  top-level imports of the last run
+- first /health: from launching uvicorn until /health first answers 200
+"""
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def measure_import():
+    """Return (seconds to import app.main, [(seconds, module)] of its direct imports, all module names)."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"],
+        cwd=HERE, capture_output=True, text=True, check=True,
+    )
+    total, direct, names = None, [], set()
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, field = line.split("|")
+        name = field.strip()
+        depth = (len(field) - len(field.lstrip()) - 1) // 2  # two spaces per nesting level
+        seconds = int(cumulative) / 1e6
+        names.add(name)
+        if name == "app.main":
+            total = seconds
+        elif depth == 1:
+            direct.append((seconds, name))
+    return total, sorted(direct, reverse=True), names
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def measure_first_health(timeout: float = 60.0) -> float:
+    port = _free_port()
+    url = f"http://127.0.0.1:{port}/health"
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=HERE,
+    )
+    try:
+        while time.perf_counter() - start < timeout:
+            if server.poll() is not None:
+                raise RuntimeError(f"uvicorn exited with status {server.returncode}")
+            try:
+                with urllib.request.urlopen(url, timeout=1) as response:
+                    if response.status == 200:
+                        return time.perf_counter() - start
+            except OSError:
+                time.sleep(0.01)
+        raise RuntimeError(f"/health did not answer within {timeout:.0f}s")
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure API import time and time to first /health")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--top", type=int, default=10, help="slowest top-level imports to list")
+    args = parser.parse_args()
+
+    import_times, modules, names = [], [], set()
+    for _ in range(args.runs):
+        seconds, modules, names = measure_import()
+        import_times.append(seconds)
+    health_times = [measure_first_health() for _ in range(args.runs)]
+
+    print(f"import app.main:  median {statistics.median(import_times) * 1000:.0f} ms  "
+          f"(runs: {', '.join(f'{t * 1000:.0f}' for t in import_times)})")
+    print(f"first /health:    median {statistics.median(health_times) * 1000:.0f} ms  "
+          f"(runs: {', '.join(f'{t * 1000:.0f}' for t in health_times)})")
+    print("\nSlowest imports under app.main (last run):")
+    for seconds, name in modules[:args.top]:
+        print(f"  {seconds * 1000:8.1f} ms  {name}")
+    for heavy in ("pandas", "numpy", "openpyxl"):
+        if heavy in names:
+            print(f"⚠️  {heavy} is imported at startup")
+
+
+if __name__ == "__main__":
+    main()
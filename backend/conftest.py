@@ -0,0 +1,71 @@
+import os
+import tempfile
+import uuid
+
+import pytest
+
+# Keep the test suite off the configured (production) database: unless a test
+# DATABASE_URL is given, the app runs against a throwaway SQLite file.
+os.environ.setdefault("DATABASE_URL", "sqlite:///" + os.path.join(tempfile.mkdtemp(), "test.db"))
+
+
+def pytest_configure(config):
+    config.addinivalue_line(
+        "markers", "benchmark: wall-clock performance check; runs only with RUN_BENCHMARKS=1"
+    )
+
+
+def pytest_collection_modifyitems(config, items):
+    # Timing assertions depend on the machine, so they stay out of the default run
+    if os.environ.get("RUN_BENCHMARKS") == "1":
+        return
+    skip = pytest.mark.skip(reason="benchmark; set RUN_BENCHMARKS=1 to run")
+    for item in items:
+        if "benchmark" in item.keywords:
+            item.add_marker(skip)
+
+
+@pytest.fixture
+def client():
+    """TestClient for the app, signed in as an admin."""
+    from fastapi.testclient import TestClient
+
+    from app.main import app
+    from app.database import Base, engine
+    from app.deps import get_current_user
+    from app.models import User
+
+    Base.metadata.create_all(bind=engine)
+    app.dependency_overrides[get_current_user] = lambda: User(username="tester", role="admin", full_name="Tester")
+    # One portal, so every request shares the app's event loop as under uvicorn
+    with TestClient(app) as c:
+        yield c
+    app.dependency_overrides.clear()
+
+
+@pytest.fixture
+def make_client(client):
+    """Create a client through the API and return its id."""
+    def make(company_name=None, **fields):
+        response = client.post("/api/clients", json={
+            "company_name": company_name or f"Client {uuid.uuid4().hex[:8]}", **fields,
+        })
+        assert response.status_code == 201
+        return response.json()["id"]
+    return make
+
+
+@pytest.fixture
+def make_invoice(client):
+    """Create an invoice through the API and return its id."""
+    def make(client_id, amount, due="2026-02-01", number=None, invoice_date="2020-01-01"):
+        response = client.post("/api/invoices", json={
+            "client_id": client_id,
+            "invoice_number": number or f"INV-{uuid.uuid4().hex[:10]}",
+            "invoice_date": invoice_date,
+            "due_date": due,
+            "total_amount": amount,
+        })
+        assert response.status_code == 201
+        return response.json()["id"]
+    return make
@@ -0,0 +1,71 @@
+import time
+from logging.config import fileConfig
+
+from alembic import context
+from sqlalchemy import create_engine, pool
+
+from app.config import settings
+from app.database import Base
+import app.models  # noqa: F401  (registers the tables on Base.metadata)
+
+config = context.config
+if config.config_file_name is not None:
+    fileConfig(config.config_file_name, disable_existing_loggers=False)
+
+target_metadata = Base.metadata
+
+# Arbitrary key for the advisory lock held while migrating
+MIGRATION_LOCK_ID = 7315002
+MIGRATION_LOCK_POLL_SECONDS = 1
+
+
+def run_migrations_offline() -> None:
+    """Emit the migration SQL without connecting (alembic upgrade --sql)."""
+    context.configure(
+        url=settings.DATABASE_URL,
+        target_metadata=target_metadata,
+        literal_binds=True,
+        dialect_opts={"paramstyle": "named"},
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def _run_migrations(connection) -> None:
+    context.configure(connection=connection, target_metadata=target_metadata)
+    # Serialize concurrent upgrades. The lock is session-level because some
+    # migrations commit partway through (autocommit_block for CREATE INDEX
+    # CONCURRENTLY), which would release a transaction-level lock. Waiters
+    # poll instead of blocking: CREATE INDEX CONCURRENTLY waits for every open
+    # transaction, including one stuck in pg_advisory_lock, and would deadlock.
+    locked = connection.dialect.name == "postgresql"
+    if locked:
+        while not connection.exec_driver_sql(f"SELECT pg_try_advisory_lock({MIGRATION_LOCK_ID})").scalar():
+            connection.commit()
+            time.sleep(MIGRATION_LOCK_POLL_SECONDS)
+        connection.commit()
+    try:
+        with context.begin_transaction():
+            context.run_migrations()
+    finally:
+        if locked:
+            connection.rollback()
+            connection.exec_driver_sql(f"SELECT pg_advisory_unlock({MIGRATION_LOCK_ID})")
+            connection.commit()
+
+
+def run_migrations_online() -> None:
+    # Callers (e.g. test_explain.py) may pass their own connection in config.attributes
+    connection = config.attributes.get("connection")
+    if connection is not None:
+        _run_migrations(connection)
+        return
+    connectable = create_engine(settings.DATABASE_URL, poolclass=pool.NullPool)
+    with connectable.connect() as connection:
+        _run_migrations(connection)
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
@@ -0,0 +1,150 @@
+"""baseline schema
+
+The schema as create_all used to build it on every boot. Tables that already
+exist are left alone and indexes use IF NOT EXISTS, so `alembic upgrade head`
+also adopts databases created before migrations. An existing invoices table
+that predates the maintained balance columns (paid_amount, outstanding,
+status) gets them added and backfilled from its payments.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-17 00:10:17.557831
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0001'
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    existing = set(sa.inspect(op.get_bind()).get_table_names())
+
+    if 'cache_versions' not in existing:
+        op.create_table('cache_versions',
+        sa.Column('name', sa.String(length=50), nullable=False),
+        sa.Column('version', sa.BigInteger(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('name')
+        )
+    if 'clients' not in existing:
+        op.create_table('clients',
+        sa.Column('id', sa.UUID(), nullable=False),
+        sa.Column('company_name', sa.String(length=200), nullable=False),
+        sa.Column('contact_person', sa.String(length=100), nullable=True),
+        sa.Column('phone', sa.String(length=20), nullable=True),
+        sa.Column('email', sa.String(length=100), nullable=True),
+        sa.Column('credit_limit', sa.Numeric(precision=12, scale=2), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+        )
+    op.create_index(op.f('ix_clients_company_name'), 'clients', ['company_name'], unique=False, if_not_exists=True)
+    if 'import_jobs' not in existing:
+        op.create_table('import_jobs',
+        sa.Column('id', sa.UUID(), nullable=False),
+        sa.Column('filename', sa.String(length=255), nullable=False),
+        sa.Column('status', sa.String(length=20), nullable=False),
+        sa.Column('rows_processed', sa.Integer(), nullable=False),
+        sa.Column('imported', sa.Integer(), nullable=False),
+        sa.Column('duplicates', sa.Integer(), nullable=False),
+        sa.Column('error_count', sa.Integer(), nullable=False),
+        sa.Column('new_clients_created', sa.Integer(), nullable=False),
+        sa.Column('errors', sa.Text(), nullable=True),
+        sa.Column('detail', sa.Text(), nullable=True),
+        sa.Column('created_by', sa.String(length=50), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('started_at', sa.DateTime(), nullable=True),
+        sa.Column('finished_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+        )
+    if 'users' not in existing:
+        op.create_table('users',
+        sa.Column('id', sa.UUID(), nullable=False),
+        sa.Column('username', sa.String(length=50), nullable=False),
+        sa.Column('hashed_password', sa.String(length=255), nullable=False),
+        sa.Column('full_name', sa.String(length=100), nullable=False),
+        sa.Column('role', sa.String(length=20), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+        )
+    op.create_index(op.f('ix_users_username'), 'users', ['username'], unique=True, if_not_exists=True)
+    if 'invoices' not in existing:
+        op.create_table('invoices',
+        sa.Column('id', sa.UUID(), nullable=False),
+        sa.Column('client_id', sa.UUID(), nullable=False),
+        sa.Column('invoice_number', sa.String(length=50), nullable=False),
+        sa.Column('invoice_date', sa.Date(), nullable=False),
+        sa.Column('due_date', sa.Date(), nullable=False),
+        sa.Column('total_amount', sa.Numeric(precision=12, scale=2), nullable=False),
+        sa.Column('paid_amount', sa.Numeric(precision=12, scale=2), server_default='0', nullable=False),
+        sa.Column('outstanding', sa.Numeric(precision=12, scale=2), nullable=False),
+        sa.Column('status', sa.String(length=10), server_default='Unpaid', nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['client_id'], ['clients.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id')
+        )
+    else:
+        _add_balance_columns(has_payments='payments' in existing)
+    op.create_index('ix_invoices_invoice_date_id', 'invoices', ['invoice_date', 'id'], unique=False, if_not_exists=True)
+    op.create_index(op.f('ix_invoices_invoice_number'), 'invoices', ['invoice_number'], unique=True, if_not_exists=True)
+    op.create_index(op.f('ix_invoices_status'), 'invoices', ['status'], unique=False, if_not_exists=True)
+    if 'payments' not in existing:
+        op.create_table('payments',
+        sa.Column('id', sa.UUID(), nullable=False),
+        sa.Column('invoice_id', sa.UUID(), nullable=False),
+        sa.Column('amount', sa.Numeric(precision=12, scale=2), nullable=False),
+        sa.Column('payment_date', sa.Date(), nullable=False),
+        sa.Column('payment_mode', sa.String(length=50), nullable=True),
+        sa.Column('remarks', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['invoice_id'], ['invoices.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id')
+        )
+
+
+def _add_balance_columns(has_payments: bool) -> None:
+    """Add and backfill the invoice balance columns on a pre-migration database."""
+    bind = op.get_bind()
+    columns = {c['name'] for c in sa.inspect(bind).get_columns('invoices')}
+    if {'paid_amount', 'outstanding', 'status'} <= columns:
+        return
+    if 'paid_amount' not in columns:
+        op.add_column('invoices', sa.Column('paid_amount', sa.Numeric(precision=12, scale=2), server_default='0', nullable=False))
+    if 'outstanding' not in columns:
+        op.add_column('invoices', sa.Column('outstanding', sa.Numeric(precision=12, scale=2), nullable=True))
+    if 'status' not in columns:
+        op.add_column('invoices', sa.Column('status', sa.String(length=10), server_default='Unpaid', nullable=False))
+
+    paid = (
+        'COALESCE((SELECT SUM(payments.amount) FROM payments WHERE payments.invoice_id = invoices.id), 0)'
+        if has_payments else '0'
+    )
+    op.execute(f'UPDATE invoices SET paid_amount = {paid}')
+    op.execute(
+        "UPDATE invoices SET outstanding = total_amount - paid_amount, status = CASE "
+        "WHEN total_amount - paid_amount <= 0 THEN 'Paid' WHEN paid_amount > 0 THEN 'Partial' ELSE 'Unpaid' END"
+    )
+    if bind.dialect.name == 'postgresql':
+        # SQLite cannot alter a column's nullability in place; the app always writes it
+        op.alter_column('invoices', 'outstanding', nullable=False)
+
+
+def downgrade() -> None:
+    op.drop_table('payments')
+    op.drop_index(op.f('ix_invoices_status'), table_name='invoices')
+    op.drop_index(op.f('ix_invoices_invoice_number'), table_name='invoices')
+    op.drop_index('ix_invoices_invoice_date_id', table_name='invoices')
+    op.drop_table('invoices')
+    op.drop_index(op.f('ix_users_username'), table_name='users')
+    op.drop_table('users')
+    op.drop_table('import_jobs')
+    op.drop_index(op.f('ix_clients_company_name'), table_name='clients')
+    op.drop_table('clients')
+    op.drop_table('cache_versions')
@@ -0,0 +1,44 @@
+"""performance indexes
+
+Indexes behind the routers' joins and filters: invoices by client and due
+date, payments by invoice and payment date, and lower(company_name) for the
+importer's case-insensitive client matching. On Postgres they are built
+CONCURRENTLY so a live database keeps taking writes.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17 00:40:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0002'
+down_revision: Union[str, None] = '0001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+INDEXES = [
+    ('ix_invoices_client_id_due_date', 'invoices', ['client_id', 'due_date']),
+    ('ix_invoices_due_date', 'invoices', ['due_date']),
+    ('ix_payments_invoice_id', 'payments', ['invoice_id']),
+    ('ix_payments_payment_date', 'payments', ['payment_date']),
+    ('ix_clients_lower_company_name', 'clients', [sa.text('lower(company_name)')]),
+]
+
+
+def upgrade() -> None:
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.create_index(name, table, columns, unique=False, if_not_exists=True, postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, if_exists=True, postgresql_concurrently=True)
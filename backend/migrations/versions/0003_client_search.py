@@ -0,0 +1,52 @@
+"""client search indexes
+
+Indexes for app.search on Postgres: text_pattern_ops on lower(company_name)
+for the prefix fast path, and a pg_trgm GIN index for word-similarity
+matches. Other engines search in process and need neither.
+
+pg_trgm ships with Postgres contrib (Neon included); creating the extension
+needs a role allowed to do so.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-17 02:10:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0003'
+down_revision: Union[str, None] = '0002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+INDEXES = [
+    ('ix_clients_lower_company_name_prefix', {'postgresql_ops': {'lower_company_name': 'text_pattern_ops'}}),
+    ('ix_clients_company_name_trgm', {'postgresql_using': 'gin',
+                                      'postgresql_ops': {'lower_company_name': 'gin_trgm_ops'}}),
+]
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    with op.get_context().autocommit_block():
+        for name, options in INDEXES:
+            op.create_index(
+                name, 'clients', [sa.func.lower(sa.column('company_name')).label('lower_company_name')],
+                unique=False, if_not_exists=True, postgresql_concurrently=True, **options,
+            )
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    with op.get_context().autocommit_block():
+        for name, _ in reversed(INDEXES):
+            op.drop_index(name, table_name='clients', if_exists=True, postgresql_concurrently=True)
@@ -0,0 +1,39 @@
+"""invoice import batch
+
+Adds invoices.import_batch_id, the ImportResult.batch_id of the upload that
+created each invoice, so `DELETE /invoices?import_batch_id=` can remove a
+bad import in one statement. Existing invoices stay NULL. The index is built
+CONCURRENTLY on Postgres so a live database keeps taking writes.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-17 04:20:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0004'
+down_revision: Union[str, None] = '0003'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('invoices', sa.Column('import_batch_id', sa.UUID(), nullable=True))
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_invoices_import_batch_id', 'invoices', ['import_batch_id'],
+            unique=False, if_not_exists=True, postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_invoices_import_batch_id', table_name='invoices', if_exists=True, postgresql_concurrently=True)
+    op.drop_column('invoices', 'import_batch_id')
@@ -0,0 +1,51 @@
+"""reminder outbox
+
+Table of rendered payment reminders (WhatsApp and email) written by
+`POST /reminders/batch` and drained by send_reminders.py.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-17 05:30:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0005'
+down_revision: Union[str, None] = '0004'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('reminder_outbox',
+    sa.Column('id', sa.UUID(), nullable=False),
+    sa.Column('client_id', sa.UUID(), nullable=False),
+    sa.Column('channel', sa.String(length=10), nullable=False),
+    sa.Column('recipient', sa.String(length=100), nullable=False),
+    sa.Column('subject', sa.String(length=200), nullable=True),
+    sa.Column('body', sa.Text(), nullable=False),
+    sa.Column('link', sa.Text(), nullable=False),
+    sa.Column('invoice_count', sa.Integer(), nullable=False),
+    sa.Column('outstanding', sa.Numeric(precision=12, scale=2), nullable=False),
+    sa.Column('status', sa.String(length=10), nullable=False),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('error', sa.Text(), nullable=True),
+    sa.Column('created_by', sa.String(length=50), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('sent_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['client_id'], ['clients.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_reminder_outbox_status_created_at', 'reminder_outbox', ['status', 'created_at'], unique=False)
+    op.create_index(op.f('ix_reminder_outbox_client_id'), 'reminder_outbox', ['client_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_reminder_outbox_client_id'), table_name='reminder_outbox')
+    op.drop_index('ix_reminder_outbox_status_created_at', table_name='reminder_outbox')
+    op.drop_table('reminder_outbox')
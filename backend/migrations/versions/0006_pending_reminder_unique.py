@@ -0,0 +1,41 @@
+"""pending reminder unique
+
+Allows at most one pending reminder per client and channel, so concurrent
+`POST /reminders/batch` calls cannot queue the same message twice. Pending
+duplicates already in the outbox are marked failed first, keeping the oldest.
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-17 09:10:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0006'
+down_revision: Union[str, None] = '0005'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute(
+        "UPDATE reminder_outbox SET status = 'failed', error = 'Duplicate of an earlier pending reminder' "
+        "WHERE status = 'pending' AND EXISTS ("
+        "SELECT 1 FROM reminder_outbox AS earlier WHERE earlier.status = 'pending' "
+        "AND earlier.client_id = reminder_outbox.client_id AND earlier.channel = reminder_outbox.channel "
+        "AND (earlier.created_at < reminder_outbox.created_at "
+        "OR (earlier.created_at = reminder_outbox.created_at AND earlier.id < reminder_outbox.id)))"
+    )
+    op.create_index(
+        'uq_reminder_outbox_pending', 'reminder_outbox', ['client_id', 'channel'], unique=True,
+        postgresql_where=sa.text("status = 'pending'"), sqlite_where=sa.text("status = 'pending'"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('uq_reminder_outbox_pending', table_name='reminder_outbox')
@@ -0,0 +1,31 @@
+"""import job updated_at
+
+Adds import_jobs.updated_at, touched by every progress write, so a job whose
+worker process died can be recognised as stale and reported failed.
+Existing rows take their latest known timestamp.
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-17 09:40:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0007'
+down_revision: Union[str, None] = '0006'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('import_jobs', sa.Column('updated_at', sa.DateTime(), nullable=True))
+    op.execute("UPDATE import_jobs SET updated_at = COALESCE(finished_at, started_at, created_at)")
+
+
+def downgrade() -> None:
+    op.drop_column('import_jobs', 'updated_at')
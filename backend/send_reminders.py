@@ -0,0 +1,48 @@
+"""
+Deliver the reminders queued by POST /api/reminders/batch.
+
+    python send_reminders.py                 # send everything pending, then exit
+    python send_reminders.py --batch-size 50
+
+This is a stub sender: it logs each message instead of calling a WhatsApp or
+email provider, then marks it sent. Swap `log_sender` for a real client to go
+live. Run it from cron; several copies can run at once.
+"""
+import argparse
+import logging
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.database import SessionLocal
+from app.reminders import drain_outbox
+
+logger = logging.getLogger("send_reminders")
+
+
+def log_sender(reminder) -> None:
+    logger.info(
+        "%s to %s (%d invoices, ₹%s): %s",
+        reminder.channel, reminder.recipient, reminder.invoice_count, reminder.outstanding,
+        reminder.subject or reminder.body.splitlines()[0],
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batch-size", type=int, default=100, help="reminders claimed per transaction")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    db = SessionLocal()
+    try:
+        sent, failed = drain_outbox(db, log_sender, args.batch_size)
+    finally:
+        db.close()
+    print(f"✅ Sent {sent} reminder(s)" + (f", {failed} failed" if failed else ""))
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
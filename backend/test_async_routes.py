@@ -0,0 +1,158 @@
+"""The async read endpoints (ASYNC_DATABASE) must answer exactly like their sync twins.
+
+Needs a Postgres with psycopg's async driver and is skipped without one:
+
+    ASYNC_TEST_DATABASE_URL=postgresql+psycopg://localhost/scratch python -m pytest test_async_routes.py
+
+Both stacks run against an `async_test` schema that is migrated, seeded and
+dropped afterwards.
+"""
+import os
+
+import pytest
+from alembic import command
+from alembic.config import Config
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import NullPool
+
+from app.cache import dashboard_cache
+from app.database import _time_queries, get_async_read_db, get_read_db
+from app.deps import get_current_user
+from app.models import User
+from app.routers import clients, dashboard, invoices, reports
+from app.schema import ALEMBIC_INI
+from app.timing import SQLTimingMiddleware
+
+SCHEMA = "async_test"
+CONNECT_ARGS = {"options": f"-csearch_path={SCHEMA},public", "prepare_threshold": 0}
+
+SEED_SQL = [
+    """
+    INSERT INTO clients (id, company_name, credit_limit, created_at)
+    SELECT gen_random_uuid(), 'Async Client ' || g, 0, now() - g * interval '1 minute'
+    FROM generate_series(1, 30) g
+    """,
+    """
+    INSERT INTO invoices (id, client_id, invoice_number, invoice_date, due_date,
+                          total_amount, paid_amount, outstanding, status, created_at)
+    SELECT gen_random_uuid(), c.id, 'ASY-' || c.n || '-' || g, d, d + 30,
+           1000, paid, 1000 - paid,
+           CASE WHEN paid = 1000 THEN 'Paid' WHEN paid > 0 THEN 'Partial' ELSE 'Unpaid' END,
+           now()
+    FROM (SELECT id, row_number() OVER (ORDER BY company_name) AS n FROM clients) c
+    CROSS JOIN generate_series(1, 6) g
+    CROSS JOIN LATERAL (SELECT current_date - ((c.n * 7 + g * 53) % 120)::int AS d,
+                               ((c.n + g) % 3) * 500 AS paid) v
+    """,
+    """
+    INSERT INTO payments (id, invoice_id, amount, payment_date, payment_mode, created_at)
+    SELECT gen_random_uuid(), id, paid_amount, invoice_date + 10, 'UPI', now()
+    FROM invoices WHERE paid_amount > 0
+    """,
+]
+
+URLS = [
+    "/api/dashboard",
+    "/api/dashboard?top=12",
+    "/api/clients",
+    "/api/clients?sort=outstanding&limit=7",
+    "/api/clients?sort=overdue&limit=5&include_total=false",
+    "/api/clients?search=async client 1",
+    "/api/invoices",
+    "/api/invoices?limit=25",
+    "/api/invoices?status_filter=overdue&limit=10",
+    "/api/invoices?cursor=bad",
+    "/api/reports/outstanding",
+    "/api/reports/overdue?limit=10&offset=5",
+    "/api/reports/payments",
+]
+
+
+def _app(router_attr: str) -> FastAPI:
+    app = FastAPI()
+    app.add_middleware(SQLTimingMiddleware)
+    for module in (dashboard, clients, invoices, reports):
+        app.include_router(getattr(module, router_attr), prefix="/api")
+    app.dependency_overrides[get_current_user] = lambda: User(username="tester", role="admin", full_name="Tester")
+    return app
+
+
+@pytest.fixture(scope="module")
+def stacks():
+    url = os.environ.get("ASYNC_TEST_DATABASE_URL")
+    if not url or not url.startswith("postgresql+psycopg"):
+        pytest.skip("set ASYNC_TEST_DATABASE_URL to a postgresql+psycopg database to run the async checks")
+    engine = create_engine(url, poolclass=NullPool, connect_args=CONNECT_ARGS)
+    try:
+        conn = engine.connect()
+    except OperationalError as e:
+        pytest.skip(f"ASYNC_TEST_DATABASE_URL is not reachable: {e}")
+
+    conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+    conn.execute(text(f"CREATE SCHEMA {SCHEMA}"))
+    conn.commit()
+    async_engine = create_async_engine(url, poolclass=NullPool, connect_args=CONNECT_ARGS)
+    _time_queries(async_engine.sync_engine)
+    try:
+        config = Config(ALEMBIC_INI)
+        config.attributes["connection"] = conn
+        command.upgrade(config, "head")
+        conn.commit()
+        for statement in SEED_SQL:
+            conn.execute(text(statement))
+        conn.commit()
+
+        def sync_db():
+            with Session(engine) as db:
+                yield db
+
+        async def async_db():
+            async with AsyncSession(async_engine) as db:
+                yield db
+
+        sync_app, async_app = _app("router"), _app("async_router")
+        sync_app.dependency_overrides[get_read_db] = sync_db
+        async_app.dependency_overrides[get_async_read_db] = async_db
+        with TestClient(sync_app) as sync_client, TestClient(async_app) as async_client:
+            yield sync_client, async_client
+    finally:
+        conn.rollback()
+        conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+        conn.commit()
+        conn.close()
+        engine.dispose()
+
+
+@pytest.mark.parametrize("url", URLS)
+def test_async_endpoint_matches_sync(stacks, url):
+    sync_client, async_client = stacks
+    dashboard_cache.clear()
+    expected = sync_client.get(url)
+    dashboard_cache.clear()
+    actual = async_client.get(url)
+
+    assert actual.status_code == expected.status_code
+    assert actual.json() == expected.json()
+    for header in ("X-Total-Count", "X-Next-Cursor"):
+        assert actual.headers.get(header) == expected.headers.get(header)
+
+
+def test_async_single_rows_match_sync(stacks):
+    sync_client, async_client = stacks
+    client_id = sync_client.get("/api/clients?limit=1").json()[0]["id"]
+    invoice_id = sync_client.get("/api/invoices?limit=1").json()[0]["id"]
+    for url in (f"/api/clients/{client_id}", f"/api/invoices/{invoice_id}"):
+        assert async_client.get(url).json() == sync_client.get(url).json()
+    assert async_client.get(f"/api/invoices/{client_id}").status_code == 404
+
+
+def test_async_queries_are_timed(stacks):
+    # The request's stats must reach queries run on SQLAlchemy's greenlet
+    _, async_client = stacks
+    response = async_client.get("/api/invoices?limit=5")
+    assert 'db;desc="2 queries"' in response.headers["Server-Timing"]
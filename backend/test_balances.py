@@ -0,0 +1,86 @@
+import uuid
+from datetime import date
+
+from sqlalchemy import create_engine, update
+from sqlalchemy.orm import sessionmaker
+
+import backfill_balances
+from app.balances import find_balance_mismatches
+from app.database import Base, SessionLocal
+from app.models import Client, Invoice, Payment
+
+
+def _balance(client, invoice_id):
+    body = client.get(f"/api/invoices/{invoice_id}").json()
+    return float(body["paid_amount"]), float(body["outstanding"]), body["status"]
+
+
+def _mismatches(invoice_ids):
+    db = SessionLocal()
+    try:
+        return [row for row in find_balance_mismatches(db) if str(row.id) in invoice_ids]
+    finally:
+        db.close()
+
+
+def test_balance_columns_follow_payment_and_invoice_changes(client, make_client, make_invoice):
+    client_id = make_client()
+    first, second = make_invoice(client_id, 1000), make_invoice(client_id, 500)
+    assert _balance(client, first) == (0, 1000, "Unpaid")
+
+    paid = client.post("/api/payments", json={"invoice_id": first, "amount": 400, "payment_date": "2026-01-10"})
+    assert paid.status_code == 201
+    assert _balance(client, first) == (400, 600, "Partial")
+
+    bulk = client.post("/api/payments/bulk", json={"payments": [
+        {"invoice_id": first, "amount": 600, "payment_date": "2026-01-11"},
+        {"invoice_id": second, "amount": 500, "payment_date": "2026-01-11"},
+    ]})
+    assert bulk.json()["created"] == 2
+    assert _balance(client, first) == (1000, 0, "Paid")
+    assert _balance(client, second) == (500, 0, "Paid")
+
+    payment_id = paid.json()["id"]
+    assert client.delete(f"/api/payments/{payment_id}").status_code == 204
+    assert _balance(client, first) == (600, 400, "Partial")
+    # Deleting it again must not subtract the amount a second time
+    assert client.delete(f"/api/payments/{payment_id}").status_code == 404
+    assert _balance(client, first) == (600, 400, "Partial")
+
+    assert _mismatches({first, second}) == []
+    assert client.delete(f"/api/invoices/{second}").status_code == 204
+    assert _mismatches({first}) == []
+
+
+def test_backfill_check_reports_and_repairs_drift(tmp_path, monkeypatch, capsys):
+    engine = create_engine(f"sqlite:///{tmp_path / 'balances.db'}")
+    Base.metadata.create_all(bind=engine)
+    monkeypatch.setattr(backfill_balances, "engine", engine)
+    monkeypatch.setattr(backfill_balances, "SessionLocal", sessionmaker(bind=engine))
+
+    db = sessionmaker(bind=engine)()
+    try:
+        client_id, invoice_id = uuid.uuid4(), uuid.uuid4()
+        db.add(Client(id=client_id, company_name="Drift Traders"))
+        db.add(Invoice(
+            id=invoice_id, client_id=client_id, invoice_number="DRIFT-1", invoice_date=date(2026, 1, 1),
+            due_date=date(2026, 2, 1), total_amount=100, paid_amount=30, outstanding=70, status="Partial",
+        ))
+        db.add(Payment(invoice_id=invoice_id, amount=30, payment_date=date(2026, 1, 5)))
+        db.commit()
+        assert backfill_balances.check() == 0
+
+        db.execute(update(Invoice).values(paid_amount=0, outstanding=100, status="Unpaid"))
+        db.commit()
+        capsys.readouterr()
+        assert backfill_balances.check() == 1
+        assert "Invoice DRIFT-1: stored paid=0" in capsys.readouterr().out
+
+        backfill_balances.backfill()
+        assert backfill_balances.check() == 0
+        db.expire_all()
+        inv = db.get(Invoice, invoice_id)
+        assert (inv.paid_amount, inv.outstanding, inv.status) == (30, 70, "Partial")
+    finally:
+        db.close()
+        engine.dispose()
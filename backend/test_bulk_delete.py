@@ -0,0 +1,67 @@
+import uuid
+
+
+def _import(client, name, prefix, count):
+    rows = "\n".join(f"{name},{prefix}-{i},2026-01-{i + 1:02d},2026-02-01,100" for i in range(count))
+    response = client.post(
+        "/api/invoices/import?auto_create_clients=true",
+        files={"file": ("batch.csv", f"Client Name,Invoice Number,Invoice Date,Due Date,Invoice Amount\n{rows}", "text/csv")},
+    )
+    assert response.status_code == 200
+    assert response.json()["imported"] == count
+    return response.json()["batch_id"]
+
+
+def _ids(client, client_id):
+    return [inv["id"] for inv in client.get("/api/invoices", params={"client_id": client_id}).json()]
+
+
+def _pay(client, invoice_id):
+    response = client.post("/api/payments", json={"invoice_id": invoice_id, "amount": 40, "payment_date": "2026-01-20"})
+    assert response.status_code == 201
+
+
+def test_bulk_delete_removes_an_import_batch_and_its_payments(client):
+    tag = uuid.uuid4().hex[:8]
+    name = f"Batch {tag}"
+    first = _import(client, name, f"B1{tag}", 5)
+    second = _import(client, name, f"B2{tag}", 3)
+    assert first != second
+    client_id = client.get("/api/clients", params={"search": name}).json()[0]["id"]
+    for invoice_id in _ids(client, client_id)[:4]:
+        _pay(client, invoice_id)
+    paid_in_first = sum(
+        1 for p in client.get("/api/payments", params={"client_id": client_id}).json()
+        if p["invoice_number"].startswith(f"B1{tag}")
+    )
+
+    response = client.delete("/api/invoices", params={"import_batch_id": first})
+    assert response.status_code == 200
+    assert response.json() == {"invoices": 5, "payments": paid_in_first}
+    remaining = client.get("/api/invoices", params={"client_id": client_id}).json()
+    assert {inv["invoice_number"][:2 + len(tag)] for inv in remaining} == {f"B2{tag}"}
+    assert all(p["invoice_number"].startswith(f"B2{tag}")
+               for p in client.get("/api/payments", params={"client_id": client_id}).json())
+
+    by_date = client.delete("/api/invoices", params={"client_id": client_id, "start_date": "2026-01-02"}).json()
+    assert by_date["invoices"] == 2
+    assert client.delete("/api/invoices").status_code == 400
+
+
+def test_single_deletes_cascade_in_the_database(client):
+    tag = uuid.uuid4().hex[:8]
+    _import(client, f"Cascade {tag}", f"C{tag}", 2)
+    client_id = client.get("/api/clients", params={"search": f"Cascade {tag}"}).json()[0]["id"]
+    invoice_id, other_id = _ids(client, client_id)
+    _pay(client, invoice_id)
+    _pay(client, other_id)
+
+    assert client.delete(f"/api/invoices/{invoice_id}").status_code == 204
+    assert client.get(f"/api/invoices/{invoice_id}").status_code == 404
+    assert len(client.get("/api/payments", params={"client_id": client_id}).json()) == 1
+    assert client.delete(f"/api/invoices/{invoice_id}").status_code == 404
+
+    assert client.delete(f"/api/clients/{client_id}").status_code == 204
+    assert client.get(f"/api/invoices/{other_id}").status_code == 404
+    assert client.get("/api/payments", params={"client_id": client_id}).json() == []
+    assert client.delete(f"/api/clients/{client_id}").status_code == 404
@@ -0,0 +1,46 @@
+import re
+import uuid
+
+
+def _payment(invoice_id, amount):
+    return {"invoice_id": invoice_id, "amount": amount, "payment_date": "2026-01-15", "payment_mode": "Cheque"}
+
+
+def _queries(response) -> int:
+    return int(re.search(r'db;desc="(\d+) queries"', response.headers["Server-Timing"]).group(1))
+
+
+def test_bulk_payments_report_each_item(client, make_client, make_invoice):
+    client_id = make_client()
+    first, second = make_invoice(client_id, 100), make_invoice(client_id, 100)
+
+    response = client.post("/api/payments/bulk", json={"payments": [
+        _payment(first, 60),
+        _payment(first, 50),  # only 40 left after the item before it
+        _payment(second, 100),
+        _payment(str(uuid.uuid4()), 10),
+    ]})
+    assert response.status_code == 200
+    body = response.json()
+    assert (body["created"], body["failed"]) == (2, 2)
+    results = body["results"]
+    assert [r["index"] for r in results] == [0, 1, 2, 3]
+    assert float(results[0]["payment"]["amount"]) == 60
+    assert results[0]["payment"]["invoice_number"].startswith("INV-")
+    assert "exceeds outstanding ₹40" in results[1]["error"]
+    assert results[3]["error"] == "Invoice not found"
+
+    assert client.get(f"/api/invoices/{first}").json()["status"] == "Partial"
+    assert float(client.get(f"/api/invoices/{first}").json()["outstanding"]) == 40
+    assert client.get(f"/api/invoices/{second}").json()["status"] == "Paid"
+    assert len(client.get("/api/payments", params={"client_id": client_id}).json()) == 2
+
+
+def test_bulk_payment_queries_do_not_grow_with_batch_size(client, make_client, make_invoice):
+    client_id = make_client()
+    invoices = [make_invoice(client_id, 1000) for _ in range(20)]
+
+    small = client.post("/api/payments/bulk", json={"payments": [_payment(invoices[0], 1)]})
+    large = client.post("/api/payments/bulk", json={"payments": [_payment(i, 5) for i in invoices] * 10})
+    assert large.json()["created"] == 200
+    assert _queries(large) == _queries(small)
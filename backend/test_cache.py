@@ -0,0 +1,72 @@
+import uuid
+
+import pytest
+
+from app.cache import bump_version, current_version
+from app.database import Base, SessionLocal, engine
+
+
+def test_bump_version_upserts_on_commit_and_is_dropped_on_rollback():
+    Base.metadata.create_all(bind=engine)
+    name = f"test-{uuid.uuid4().hex[:8]}"
+    db = SessionLocal()
+    try:
+        bump_version(db, name)
+        bump_version(db, name)  # once per transaction
+        assert current_version(db, name) == 0  # not written until commit
+        db.commit()
+        assert current_version(db, name) == 1
+
+        bump_version(db, name)
+        db.rollback()
+        db.commit()
+        assert current_version(db, name) == 1
+
+        bump_version(db, name)
+        db.commit()
+        assert current_version(db, name) == 2
+    finally:
+        db.close()
+
+
+def test_user_changes_evict_cached_principals(monkeypatch):
+    from fastapi import HTTPException
+    from fastapi.security import HTTPAuthorizationCredentials
+
+    from app.auth import create_access_token
+    from app.config import settings
+    from app.deps import get_current_user, principal_cache
+    from app.models import User
+
+    Base.metadata.create_all(bind=engine)
+    monkeypatch.setattr(settings, "AUTH_TRUST_TOKEN_CLAIMS", False)
+    monkeypatch.setattr(settings, "AUTH_CACHE_VERSION_CHECK_SECONDS", 0)
+    username = f"cache-{uuid.uuid4().hex[:8]}"
+    db = SessionLocal()
+    try:
+        db.add(User(username=username, hashed_password="x", full_name="Cache Test", role="admin"))
+        db.commit()
+        credentials = HTTPAuthorizationCredentials(
+            scheme="Bearer", credentials=create_access_token({"sub": username, "role": "admin"}),
+        )
+        assert get_current_user(credentials, db).role == "admin"
+        hits = principal_cache.hits
+        assert get_current_user(credentials, db).role == "admin"
+        assert principal_cache.hits == hits + 1
+
+        # Changed in another session, as another worker process would
+        other = SessionLocal()
+        try:
+            other.query(User).filter(User.username == username).one().role = "staff"
+            other.commit()
+            assert get_current_user(credentials, db).role == "staff"
+
+            other.delete(other.query(User).filter(User.username == username).one())
+            other.commit()
+        finally:
+            other.close()
+        with pytest.raises(HTTPException) as deleted:
+            get_current_user(credentials, db)
+        assert deleted.value.status_code == 401
+    finally:
+        db.close()
@@ -0,0 +1,62 @@
+import random
+import string
+import time
+import uuid
+
+import pytest
+
+from app.search import NgramIndex
+
+
+def _names(count: int) -> list:
+    rng = random.Random(7)
+    words = ["".join(rng.choices(string.ascii_lowercase, k=rng.randint(4, 9))).title() for _ in range(3000)]
+    suffixes = ["Traders", "Logistics", "Pvt Ltd", "Enterprises", "Exports", "Couriers"]
+    return [f"{rng.choice(words)} {rng.choice(words)} {rng.choice(suffixes)} {n}" for n in range(count)]
+
+
+def test_ngram_index_ranks_prefix_then_similar():
+    index = NgramIndex(enumerate([
+        "Acme Logistics",
+        "Zenith Acme Traders",
+        "Acmee Couriers",
+        "Blue Dart Express",
+        "Acme Exports",
+    ]))
+    assert index.search("acme", 10)[:2] == [4, 0]  # prefixes A-Z, then "acmee" before a mid-name match
+    assert set(index.search("acme", 10)) == {0, 1, 2, 4}
+    assert index.search("acme", 1) == [4]
+    assert index.search("blue drat", 5) == [3]  # typo
+    assert index.search("zz", 5) == []
+
+
+@pytest.mark.benchmark
+def test_ngram_index_is_fast_at_50k_clients():
+    names = _names(50_000)
+    index = NgramIndex(enumerate(names))
+    terms = [names[n].split()[n % 2].lower() for n in range(0, 50_000, 500)]
+    terms += [term[:3] for term in terms[:20]] + [term[:-1] for term in terms[:20]]
+
+    timings = []
+    for term in terms:
+        start = time.perf_counter()
+        found = index.search(term, 20)
+        timings.append(time.perf_counter() - start)
+        assert found, term
+    timings.sort()
+    p95 = timings[int(len(timings) * 0.95)]
+    assert p95 < 0.02, f"p95 search took {p95 * 1000:.1f} ms"
+
+
+def test_search_endpoint_ranks_and_sees_new_clients(client):
+    tag = uuid.uuid4().hex[:8]
+    for name in (f"{tag} Traders", f"Northern {tag} Logistics", f"{tag[:-1]}x Exports"):
+        assert client.post("/api/clients", json={"company_name": name}).status_code == 201
+
+    response = client.get("/api/clients", params={"search": tag})
+    assert response.status_code == 200
+    assert [c["company_name"] for c in response.json()][:2] == [f"{tag} Traders", f"Northern {tag} Logistics"]
+    assert "invoice_count" in response.json()[0]
+
+    limited = client.get("/api/clients", params={"search": tag, "limit": 1}).json()
+    assert [c["company_name"] for c in limited] == [f"{tag} Traders"]
@@ -0,0 +1,86 @@
+import logging
+import time
+import uuid
+
+import pytest
+
+UNREADABLE = {
+    "corrupt xlsx": ("bad.xlsx", b"PK\x03\x04 not really a workbook"),
+    "undecodable csv": ("bad.csv", "Client Name,Invoice Number\nCafé,1\n".encode("utf-16")),
+    "empty csv": ("empty.csv", b""),
+}
+
+
+@pytest.mark.parametrize("mode", ["", "stream=true"])
+@pytest.mark.parametrize("case", list(UNREADABLE))
+def test_unreadable_upload_is_a_400(client, case, mode):
+    filename, content = UNREADABLE[case]
+    response = client.post(f"/api/invoices/import?{mode}", files={"file": (filename, content)})
+    assert response.status_code == 400
+    assert response.json()["detail"].startswith("Failed to read file: ")
+
+
+@pytest.mark.parametrize("case", list(UNREADABLE))
+def test_unreadable_background_upload_fails_the_job_without_a_traceback(client, case, caplog):
+    filename, content = UNREADABLE[case]
+    caplog.set_level(logging.WARNING, logger="app.import_jobs")
+    job = client.post("/api/invoices/import?async=true", files={"file": (filename, content)}).json()
+
+    deadline = time.monotonic() + 10
+    while job["status"] in ("queued", "running") and time.monotonic() < deadline:
+        time.sleep(0.05)
+        job = client.get(f"/api/invoices/import/{job['id']}").json()
+    assert job["status"] == "failed"
+    assert job["detail"]
+    assert not [r for r in caplog.records if r.exc_info]
+
+
+@pytest.mark.parametrize("mode", ["", "stream=true"])
+def test_row_errors_are_reported_per_row(client, make_client, make_invoice, mode):
+    tag = uuid.uuid4().hex[:8]
+    known = f"Known {tag}"
+    make_invoice(make_client(known), 100, number=f"DUP-{tag}")
+    rows = [
+        (known, f"OK-{tag}-1", "2026-01-01", "2026-02-01", "100"),
+        ("", f"E-{tag}-3", "2026-01-01", "2026-02-01", "100"),
+        (known, "", "2026-01-01", "2026-02-01", "100"),
+        ("", "", "2026-01-01", "2026-02-01", "100"),
+        (known, f"E-{tag}-6", "not a date", "2026-02-01", "100"),
+        (known, f"E-{tag}-7", "2026-01-01", "2026-13-45", "100"),
+        (known, f"E-{tag}-8", "2026-01-01", "2026-02-01", "0"),
+        (known, f"E-{tag}-9", "2026-01-01", "2026-02-01", "-5"),
+        (known, f"E-{tag}-10", "2026-01-01", "2026-02-01", "abc"),
+        (known, f"E-{tag}-11", "2026-01-01", "2026-02-01", "inf"),
+        (known, f"E-{tag}-12", "2026-01-01", "2026-02-01", "NaN"),
+        # Python's Decimal accepts these; the import does not
+        (known, f"E-{tag}-13", "2026-01-01", "2026-02-01", "1_000"),
+        (known, f"E-{tag}-14", "2026-01-01", "2026-02-01", "१२३"),
+        (f"Stranger {tag}", f"E-{tag}-15", "2026-01-01", "2026-02-01", "100"),
+        (known, f"E-{tag}-16", "bad", "2026-02-01", "0"),
+        (known, f"OK-{tag}-17", "2026-01-01", "2026-02-01", '"1,500"'),
+        (known, f"DUP-{tag}", "2026-01-01", "2026-02-01", "100"),
+    ]
+    csv_text = "Client Name,Invoice Number,Invoice Date,Due Date,Invoice Amount\n"
+    csv_text += "\n".join(",".join(row) for row in rows)
+    response = client.post(f"/api/invoices/import?{mode}", files={"file": ("rows.csv", csv_text.encode(), "text/csv")})
+    assert response.status_code == 200
+    body = response.json()
+    assert body["errors"] == [
+        "Row 3: Missing Client Name",
+        "Row 4: Missing Invoice Number",
+        "Row 5: Missing Client Name",
+        "Row 5: Missing Invoice Number",
+        "Row 6: Invalid Invoice Date",
+        "Row 7: Invalid Due Date",
+        "Row 8: Invoice Amount must be positive",
+        "Row 9: Invoice Amount must be positive",
+        "Row 10: Invalid Invoice Amount",
+        "Row 11: Invalid Invoice Amount",
+        "Row 12: Invalid Invoice Amount",
+        "Row 13: Invalid Invoice Amount",
+        "Row 14: Invalid Invoice Amount",
+        "Row 15: Client 'Stranger " + tag + "' not found",
+        "Row 16: Invalid Invoice Date",
+        "Row 16: Invoice Amount must be positive",
+    ]
+    assert (body["total_rows"], body["imported"], body["duplicates"], body["error_count"]) == (17, 2, 1, 16)
@@ -0,0 +1,43 @@
+from datetime import datetime, timedelta
+
+from app.database import SessionLocal
+from app.import_jobs import _run_job
+from app.models import ImportJob
+
+
+def _job(status, idle_seconds):
+    db = SessionLocal()
+    try:
+        stamp = datetime.utcnow() - timedelta(seconds=idle_seconds)
+        job = ImportJob(filename="stale.csv", status=status, created_at=stamp, updated_at=stamp)
+        db.add(job)
+        db.commit()
+        return job.id
+    finally:
+        db.close()
+
+
+def test_jobs_whose_worker_is_gone_are_reported_failed(client):
+    stale_running = _job("running", 3600)
+    stale_queued = _job("queued", 3600)
+    active = _job("running", 5)
+    finished = _job("done", 3600)
+
+    for job_id in (stale_running, stale_queued):
+        body = client.get(f"/api/invoices/import/{job_id}").json()
+        assert body["status"] == "failed"
+        assert "restarted" in body["detail"]
+    assert client.get(f"/api/invoices/import/{active}").json()["status"] == "running"
+    assert client.get(f"/api/invoices/import/{finished}").json()["status"] == "done"
+
+
+def test_a_job_failed_while_queued_is_not_started(client, tmp_path):
+    job_id = _job("queued", 3600)
+    client.get(f"/api/invoices/import/{job_id}")
+    upload = tmp_path / "late.csv"
+    upload.write_text("Client Name,Invoice Number,Invoice Date,Due Date,Invoice Amount\nLate,LATE-1,2026-01-01,2026-02-01,10\n")
+
+    _run_job(job_id, str(upload), "late.csv", True)
+    body = client.get(f"/api/invoices/import/{job_id}").json()
+    assert (body["status"], body["imported"]) == ("failed", 0)
+    assert not upload.exists()
@@ -0,0 +1,62 @@
+import math
+import threading
+import time
+import uuid
+
+import pytest
+
+IMPORT_ROWS = 50_000
+P99_LIMIT_SECONDS = 0.5
+SMOKE_IMPORT_ROWS = 2_000
+SMOKE_P99_LIMIT_SECONDS = 2.0
+
+
+def _p99(samples):
+    ordered = sorted(samples)
+    return ordered[math.ceil(0.99 * len(ordered)) - 1]
+
+
+def _latencies_during_import(client, rows):
+    """Request /health and /api/dashboard in a loop while `rows` invoices import."""
+    tag = uuid.uuid4().hex[:8]
+    lines = ["Client Name,Invoice Number,Invoice Date,Due Date,Invoice Amount"]
+    lines += [
+        f"Latency Client {i % 200},LAT-{tag}-{i},2026-01-{1 + i % 28:02d},2026-03-01,{100 + i}" for i in range(rows)
+    ]
+    payload = "\n".join(lines).encode()
+
+    outcome = {}
+
+    def run_import():
+        outcome["response"] = client.post(
+            "/api/invoices/import?auto_create_clients=true",
+            files={"file": ("big.csv", payload, "text/csv")},
+        )
+
+    latencies = {"/health": [], "/api/dashboard": []}
+    worker = threading.Thread(target=run_import)
+    worker.start()
+    while worker.is_alive():
+        for path, samples in latencies.items():
+            start = time.perf_counter()
+            assert client.get(path).status_code == 200
+            samples.append(time.perf_counter() - start)
+    worker.join()
+
+    assert outcome["response"].status_code == 200
+    assert outcome["response"].json()["imported"] == rows
+    return latencies
+
+
+def test_health_and_dashboard_respond_during_import(client):
+    # Always-on guard: catches an import that blocks the event loop for
+    # seconds, with a bound loose enough for slow CI machines
+    for path, samples in _latencies_during_import(client, SMOKE_IMPORT_ROWS).items():
+        assert _p99(samples) < SMOKE_P99_LIMIT_SECONDS, f"{path} p99 {_p99(samples):.3f}s while importing"
+
+
+@pytest.mark.benchmark
+def test_health_and_dashboard_stay_responsive_during_import(client):
+    for path, samples in _latencies_during_import(client, IMPORT_ROWS).items():
+        assert _p99(samples) < P99_LIMIT_SECONDS, f"{path} p99 {_p99(samples):.3f}s while importing"
+        assert len(samples) >= 10, f"only {len(samples)} {path} requests completed during the import"
@@ -0,0 +1,12 @@
+def test_metrics_reports_routes_pool_and_caches(client):
+    assert client.get("/api/clients").status_code == 200
+    assert client.get("/api/dashboard").status_code == 200
+
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    body = response.text
+    assert 'http_requests_total{method="GET",route="/api/clients",status="200"}' in body
+    assert 'http_request_duration_seconds_bucket{le="0.005",method="GET",route="/api/clients"}' in body
+    assert "db_pool_checked_out" in body
+    assert "db_pool_waiters" in body
+    assert 'cache_requests_total{cache="dashboard",result=' in body
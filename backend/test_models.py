@@ -0,0 +1,29 @@
+import uuid
+
+import pytest
+
+from app.database import SessionLocal
+from app.models import Client
+
+
+# Ids whose hex is all digits, or digits around one "e", read as numbers
+# if the column is not stored as text on SQLite
+@pytest.mark.parametrize("hex_id", [
+    "12345678123412341234123456789012",
+    "1234567812341234123412345678e012",
+])
+def test_numeric_looking_ids_round_trip(client, make_invoice, hex_id):
+    client_id = uuid.UUID(hex_id)
+    db = SessionLocal()
+    try:
+        db.add(Client(id=client_id, company_name=f"Ids {hex_id}"))
+        db.commit()
+    finally:
+        db.close()
+
+    make_invoice(str(client_id), 100)
+    response = client.get(f"/api/clients/{client_id}")
+    assert response.status_code == 200
+    assert response.json()["id"] == str(client_id)
+    invoices = client.get("/api/invoices", params={"client_id": str(client_id)}).json()
+    assert [inv["client_id"] for inv in invoices] == [str(client_id)]
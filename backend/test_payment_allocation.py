@@ -0,0 +1,45 @@
+import uuid
+
+
+def _allocate(client, client_id, amount, **extra):
+    return client.post(f"/api/clients/{client_id}/allocate-payment", json={
+        "amount": amount, "payment_date": "2026-03-01", "payment_mode": "NEFT", **extra,
+    })
+
+
+def test_allocation_pays_oldest_due_first(client, make_client, make_invoice):
+    client_id = make_client()
+    newest = make_invoice(client_id, 300, due="2026-03-01")
+    oldest = make_invoice(client_id, 200, due="2026-01-15")
+    middle = make_invoice(client_id, 400, due="2026-02-01")
+
+    response = _allocate(client, client_id, 500)
+    assert response.status_code == 200
+    body = response.json()
+    assert [(p["invoice_id"], float(p["amount"])) for p in body["payments"]] == [(oldest, 200), (middle, 300)]
+    assert float(body["outstanding"]) == 400
+    assert all(p["payment_mode"] == "NEFT" for p in body["payments"])
+
+    assert client.get(f"/api/invoices/{oldest}").json()["status"] == "Paid"
+    assert float(client.get(f"/api/invoices/{middle}").json()["outstanding"]) == 100
+    assert client.get(f"/api/invoices/{newest}").json()["status"] == "Unpaid"
+
+    too_much = _allocate(client, client_id, 500)
+    assert too_much.status_code == 400
+    assert "exceeds outstanding ₹400" in too_much.json()["detail"]
+
+
+def test_allocation_follows_an_explicit_invoice_list(client, make_client, make_invoice):
+    client_id = make_client()
+    first = make_invoice(client_id, 100, due="2026-01-01")
+    second = make_invoice(client_id, 100, due="2026-02-01")
+    stranger = make_client()
+    foreign = make_invoice(stranger, 100, due="2026-01-01")
+
+    body = _allocate(client, client_id, 150, invoice_ids=[second, first]).json()
+    assert [(p["invoice_id"], float(p["amount"])) for p in body["payments"]] == [(second, 100), (first, 50)]
+
+    response = _allocate(client, client_id, 10, invoice_ids=[first, foreign])
+    assert response.status_code == 400
+    assert foreign in response.json()["detail"]
+    assert _allocate(client, str(uuid.uuid4()), 10).status_code == 404
@@ -0,0 +1,130 @@
+import time
+import uuid
+from datetime import date, timedelta
+from decimal import Decimal
+from types import SimpleNamespace
+
+import pytest
+
+from app import reconcile
+from app.reconcile import OpenInvoiceIndex
+
+
+def _upload(client, csv_text):
+    return client.post(
+        "/api/payments/import",
+        files={"file": ("statement.csv", csv_text.encode(), "text/csv")},
+    )
+
+
+def test_statement_import_applies_exact_matches_and_returns_the_rest(client, make_client, make_invoice):
+    tag = uuid.uuid4().hex[:6].upper()
+    acme = make_client(f"Acme {tag} Traders")
+    other = make_client(f"Zenith {tag} Logistics")
+    by_number = make_invoice(acme, 500, number=f"INV-{tag}-01")
+    by_amount = make_invoice(other, 300, number=f"ZL{tag}A")
+    make_invoice(other, 700, number=f"ZL{tag}B")
+
+    statement = "\n".join([
+        "Account Statement,,,,",
+        "A/c No: 000123,,,,",
+        "Txn Date,Narration,Ref No,Withdrawal,Deposit",
+        f"02/03/2026,NEFT-ACME {tag} TRADERS,INV {tag} 01,,500.00",
+        f"03/03/2026,IMPS ZENITH {tag} LOGISTICS,,,300",
+        f"04/03/2026,UPI ZENITH {tag} LOGISTICS,,,450",
+        "05/03/2026,CASH DEPOSIT BRANCH,,,1000",
+        f"06/03/2026,CHARGES ACME {tag} TRADERS,,120,",
+    ])
+    response = _upload(client, statement)
+    assert response.status_code == 200
+    body = response.json()
+    assert body["total_rows"] == 5
+    assert body["credit_lines"] == 4
+    assert body["applied"] == 2
+    assert float(body["applied_amount"]) == 800
+    assert {p["invoice_id"] for p in body["payments"]} == {by_number, by_amount}
+    assert body["payments"][0]["payment_date"] == "2026-03-02"
+
+    review = body["review"]
+    assert [line["row"] for line in review] == [6, 7]
+    assert review[0]["reason"] == "No open invoice of this client matches the amount"
+    assert {c["invoice_number"] for c in review[0]["candidates"]} == {f"ZL{tag}B"}
+    assert review[1]["reason"] == "No invoice number or client name found"
+
+    assert client.get(f"/api/invoices/{by_number}").json()["status"] == "Paid"
+    assert client.get(f"/api/invoices/{by_amount}").json()["status"] == "Paid"
+
+    again = _upload(client, statement).json()
+    assert (again["applied"], again["duplicates"]) == (0, 2)
+
+
+def test_statement_import_rejects_files_without_a_header(client):
+    response = _upload(client, "a,b,c\n1,2,3\n")
+    assert response.status_code == 400
+    assert "statement header" in response.json()["detail"]
+
+
+def test_statement_import_reports_unusable_amounts(client):
+    tag = uuid.uuid4().hex[:6].upper()
+    statement = "\n".join([
+        "Txn Date,Narration,Deposit",
+        f"02/03/2026,NEFT {tag} ONE,inf",
+        "bad,NEFT,100",
+        f"04/03/2026,NEFT {tag} TWO,250",
+    ])
+    body = _upload(client, statement).json()
+    assert body["errors"] == ["Row 2: Invalid Amount", "Row 3: Invalid Date"]
+    assert body["credit_lines"] == 1
+    assert [line["row"] for line in body["review"]] == [4]
+
+
+def test_statement_line_is_not_split_when_one_allocation_is_rejected(client, make_client, make_invoice, monkeypatch):
+    tag = uuid.uuid4().hex[:6].upper()
+    acme = make_client(f"Acme {tag} Traders")
+    first = make_invoice(acme, 500, number=f"INV-{tag}-01")
+    second = make_invoice(acme, 300, number=f"INV-{tag}-02")
+
+    # Index the second invoice with a stale, larger balance, as if a
+    # payment was recorded on it after the statement was matched
+    open_invoice_rows = reconcile._open_invoice_rows
+
+    def stale_rows(db):
+        return [
+            SimpleNamespace(**{**row._mapping, "outstanding": row.outstanding + 100})
+            if str(row.id) == second else row
+            for row in open_invoice_rows(db)
+        ]
+
+    monkeypatch.setattr(reconcile, "_open_invoice_rows", stale_rows)
+    statement = "\n".join([
+        "Txn Date,Narration,Deposit",
+        f"02/03/2026,NEFT ACME INV {tag} 01 INV {tag} 02,900",
+    ])
+    body = _upload(client, statement).json()
+    assert body["applied"] == 0
+    assert [line["row"] for line in body["review"]] == [2]
+    assert "exceeds outstanding" in body["review"][0]["reason"]
+    assert client.get(f"/api/invoices/{first}").json()["status"] == "Unpaid"
+    assert client.get(f"/api/invoices/{second}").json()["status"] == "Unpaid"
+
+
+@pytest.mark.benchmark
+def test_index_matching_stays_fast_at_scale():
+    rows = [
+        SimpleNamespace(
+            id=i, invoice_number=f"INV-{i:06d}", client_id=i // 20, due_date=date(2026, 1, 1) + timedelta(days=i % 90),
+            outstanding=Decimal(1000 + i % 7), company_name=f"Client {i // 20} Pvt Ltd",
+        )
+        for i in range(100_000)
+    ]
+    index = OpenInvoiceIndex(rows)
+    lines = [
+        (f"NEFT CR-HDFC0001-CLIENT {c} PVT LTD-INV {c * 20 + 3:06d} PAYMENT", Decimal(1000))
+        for c in list(range(5_000)) * 2
+    ]
+
+    start = time.perf_counter()
+    matched = sum(bool(index.match(text, amount)[0]) for text, amount in lines)
+    elapsed = time.perf_counter() - start
+    assert matched == 10_000
+    assert elapsed < 2, f"matching 10k lines took {elapsed:.2f}s"
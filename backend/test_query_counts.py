@@ -0,0 +1,104 @@
+import uuid
+from contextlib import contextmanager
+from datetime import date, timedelta
+
+import pytest
+from sqlalchemy import event, text
+
+from app.cache import dashboard_cache
+from app.database import QueryStats, SessionLocal, engine, request_stats
+from app.models import Client, Invoice, Payment
+
+ENDPOINTS = [
+    "/api/invoices",
+    "/api/payments",
+    "/api/clients",
+    "/api/dashboard",
+    "/api/reports/outstanding",
+    "/api/reports/payments",
+]
+
+
+@contextmanager
+def _count_queries():
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        # Only queries run for a request, not background work such as the startup schema check
+        if request_stats.get() is not None:
+            statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+
+
+def _seed(clients: int, invoices_per_client: int) -> None:
+    db = SessionLocal()
+    try:
+        today = date.today()
+        for c in range(clients):
+            client = Client(id=uuid.uuid4(), company_name=f"QC Client {uuid.uuid4().hex[:8]}")
+            db.add(client)
+            for i in range(invoices_per_client):
+                inv = Invoice(
+                    id=uuid.uuid4(),
+                    client_id=client.id,
+                    invoice_number=f"QC-{uuid.uuid4().hex[:12]}",
+                    invoice_date=today - timedelta(days=40 + i),
+                    due_date=today - timedelta(days=10 - i),
+                    total_amount=100,
+                    paid_amount=25,
+                    outstanding=75,
+                    status="Partial",
+                )
+                db.add(inv)
+                db.add(Payment(invoice_id=inv.id, amount=25, payment_date=today))
+        # Writers bump the dashboard version; do the same so the second pass recomputes
+        dashboard_cache.invalidate(db)
+        db.commit()
+    finally:
+        db.close()
+
+
+def _query_count(client, path: str) -> int:
+    with _count_queries() as statements:
+        assert client.get(path).status_code == 200
+    return len(statements)
+
+
+@pytest.mark.parametrize("path", ENDPOINTS)
+def test_query_count_does_not_grow_with_rows(client, path):
+    _seed(2, 2)
+    small = _query_count(client, path)
+    _seed(20, 5)
+    large = _query_count(client, path)
+    assert large == small, f"{path} ran {small} queries for a few rows but {large} for more"
+
+
+def test_server_timing_reports_request_queries(client):
+    _seed(2, 2)
+    with _count_queries() as statements:
+        response = client.get("/api/invoices")
+    timing = response.headers["Server-Timing"]
+    assert f'db;desc="{len(statements)} queries"' in timing
+    assert "db-pool;dur=" in timing
+
+
+def test_failed_statements_leave_no_timing_state_on_the_connection():
+    stats = QueryStats()
+    token = request_stats.set(stats)
+    try:
+        with engine.connect() as conn:
+            for _ in range(3):
+                with pytest.raises(Exception):
+                    conn.execute(text("SELECT * FROM no_such_table"))
+                conn.rollback()
+            conn.execute(text("SELECT 1"))
+            # Pooled connections outlive requests, so nothing may pile up on them
+            assert not conn.info.get("query_start")
+    finally:
+        request_stats.reset(token)
+    assert stats.queries == 1
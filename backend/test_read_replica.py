@@ -0,0 +1,53 @@
+import os
+import tempfile
+import uuid
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app import database
+from app.config import settings
+from app.database import READ_PRIMARY_COOKIE, Base
+
+
+@pytest.fixture
+def replica(client, monkeypatch):
+    """An empty 'replica' database behind get_read_db, as if replication had not caught up."""
+    engine = create_engine("sqlite:///" + os.path.join(tempfile.mkdtemp(), "replica.db"))
+    Base.metadata.create_all(bind=engine)
+    monkeypatch.setattr(settings, "READ_DATABASE_URL", str(engine.url))
+    monkeypatch.setattr(database, "ReadSessionLocal", sessionmaker(bind=engine))
+    client.cookies.clear()
+    yield client
+    engine.dispose()
+
+
+def test_reads_go_to_the_replica_except_right_after_a_write(replica):
+    name = f"Replica {uuid.uuid4().hex[:8]}"
+    created = replica.post("/api/clients", json={"company_name": name})
+    assert created.status_code == 201
+    assert READ_PRIMARY_COOKIE in created.cookies
+
+    # The writer's next reads come from the primary
+    assert [c["company_name"] for c in replica.get("/api/clients", params={"search": name}).json()] == [name]
+    assert replica.get(f"/api/clients/{created.json()['id']}").status_code == 200
+
+    # Everyone else reads the replica
+    replica.cookies.clear()
+    assert replica.get("/api/clients", params={"search": name}).json() == []
+    assert replica.get(f"/api/clients/{created.json()['id']}").status_code == 404
+    assert replica.get("/api/reports/outstanding").json() == []
+    assert replica.get("/api/reports/export", params={"format": "ndjson"}).text == ""
+
+
+def test_failed_writes_do_not_pin_reads_to_the_primary(replica):
+    response = replica.delete(f"/api/clients/{uuid.uuid4()}")
+    assert response.status_code == 404
+    assert READ_PRIMARY_COOKIE not in response.cookies
+
+
+def test_no_cookie_without_a_replica(client):
+    response = client.post("/api/clients", json={"company_name": f"Primary {uuid.uuid4().hex[:8]}"})
+    assert response.status_code == 201
+    assert READ_PRIMARY_COOKIE not in response.cookies
@@ -0,0 +1,112 @@
+import uuid
+from decimal import Decimal
+from urllib.parse import unquote
+
+from app.database import SessionLocal
+from app.models import ReminderOutbox
+from app.reminders import drain_outbox, format_inr, whatsapp_number
+
+
+def test_format_inr_matches_en_in_locale():
+    assert format_inr(Decimal("1234567.50")) == "12,34,567.5"
+    assert format_inr(Decimal("1000.00")) == "1,000"
+    assert format_inr(Decimal("999")) == "999"
+    assert format_inr(Decimal("100000.25")) == "1,00,000.25"
+
+
+def test_whatsapp_number_matches_invoices_page():
+    assert whatsapp_number("98765-43210") == "919876543210"
+    assert whatsapp_number("+91 98765 43210") == "919876543210"
+    assert whatsapp_number("91 98765 43210") == "919876543210"
+    assert whatsapp_number("+1 (415) 555-0100") == "14155550100"
+    assert whatsapp_number("044 2345 6789") == "04423456789"
+    assert whatsapp_number(" - ") is None
+    assert whatsapp_number(None) is None
+
+
+def test_batch_renders_and_queues_reminders(client, make_client, make_invoice):
+    tag = uuid.uuid4().hex[:8]
+    reachable = make_client(f"Remind {tag}", phone="98765-43210", email=f"{tag}@example.com")
+    phone_only = make_client(f"Remind Phone {tag}", phone="9000000000")
+    make_invoice(reachable, 1500, due="2020-03-01", number=f"R2-{tag}")
+    make_invoice(reachable, 125000.5, due="2020-02-01", number=f"R1-{tag}")
+    make_invoice(reachable, 700, due="2099-01-01")  # not due yet
+    paid = make_invoice(reachable, 300, due="2020-01-15")
+    client.post("/api/payments", json={"invoice_id": paid, "amount": 300, "payment_date": "2020-01-20"})
+    make_invoice(phone_only, 50, due="2020-02-01")
+
+    overdue = client.get("/api/reminders/overdue", params={"client_id": reachable}).json()
+    assert len(overdue) == 1
+    assert overdue[0]["invoice_count"] == 2
+    assert float(overdue[0]["outstanding"]) == 126500.5
+    assert overdue[0]["oldest_due_date"] == "2020-02-01"
+    assert [inv["invoice_number"] for inv in overdue[0]["invoices"]] == [f"R1-{tag}", f"R2-{tag}"]
+
+    response = client.post("/api/reminders/batch", json={
+        "channels": ["whatsapp", "email"], "client_ids": [reachable, phone_only],
+    })
+    assert response.status_code == 200
+    body = response.json()
+    assert (body["clients"], body["queued"]) == (2, 3)
+    assert [(s["client_id"], s["channel"], s["reason"]) for s in body["skipped"]] == [
+        (phone_only, "email", "No email address"),
+    ]
+
+    whatsapp, email = [r for r in body["reminders"] if r["client_id"] == reachable]
+    assert whatsapp["recipient"] == "919876543210"
+    assert whatsapp["body"] == (
+        f"Hi Remind {tag},\n\nReminder for 2 pending invoices:\n\n"
+        f"1. Invoice #R1-{tag}\n   Amount: ₹1,25,000.5\n   Outstanding: ₹1,25,000.5\n   Due Date: 2020-02-01\n\n"
+        f"2. Invoice #R2-{tag}\n   Amount: ₹1,500\n   Outstanding: ₹1,500\n   Due Date: 2020-03-01\n\n"
+        "──────────\nTotal Outstanding: ₹1,26,500.5\n\n"
+        "Please arrange payment at the earliest.\n\nThank you,\nDTDC Franchise"
+    )
+    assert whatsapp["link"].startswith("https://wa.me/919876543210?text=Hi%20Remind")
+    assert unquote(whatsapp["link"].split("?text=")[1]) == whatsapp["body"]
+    assert email["recipient"] == f"{tag}@example.com"
+    assert email["subject"] == f"Payment Reminder – 2 Pending Invoices – Remind {tag}"
+    assert email["link"].startswith(f"mailto:{tag}@example.com?subject=Payment%20Reminder")
+    assert all(r["status"] == "pending" for r in body["reminders"])
+
+    again = client.post("/api/reminders/batch", json={
+        "channels": ["whatsapp", "email"], "client_ids": [reachable, phone_only],
+    }).json()
+    assert again["queued"] == 0
+    assert sorted((s["client_id"], s["channel"], s["reason"]) for s in again["skipped"]) == sorted([
+        (reachable, "whatsapp", "Reminder already pending"),
+        (reachable, "email", "Reminder already pending"),
+        (phone_only, "whatsapp", "Reminder already pending"),
+        (phone_only, "email", "No email address"),
+    ])
+
+
+def test_drain_outbox_sends_pending_reminders_and_retries_failures(client, make_client, make_invoice):
+    tag = uuid.uuid4().hex[:8]
+    ok = make_client(f"Drain {tag}", phone="9111111111")
+    flaky = make_client(f"Drain Flaky {tag}", phone="9222222222")
+    make_invoice(ok, 10, due="2020-01-01")
+    make_invoice(flaky, 10, due="2020-01-01")
+    queued = client.post("/api/reminders/batch", json={"client_ids": [ok, flaky]}).json()["reminders"]
+    ids = {r["client_id"]: uuid.UUID(r["id"]) for r in queued}
+
+    delivered = []
+
+    def send(reminder):
+        if reminder.client_id == uuid.UUID(flaky):
+            raise ConnectionError("provider unavailable")
+        delivered.append(reminder.id)
+
+    db = SessionLocal()
+    try:
+        drain_outbox(db, send, batch_size=1, max_attempts=2)
+        assert ids[ok] in delivered
+        assert db.get(ReminderOutbox, ids[ok]).status == "sent"
+        retried = db.get(ReminderOutbox, ids[flaky])
+        assert (retried.status, retried.attempts, retried.error) == ("pending", 1, "provider unavailable")
+
+        drain_outbox(db, send, batch_size=1, max_attempts=2)
+        db.expire_all()
+        assert db.get(ReminderOutbox, ids[flaky]).status == "failed"
+        assert delivered.count(ids[ok]) == 1
+    finally:
+        db.close()
@@ -0,0 +1,36 @@
+import uuid
+
+
+def _pages(client, path, params, size):
+    rows, offset = [], 0
+    while True:
+        page = client.get(path, params={**params, "limit": size, "offset": offset}).json()
+        rows += page
+        if len(page) < size:
+            return rows
+        offset += size
+
+
+def test_report_pages_are_stable_when_sort_keys_tie(client):
+    client_id = client.post("/api/clients", json={"company_name": f"Pages {uuid.uuid4().hex[:8]}"}).json()["id"]
+    invoices = [
+        client.post("/api/invoices", json={
+            "client_id": client_id,
+            "invoice_number": f"PG-{uuid.uuid4().hex[:10]}",
+            "invoice_date": "2026-01-01",
+            "due_date": "2026-02-01",
+            "total_amount": 100,
+        }).json()
+        for _ in range(7)
+    ]
+    for _ in range(7):
+        client.post("/api/payments", json={"invoice_id": invoices[0]["id"], "amount": 1, "payment_date": "2026-01-10"})
+
+    # Every row ties on the report's sort keys, so the id decides the order
+    by_id = [inv["invoice_number"] for inv in sorted(invoices, key=lambda inv: uuid.UUID(inv["id"]))]
+    outstanding = _pages(client, "/api/reports/outstanding", {"client_id": client_id}, 3)
+    assert [row["Invoice #"] for row in outstanding] == by_id
+
+    payments = client.get("/api/payments", params={"client_id": client_id}).json()
+    assert [p["id"] for p in payments] == sorted((p["id"] for p in payments), key=uuid.UUID)
+    assert len(_pages(client, "/api/reports/payments", {"client_id": client_id}, 3)) == 7